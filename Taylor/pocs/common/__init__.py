@@ -0,0 +1 @@
+"""Modules shared by the FastAPI PoCs; each app adds `pocs/` to sys.path."""
@@ -0,0 +1,128 @@
+import asyncio
+import inspect
+import time
+from contextlib import asynccontextmanager
+
+import asyncpg
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from .db_pool import PoolTimeoutError
+
+
+class AsyncConnectionPool:
+    """
+    asyncpg counterpart of `ConnectionPool` for handlers that run on the
+    event loop instead of Starlette's threadpool.
+
+    Takes the same sizing and acquire timeout, raises the same
+    `PoolTimeoutError`, and reports comparable `stats`. asyncpg prepares
+    each query on first use and keeps it in a per-connection statement
+    cache of `statement_cache_size` entries, so repeated queries skip
+    parsing and planning. Released connections are reset (open
+    transactions rolled back) by asyncpg.
+    """
+
+    def __init__(
+        self,
+        min_size=1,
+        max_size=10,
+        acquire_timeout=5.0,
+        statement_cache_size=100,
+        **connect_kwargs,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.statement_cache_size = statement_cache_size
+        self.connect_kwargs = connect_kwargs
+        self._pool = None
+        # Metrics
+        self.in_use = 0
+        self.acquired = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    async def open(self):
+        if self._pool is None:
+            self._pool = await asyncpg.create_pool(
+                min_size=self.min_size,
+                max_size=self.max_size,
+                statement_cache_size=self.statement_cache_size,
+                **self.connect_kwargs,
+            )
+
+    @asynccontextmanager
+    async def connection(self, timeout=None):
+        """Acquire a connection, waiting up to `timeout` seconds."""
+        if self._pool is None:
+            raise RuntimeError("Connection pool is not open.")
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        try:
+            conn = await self._pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.wait_seconds += time.monotonic() - started
+            raise PoolTimeoutError(
+                f"No database connection available within "
+                f"{timeout}s (pool size {self.max_size})."
+            ) from None
+        self.wait_seconds += time.monotonic() - started
+        self.acquired += 1
+        self.in_use += 1
+        try:
+            yield conn
+        finally:
+            self.in_use -= 1
+            await self._pool.release(conn)
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    def stats(self):
+        pool = self._pool
+        return {
+            "size": pool.get_size() if pool else 0,
+            "idle": pool.get_idle_size() if pool else 0,
+            "in_use": self.in_use,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "acquired": self.acquired,
+            "wait_seconds_total": round(self.wait_seconds, 6),
+            "mean_acquire_ms": (
+                self.wait_seconds * 1000.0 / self.acquired
+                if self.acquired
+                else 0.0
+            ),
+            "timeouts": self.timeouts,
+            "statement_cache_size": self.statement_cache_size,
+        }
+
+
+class ThreadpoolProxy:
+    """
+    Exposes a blocking repository's methods as coroutines that run on
+    Starlette's threadpool, so async handlers can serve either data-access
+    mode through the same interface. Generator methods become async
+    iterators, each step of which runs on the threadpool.
+    """
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        method = getattr(self._target, name)
+
+        if inspect.isgeneratorfunction(method):
+
+            def iterate(*args, **kwargs):
+                return iterate_in_threadpool(method(*args, **kwargs))
+
+            return iterate
+
+        async def call(*args, **kwargs):
+            return await run_in_threadpool(method, *args, **kwargs)
+
+        return call
@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection frees up within the acquire timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool shared by the sync FastAPI PoCs.
+
+    Holds between `min_size` and `max_size` connections. `acquire` waits
+    up to `acquire_timeout` seconds for one to free up. A connection that
+    has sat idle longer than `health_check_interval` is checked with
+    `SELECT 1` before it is handed out, and replaced if it is broken.
+    Released connections are rolled back to a clean state.
+
+    Use `connection` so a connection is returned even when the code using
+    it raises.
+    """
+
+    def __init__(
+        self,
+        connect,
+        min_size=1,
+        max_size=10,
+        acquire_timeout=5.0,
+        health_check_interval=30.0,
+    ):
+        if not 0 <= min_size <= max_size:
+            raise ValueError("Expected 0 <= min_size <= max_size")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        # Metrics
+        self.in_use = 0
+        self.acquired = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+
+    def open(self):
+        """Pre-create `min_size` connections."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """Check out a connection, waiting up to `timeout` seconds."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        conn = None
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                if self._idle:
+                    # Most recently used first: it's the likeliest to be
+                    # alive, and lets surplus connections go idle
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    self.waits += 1
+                    self.wait_seconds += time.monotonic() - started
+                    raise PoolTimeoutError(
+                        f"No database connection available within "
+                        f"{timeout}s (pool size {self.max_size})."
+                    )
+                waited = True
+                self._cond.wait(remaining)
+            if waited:
+                self.waits += 1
+                self.wait_seconds += time.monotonic() - started
+            self.in_use += 1
+            self.acquired += 1
+
+        try:
+            if conn is None:
+                conn = self._new_connection()
+            elif not self._is_healthy(conn, last_used):
+                self._close_quietly(conn)
+                with self._cond:
+                    self.discarded += 1
+                conn = self._new_connection()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self.in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back open work."""
+        healthy = not conn.closed
+        if healthy:
+            try:
+                status = conn.get_transaction_status()
+                if status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                healthy = False
+
+        with self._cond:
+            self.in_use -= 1
+            if healthy and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._size -= 1
+                self.discarded += 1
+            self._cond.notify()
+        if not healthy or self._closed:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that acquires and always releases a connection."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close idle connections; in-use ones close when released."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def _new_connection(self):
+        conn = self._connect()
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self.in_use,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "acquired": self.acquired,
+                "waits": self.waits,
+                "wait_seconds_total": round(self.wait_seconds, 6),
+                "mean_wait_ms": (
+                    self.wait_seconds * 1000.0 / self.waits
+                    if self.waits
+                    else 0.0
+                ),
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "discarded": self.discarded,
+            }
@@ -0,0 +1,117 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class PartnerAuthenticator:
+    """
+    API-key authentication with an in-process cache in front of `lookup`.
+
+    `lookup(api_key)` returns the partner record, or None for an unknown
+    key; use `authenticate_async` when `lookup` is a coroutine function.
+    Results are cached by the SHA-256 of the key, so raw keys are not
+    kept in memory. Hits are cached for `ttl` seconds. Misses are cached
+    for the shorter `negative_ttl`, so a flood of invalid keys can't turn
+    into a flood of database queries.
+
+    The cache is per process: `invalidate` clears an entry immediately in
+    this worker, and the TTL bounds how long other workers can be stale.
+    """
+
+    def __init__(
+        self,
+        lookup,
+        ttl=300.0,
+        negative_ttl=5.0,
+        max_entries=100000,
+        clock=time.monotonic,
+    ):
+        self.lookup = lookup
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        # Bumped by every invalidation, so a lookup that raced with one
+        # doesn't re-cache the stale result
+        self._generation = 0
+        # Sync FastAPI handlers run on a threadpool
+        self._lock = threading.Lock()
+        # Stats
+        self.hits = 0
+        self.negative_hits = 0
+        self.lookups = 0
+
+    @staticmethod
+    def hash_key(api_key):
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    def authenticate(self, api_key):
+        """Return the partner for `api_key`, or None if it is invalid."""
+        if not api_key:
+            return None
+        digest = self.hash_key(api_key)
+        cached, partner, generation = self._get(digest)
+        if cached:
+            return partner
+        # Query outside the lock so one slow lookup doesn't block hits
+        partner = self.lookup(api_key)
+        self._put(digest, generation, partner)
+        return partner
+
+    async def authenticate_async(self, api_key):
+        """`authenticate` for a `lookup` that is a coroutine function."""
+        if not api_key:
+            return None
+        digest = self.hash_key(api_key)
+        cached, partner, generation = self._get(digest)
+        if cached:
+            return partner
+        partner = await self.lookup(api_key)
+        self._put(digest, generation, partner)
+        return partner
+
+    def _get(self, digest):
+        """Return `(cached, partner, generation)` for a key digest."""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(digest)
+                partner = entry[1]
+                if partner is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return True, partner, self._generation
+            return False, None, self._generation
+
+    def _put(self, digest, generation, partner):
+        ttl = self.ttl if partner is not None else self.negative_ttl
+        with self._lock:
+            self.lookups += 1
+            if generation != self._generation:
+                return
+            self._entries[digest] = (self.clock() + ttl, partner)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, api_key):
+        """Drop any cached result for `api_key`, e.g. on create or revoke."""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(self.hash_key(api_key), None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "lookups": self.lookups,
+        }
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+import uuid
+
+import redis
+
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+RECORD_FIELDS = {"value", "fresh_until", "delta"}
+
+
+class RedisCache:
+    """
+    Read-through cache on an asyncio Redis client, protected against
+    stampedes.
+
+    `get_or_compute(key, compute)` returns the cached value, or awaits the
+    `compute` coroutine function and caches its JSON-serializable result:
+
+    - Fresh for `ttl` seconds, then served stale for up to `stale_ttl`
+      more while a single background task refreshes it
+      (stale-while-revalidate).
+    - Before expiry, each read may trigger that refresh early with a
+      probability that grows as expiry nears and with how long `compute`
+      took (XFetch, tuned by `beta`; 0 disables it), so hot keys rarely
+      expire at all.
+    - On a cold miss, concurrent callers in this process share one
+      computation, and across processes a per-key Redis lock lets one
+      compute while the others poll for its result for up to `lock_ttl`
+      seconds.
+
+    Redis is an optimization: if it fails, values are computed directly.
+    None results are returned but not cached.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        ttl=60.0,
+        stale_ttl=300.0,
+        beta=1.0,
+        lock_ttl=10.0,
+        poll_interval=0.05,
+        key_prefix="cache",
+        clock=time.time,
+    ):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.beta = beta
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.key_prefix = key_prefix
+        self.clock = clock
+        self._single_flight = SingleFlight()
+        self._refreshing = {}
+        # Stats
+        self.hits = 0
+        self.stale_hits = 0
+        self.early_refreshes = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.waited = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.redis_errors = 0
+
+    def make_key(self, key):
+        return f"{self.key_prefix}:{key}"
+
+    async def get_or_compute(self, key, compute):
+        """
+        Return `(value, cache_status)`; `cache_status` is one of "hit",
+        "early_refresh", "stale", "coalesced", "waited" or "miss".
+        """
+        key = self.make_key(key)
+        record = await self._read(key)
+        if record is not None:
+            now = self.clock()
+            if now >= record["fresh_until"]:
+                self.stale_hits += 1
+                self._refresh_in_background(key, compute)
+                return record["value"], "stale"
+            if self._refresh_early(record, now):
+                self.early_refreshes += 1
+                self._refresh_in_background(key, compute)
+                return record["value"], "early_refresh"
+            self.hits += 1
+            return record["value"], "hit"
+
+        (value, status), shared = await self._single_flight.run(
+            key, lambda: self._fill(key, compute)
+        )
+        if shared:
+            self.coalesced += 1
+            return value, "coalesced"
+        return value, status
+
+    async def invalidate(self, key):
+        key = self.make_key(key)
+        try:
+            await self.redis_client.delete(key)
+        except redis.RedisError as e:
+            self.redis_errors += 1
+            logger.warning("Redis delete failed for %s: %s", key, e)
+
+    async def close(self):
+        """Wait for background refreshes to finish."""
+        if self._refreshing:
+            await asyncio.gather(
+                *self._refreshing.values(), return_exceptions=True
+            )
+
+    def _refresh_early(self, record, now):
+        if self.beta <= 0:
+            return False
+        # XFetch: -log(u) is exponentially distributed, so the head start
+        # is usually small but occasionally a few compute times long
+        head_start = (
+            -record["delta"] * self.beta * math.log(1.0 - random.random())
+        )
+        return now + head_start >= record["fresh_until"]
+
+    # --- Filling and refreshing ---
+    async def _fill(self, key, compute):
+        """Compute under the key's lock, or take the lock holder's result."""
+        token = await self._acquire_lock(key)
+        if token is None:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.lock_ttl
+            while token is None and loop.time() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                record = await self._read(key)
+                if record is not None:
+                    self.waited += 1
+                    return record["value"], "waited"
+                # The holder may have failed and released the lock
+                token = await self._acquire_lock(key)
+            # If the holder is still busy, stop waiting and compute anyway
+        try:
+            self.misses += 1
+            return await self._compute_and_store(key, compute), "miss"
+        finally:
+            if token is not None:
+                await self._release_lock(key, token)
+
+    def _refresh_in_background(self, key, compute):
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, compute))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self, key, compute):
+        token = await self._acquire_lock(key)
+        if token is None:
+            # Another process is already refreshing this key
+            return
+        try:
+            await self._compute_and_store(key, compute)
+            self.refreshes += 1
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.warning("Background refresh failed for %s: %s", key, e)
+        finally:
+            await self._release_lock(key, token)
+
+    async def _compute_and_store(self, key, compute):
+        started = self.clock()
+        value = await compute()
+        if value is None:
+            return None
+        now = self.clock()
+        record = json.dumps(
+            {
+                "value": value,
+                "fresh_until": now + self.ttl,
+                # How long compute took, for early expiration
+                "delta": now - started,
+            }
+        )
+        try:
+            await self.redis_client.set(
+                key, record, ex=max(1, math.ceil(self.ttl + self.stale_ttl))
+            )
+        except redis.RedisError as e:
+            self.redis_errors += 1
+            logger.warning("Redis set failed for %s: %s", key, e)
+        return value
+
+    # --- Redis access ---
+    async def _read(self, key):
+        try:
+            raw = await self.redis_client.get(key)
+        except redis.RedisError as e:
+            self.redis_errors += 1
+            logger.warning("Redis get failed for %s: %s", key, e)
+            return None
+        if raw is None:
+            return None
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict) or not RECORD_FIELDS <= set(record):
+            # Written in another format (e.g. before this layer); recompute
+            return None
+        return record
+
+    async def _acquire_lock(self, key):
+        """
+        Return a token if this caller now holds the key's lock, or None if
+        another holds it. If Redis fails, proceed as if it was acquired.
+        """
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis_client.set(
+                f"{key}:lock", token, nx=True, px=int(self.lock_ttl * 1000)
+            )
+        except redis.RedisError as e:
+            self.redis_errors += 1
+            logger.warning("Redis lock failed for %s: %s", key, e)
+            return token
+        return token if acquired else None
+
+    async def _release_lock(self, key, token):
+        # Delete only if still ours: the lock may have expired and been
+        # taken by someone else. WATCH makes the check-and-delete atomic.
+        lock_key = f"{key}:lock"
+        try:
+            async with self.redis_client.pipeline() as pipe:
+                await pipe.watch(lock_key)
+                held = await pipe.get(lock_key)
+                if isinstance(held, bytes):
+                    held = held.decode()
+                if held == token:
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    await pipe.execute()
+                else:
+                    await pipe.unwatch()
+        except redis.WatchError:
+            pass
+        except redis.RedisError as e:
+            self.redis_errors += 1
+            logger.warning("Redis unlock failed for %s: %s", key, e)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "early_refreshes": self.early_refreshes,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "waited": self.waited,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": len(self._refreshing),
+            "redis_errors": self.redis_errors,
+        }
@@ -0,0 +1,36 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one computation.
+
+    `run(key, compute)` awaits the `compute` coroutine function once for
+    all callers that arrive while it is in flight, and returns
+    `(result, shared)`, where `shared` is True for the callers that joined
+    another's call. Errors are raised to every caller.
+
+    The computation runs in a task of its own that each caller awaits
+    through `asyncio.shield`, so a caller being cancelled (e.g. on a
+    client disconnect) only stops its own wait: the others, including
+    ones that arrive later, still get the result.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+
+    async def run(self, key, compute):
+        task = self._inflight.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # If every caller went away, nobody else retrieves the error
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,180 @@
+import threading
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from common.db_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+        self.conn.status = extensions.TRANSACTION_STATUS_INTRANS
+
+
+class FakeConnection:
+    """Just enough of a psycopg2 connection for the pool."""
+
+    def __init__(self, number):
+        self.number = number
+        self.closed = 0
+        self.broken = False
+        self.rollbacks = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+        return self.status
+
+    def rollback(self):
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeConnect:
+    def __init__(self):
+        self.connections = []
+
+    def __call__(self):
+        conn = FakeConnection(len(self.connections))
+        self.connections.append(conn)
+        return conn
+
+
+def make_pool(**kwargs):
+    connect = FakeConnect()
+    return ConnectionPool(connect, **kwargs), connect
+
+
+def test_exhausted_pool_times_out():
+    """Tests that acquire waits for a free connection, then gives up."""
+    pool, connect = make_pool(max_size=2)
+    held = [pool.acquire(), pool.acquire()]
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+
+    # A connection released while waiting is handed to the waiter
+    timer = threading.Timer(0.05, pool.release, [held[0]])
+    timer.start()
+    assert pool.acquire(timeout=5) is held[0]
+    timer.join()
+
+    stats = pool.stats()
+    assert (stats["size"], stats["in_use"], stats["created"]) == (2, 2, 2)
+    assert (stats["timeouts"], stats["waits"]) == (1, 2)
+    assert len(connect.connections) == 2
+
+
+def test_connection_is_released_when_the_caller_raises():
+    """Tests that `connection()` rolls back and returns on an exception."""
+    pool, connect = make_pool(max_size=1)
+
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("UPDATE items SET name = 'x';")
+            raise ValueError("handler failed")
+
+    assert conn.rollbacks == 1
+    assert pool.stats()["in_use"] == 0
+    with pool.connection(timeout=0) as again:
+        assert again is conn
+
+
+def test_close_with_connections_in_use():
+    """Tests that close() closes idle connections and in-use ones later."""
+    pool, connect = make_pool(min_size=2, max_size=2)
+    pool.open()
+    in_use = pool.acquire()
+    idle = next(c for c in connect.connections if c is not in_use)
+
+    pool.close()
+
+    assert idle.closed and not in_use.closed
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    pool.release(in_use)
+    assert in_use.closed
+    stats = pool.stats()
+    assert (stats["size"], stats["idle"], stats["in_use"]) == (0, 0, 0)
+
+
+def test_close_wakes_waiters():
+    """Tests that a thread waiting for a connection fails on close()."""
+    pool, _ = make_pool(max_size=1)
+    pool.acquire()
+    errors = []
+
+    def wait():
+        try:
+            pool.acquire(timeout=5)
+        except Exception as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    threading.Timer(0.05, pool.close).start()
+    waiter.join(timeout=2)
+
+    assert not waiter.is_alive()
+    assert [type(e) for e in errors] == [RuntimeError]
+
+
+def test_broken_connections_are_replaced():
+    """Tests that dead idle connections are swapped for new ones."""
+    pool, connect = make_pool(max_size=1, health_check_interval=0)
+    first = pool.acquire()
+    pool.release(first)
+
+    # The server went away while the connection sat idle
+    first.broken = True
+    second = pool.acquire()
+    assert second is not first and first.closed
+    assert not second.broken
+
+    # Broken while in use: discarded on release, not put back
+    second.broken = True
+    pool.release(second)
+    third = pool.acquire()
+    assert third is not second and second.closed
+
+    stats = pool.stats()
+    assert (stats["created"], stats["discarded"], stats["size"]) == (3, 2, 1)
+
+
+def test_failed_connect_frees_its_slot():
+    """Tests that a connect error doesn't leak pool capacity."""
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise psycopg2.OperationalError("could not connect")
+        return FakeConnection(len(attempts))
+
+    pool = ConnectionPool(connect, max_size=1)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.acquire()
+
+    assert pool.acquire(timeout=0).number == 2
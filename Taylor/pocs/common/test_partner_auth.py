@@ -0,0 +1,105 @@
+import asyncio
+
+from common.partner_auth import PartnerAuthenticator
+
+PARTNER = {"id": 1, "name": "Acme"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDirectory:
+    """Partners by API key, counting lookups."""
+
+    def __init__(self, partners):
+        self.partners = dict(partners)
+        self.calls = 0
+
+    def __call__(self, api_key):
+        self.calls += 1
+        return self.partners.get(api_key)
+
+
+def test_hits_expire_after_ttl():
+    """Tests that a cached partner is looked up again once the TTL ends."""
+    clock = FakeClock()
+    directory = FakeDirectory({"key": PARTNER})
+    auth = PartnerAuthenticator(directory, ttl=60, clock=clock)
+
+    assert auth.authenticate("key") == PARTNER
+    clock.now += 59
+    assert auth.authenticate("key") == PARTNER
+    assert directory.calls == 1
+
+    clock.now += 2
+    assert auth.authenticate("key") == PARTNER
+    assert directory.calls == 2
+
+
+def test_misses_use_the_shorter_negative_ttl():
+    """Tests that unknown keys are cached for negative_ttl only."""
+    clock = FakeClock()
+    directory = FakeDirectory({})
+    auth = PartnerAuthenticator(directory, ttl=60, negative_ttl=5, clock=clock)
+
+    assert auth.authenticate("unknown") is None
+    assert auth.authenticate("unknown") is None
+    assert directory.calls == 1
+
+    clock.now += 6
+    # Created since: found once the negative entry expires
+    directory.partners["unknown"] = PARTNER
+    assert auth.authenticate("unknown") == PARTNER
+    assert auth.stats()["negative_hits"] == 1
+
+
+def test_revoked_key_stops_authenticating_after_invalidate():
+    """Tests that invalidate() drops a cached partner immediately."""
+    clock = FakeClock()
+    directory = FakeDirectory({"key": PARTNER})
+    auth = PartnerAuthenticator(directory, ttl=60, clock=clock)
+    assert auth.authenticate("key") == PARTNER
+
+    del directory.partners["key"]
+    # Still cached until this worker is told about the revocation
+    assert auth.authenticate("key") == PARTNER
+    auth.invalidate("key")
+
+    assert auth.authenticate("key") is None
+    assert auth.stats()["entries"] == 1
+
+
+def test_lookup_racing_invalidate_is_not_cached():
+    """Tests that a lookup started before invalidate() isn't cached."""
+    directory = FakeDirectory({"key": PARTNER})
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_lookup(api_key):
+        partner = directory(api_key)
+        started.set()
+        await release.wait()
+        return partner
+
+    auth = PartnerAuthenticator(slow_lookup, ttl=60, clock=FakeClock())
+
+    async def run():
+        racing = asyncio.ensure_future(auth.authenticate_async("key"))
+        await started.wait()
+        # Revoked while the lookup that read the old row is in flight
+        del directory.partners["key"]
+        auth.invalidate("key")
+        release.set()
+        stale = await racing
+        return stale, await auth.authenticate_async("key")
+
+    stale, after = asyncio.run(run())
+
+    assert stale == PARTNER
+    assert after is None
+    assert directory.calls == 2
@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+import pytest
+import redis.asyncio
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from common.redis_cache import RedisCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingCompute:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"version": self.calls}
+
+
+def test_miss_then_hit():
+    """Tests that a computed value is served from Redis afterwards."""
+    cache = RedisCache(fakeredis.FakeAsyncRedis(), beta=0)
+    compute = CountingCompute()
+
+    async def run():
+        first = await cache.get_or_compute("a", compute)
+        second = await cache.get_or_compute("a", compute)
+        return first, second
+
+    assert asyncio.run(run()) == (
+        ({"version": 1}, "miss"),
+        ({"version": 1}, "hit"),
+    )
+    assert compute.calls == 1
+
+
+def test_stampede_across_workers_computes_once():
+    """Tests that concurrent cold misses in two workers compute once."""
+    # Which callers coalesce, wait on the lock or find the value already
+    # written depends on scheduling; only the invariants are checked
+    server = fakeredis.FakeServer()
+    worker_a = RedisCache(fakeredis.FakeAsyncRedis(server=server))
+    worker_b = RedisCache(fakeredis.FakeAsyncRedis(server=server))
+    compute = CountingCompute(delay=0.1)
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                worker.get_or_compute("a", compute)
+                for worker in [worker_a, worker_b] * 10
+            )
+        )
+
+    results = asyncio.run(run())
+    assert compute.calls == 1
+    assert all(value == {"version": 1} for value, _ in results)
+    statuses = [status for _, status in results]
+    assert statuses.count("miss") == 1
+    assert set(statuses) <= {"miss", "waited", "coalesced", "hit"}
+    # Each worker computed or waited at most once; the rest coalesced
+    for worker in (worker_a, worker_b):
+        stats = worker.stats()
+        assert stats["misses"] + stats["waited"] <= 1
+
+
+def test_stale_while_revalidate():
+    """Tests that expired values are served while one task refreshes."""
+    clock = FakeClock()
+    cache = RedisCache(fakeredis.FakeAsyncRedis(), ttl=10, beta=0, clock=clock)
+    compute = CountingCompute(delay=0.05)
+
+    async def run():
+        await cache.get_or_compute("a", compute)
+        clock.now += 11
+        stale = await asyncio.gather(
+            *(cache.get_or_compute("a", compute) for _ in range(5))
+        )
+        await cache.close()
+        fresh = await cache.get_or_compute("a", compute)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(run())
+    assert stale == [({"version": 1}, "stale")] * 5
+    assert fresh == ({"version": 2}, "hit")
+    assert compute.calls == 2
+
+
+def test_early_expiration():
+    """Tests that beta controls refreshing shortly before expiry."""
+    clock = FakeClock()
+    compute = CountingCompute()
+
+    async def status_near_expiry(beta):
+        cache = RedisCache(
+            fakeredis.FakeAsyncRedis(), ttl=10, beta=beta, clock=clock
+        )
+        await cache.get_or_compute("a", compute)
+        clock.now += 9.9
+        # Make the recorded compute time long enough to always trigger
+        key = cache.make_key("a")
+        record = await cache._read(key)
+        record["delta"] = 1000.0
+        await cache.redis_client.set(key, json.dumps(record))
+        _, status = await cache.get_or_compute("a", compute)
+        await cache.close()
+        return status
+
+    assert asyncio.run(status_near_expiry(beta=1.0)) == "early_refresh"
+    assert asyncio.run(status_near_expiry(beta=0)) == "hit"
+
+
+def test_none_is_not_cached():
+    """Tests that None results are recomputed on every call."""
+    cache = RedisCache(fakeredis.FakeAsyncRedis())
+
+    async def compute():
+        return None
+
+    async def run():
+        first = await cache.get_or_compute("missing", compute)
+        second = await cache.get_or_compute("missing", compute)
+        return first, second
+
+    assert asyncio.run(run()) == ((None, "miss"), (None, "miss"))
+
+
+def test_redis_failure_falls_back_to_compute():
+    """Tests that a broken Redis degrades to computing every time."""
+    # Nothing listens on port 1
+    cache = RedisCache(redis.asyncio.Redis(port=1, retry=None))
+    compute = CountingCompute()
+
+    async def run():
+        await cache.get_or_compute("a", compute)
+        return await cache.get_or_compute("a", compute)
+
+    assert asyncio.run(run()) == ({"version": 2}, "miss")
+    assert cache.stats()["redis_errors"] > 0
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from common.single_flight import SingleFlight
+
+
+class CountingCompute:
+    def __init__(self, delay=0.0, error=None):
+        self.calls = 0
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return call
+
+
+def test_concurrent_calls_share_one_computation():
+    """Tests that callers arriving while a call is in flight share it."""
+    flight = SingleFlight()
+    compute = CountingCompute(delay=0.05)
+
+    async def run():
+        results = await asyncio.gather(
+            *(flight.run("a", compute) for _ in range(5)),
+            flight.run("b", compute),
+        )
+        # Once finished, the next call computes again
+        return results, await flight.run("a", compute)
+
+    results, later = asyncio.run(run())
+
+    assert sorted(results[:5]) == [(1, False)] + [(1, True)] * 4
+    assert results[5] == (2, False)
+    assert later == (3, False)
+    assert flight._inflight == {}
+
+
+def test_errors_reach_every_caller():
+    """Tests that a failed computation raises in all its callers."""
+    flight = SingleFlight()
+    compute = CountingCompute(delay=0.05, error=ValueError("boom"))
+
+    async def run():
+        return await asyncio.gather(
+            *(flight.run("a", compute) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+
+    assert [type(result) for result in results] == [ValueError] * 3
+    assert compute.calls == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    """Tests that the first caller being cancelled leaves the rest waiting."""
+    flight = SingleFlight()
+    compute = CountingCompute(delay=0.05)
+
+    async def run():
+        first = asyncio.ensure_future(flight.run("a", compute))
+        await asyncio.sleep(0)
+        rest = [asyncio.ensure_future(flight.run("a", compute))]
+        await asyncio.sleep(0)
+        first.cancel()
+        # Joins after the first caller is gone, still the same computation
+        rest.append(asyncio.ensure_future(flight.run("a", compute)))
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await asyncio.gather(*rest)
+
+    assert asyncio.run(run()) == [(1, True), (1, True)]
+    assert compute.calls == 1
+
+
+def test_error_without_callers_is_retrieved():
+    """Tests that a failure nobody waits for anymore isn't left unhandled."""
+    flight = SingleFlight()
+    compute = CountingCompute(delay=0.01, error=ValueError("boom"))
+    handled = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: handled.append(context)
+        )
+        caller = asyncio.ensure_future(flight.run("a", compute))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+
+    assert compute.calls == 1
+    assert handled == []
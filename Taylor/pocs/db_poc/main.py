@@ -1,11 +1,25 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, status
+from fastapi.responses import JSONResponse
+import asyncio
+import os
+import sys
 import uuid
+import asyncpg
 import psycopg2
-from psycopg2.extras import RealDictCursor
-import time
-import redis
-import json
+import redis.asyncio
+from datetime import datetime, timezone
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from partitions import PredictionRequestPartitions
+from repository import AsyncPartnerRepository, PartnerRepository
+
+# Shared PoC modules live in pocs/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.async_db import AsyncConnectionPool, ThreadpoolProxy  # noqa: E402
+from common.db_pool import ConnectionPool, PoolTimeoutError  # noqa: E402
+from common.partner_auth import PartnerAuthenticator  # noqa: E402
+from common.redis_cache import RedisCache  # noqa: E402
 
 # Database connection settings
 DB_NAME = "taylor"
@@ -14,70 +28,235 @@ DB_PASSWORD = "mysecretpassword"
 DB_HOST = "localhost"
 DB_PORT = "5432"
 
+# Connection pool settings
+DB_POOL_MIN_SIZE = 2
+DB_POOL_MAX_SIZE = 20
+DB_POOL_ACQUIRE_TIMEOUT = 5.0
+
+# "sync": blocking psycopg2 on Starlette's threadpool
+# "async": asyncpg with prepared statements on the event loop
+DB_MODE = os.getenv("DB_MODE", "sync")
+if DB_MODE not in ("sync", "async"):
+    raise ValueError(f"Unsupported DB_MODE: {DB_MODE}")
+
+# PredictionRequests partitioning: monthly partitions are created ahead of
+# time and removed ("drop", or "detach" into the archive schema) once they
+# fall out of the retention window. Rows outside every monthly partition
+# wait in a default partition until the next maintenance run
+PARTITION_PREMAKE_MONTHS = 3
+PARTITION_RETENTION_MONTHS = 12
+PARTITION_RETENTION_ACTION = "drop"
+PARTITION_MAINTENANCE_INTERVAL = 3600
+
 # Redis connection settings
 REDIS_HOST = "localhost"
 REDIS_PORT = 6379
 REDIS_DB = 0
 
+# Partner lookup cache settings (seconds)
+PARTNER_CACHE_TTL = 300
+PARTNER_NEGATIVE_CACHE_TTL = 5
+
+# Profile summaries read the incrementally maintained PartnerRequestCounts.
+# A cached summary is fresh for PROFILE_SUMMARY_TTL, then served stale for
+# at most PROFILE_SUMMARY_STALE_TTL while one background task refreshes
+# it, so it lags the logged requests by at most the sum of the two plus
+# the audit writer's flush interval.
+PROFILE_SUMMARY_TTL = 10
+PROFILE_SUMMARY_STALE_TTL = 30
+
+# Reconciliation recounts every partner from the log to repair drift from
+# writers other than the audit writer, and backfills counters for requests
+# logged before they existed. Each run reads the whole log, so it is off
+# (0) unless an interval in seconds is set.
+REQUEST_COUNT_RECONCILE_INTERVAL = float(
+    os.getenv("REQUEST_COUNT_RECONCILE_INTERVAL", "0")
+)
+
 # FastAPI app initialization
 app = FastAPI()
 
-# Connect to Redis
-redis_client = redis.Redis(
+# Connect to Redis (asyncio client: handlers run on the event loop)
+redis_client = redis.asyncio.Redis(
     host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True
 )
 
+# Stampede-protected read-through cache for profile summaries
+profile_cache = RedisCache(
+    redis_client,
+    ttl=PROFILE_SUMMARY_TTL,
+    stale_ttl=PROFILE_SUMMARY_STALE_TTL,
+    key_prefix="profile_summary",
+)
+
 
-def get_db_connection():
-    conn = psycopg2.connect(
+def connect():
+    return psycopg2.connect(
         dbname=DB_NAME,
         user=DB_USER,
         password=DB_PASSWORD,
         host=DB_HOST,
         port=DB_PORT,
     )
-    return conn
+
+
+if DB_MODE == "async":
+    db_pool = AsyncConnectionPool(
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+        host=DB_HOST,
+        port=int(DB_PORT),
+        database=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+    )
+    partners = AsyncPartnerRepository(db_pool)
+else:
+    db_pool = ConnectionPool(
+        connect,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+    )
+    # Same coroutine interface; each query runs on the threadpool
+    partners = ThreadpoolProxy(PartnerRepository(db_pool))
+
+DATABASE_ERRORS = (psycopg2.Error, asyncpg.PostgresError)
+
+# DDL and retention run on their own short-lived connections in both modes
+prediction_partitions = PredictionRequestPartitions(
+    connect,
+    premake_months=PARTITION_PREMAKE_MONTHS,
+    retention_months=PARTITION_RETENTION_MONTHS,
+    retention_action=PARTITION_RETENTION_ACTION,
+)
+
+
+@app.exception_handler(PoolTimeoutError)
+@app.exception_handler(psycopg2.OperationalError)
+@app.exception_handler(asyncpg.PostgresConnectionError)
+@app.exception_handler(ConnectionError)
+def database_unavailable(request, exc):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": f"Database unavailable: {exc}"},
+    )
+
+
+# The database is only queried on an auth cache miss
+partner_auth = PartnerAuthenticator(
+    partners.get_by_api_key,
+    ttl=PARTNER_CACHE_TTL,
+    negative_ttl=PARTNER_NEGATIVE_CACHE_TTL,
+)
+
+
+async def open_pool():
+    if DB_MODE == "async":
+        await db_pool.open()
+    else:
+        await run_in_threadpool(db_pool.open)
 
 
 @app.on_event("startup")
-def startup_event():
-    conn = None
-    while conn is None:
+async def startup_event():
+    while True:
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            # Create Partners table
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Partners (
-                    partner_id SERIAL PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    api_key VARCHAR(255) UNIQUE NOT NULL,
-                    created_at TIMESTAMP WITH TIME ZONE
-                        DEFAULT CURRENT_TIMESTAMP
-                );
-            """
-            )
-            # Create PredictionRequests table
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS PredictionRequests (
-                    request_id SERIAL PRIMARY KEY,
-                    partner_id INTEGER REFERENCES Partners(partner_id),
-                    input_data JSONB,
-                    prediction_output JSONB,
-                    requested_at TIMESTAMP WITH TIME ZONE
-                        DEFAULT CURRENT_TIMESTAMP
-                );
-            """
-            )
-            conn.commit()
-            cursor.close()
-            conn.close()
-            print("Database tables are ready.")
-        except psycopg2.OperationalError as e:
+            await open_pool()
+            break
+        except (
+            psycopg2.OperationalError,
+            asyncpg.PostgresError,
+            OSError,
+        ) as e:
             print(f"Database connection failed: {e}")
-            time.sleep(5)
+            await asyncio.sleep(5)
+
+    await partners.create_schema()
+    await run_in_threadpool(prediction_partitions.ensure_schema)
+    print(f"Database tables are ready ({DB_MODE} mode).")
+
+
+# --- Partition maintenance ---
+async def maintain_partitions_forever():
+    while True:
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL)
+        try:
+            await run_in_threadpool(prediction_partitions.maintain)
+        except DATABASE_ERRORS + (PoolTimeoutError, OSError) as e:
+            print(f"Partition maintenance failed: {e}")
+
+
+@app.on_event("startup")
+async def start_partition_maintenance():
+    app.state.partition_maintainer = asyncio.create_task(
+        maintain_partitions_forever()
+    )
+
+
+@app.on_event("shutdown")
+async def stop_partition_maintenance():
+    app.state.partition_maintainer.cancel()
+    try:
+        await app.state.partition_maintainer
+    except asyncio.CancelledError:
+        pass
+
+
+# --- Request counter reconciliation ---
+reconciliation = {
+    "runs": 0,
+    "corrected": 0,
+    "failures": 0,
+    "last_run_at": None,
+}
+
+
+async def reconcile_request_counts_forever():
+    while True:
+        try:
+            corrected = await partners.reconcile_request_counts()
+            reconciliation["runs"] += 1
+            reconciliation["corrected"] += corrected
+            reconciliation["last_run_at"] = datetime.now(
+                timezone.utc
+            ).isoformat()
+            if corrected:
+                print(f"Reconciled request counts for {corrected} partners.")
+        except DATABASE_ERRORS + (PoolTimeoutError, OSError) as e:
+            reconciliation["failures"] += 1
+            print(f"Request count reconciliation failed: {e}")
+        await asyncio.sleep(REQUEST_COUNT_RECONCILE_INTERVAL)
+
+
+@app.on_event("startup")
+async def start_reconciliation():
+    app.state.reconciler = None
+    if REQUEST_COUNT_RECONCILE_INTERVAL > 0:
+        app.state.reconciler = asyncio.create_task(
+            reconcile_request_counts_forever()
+        )
+
+
+@app.on_event("shutdown")
+async def stop_reconciliation():
+    if app.state.reconciler is None:
+        return
+    app.state.reconciler.cancel()
+    try:
+        await app.state.reconciler
+    except asyncio.CancelledError:
+        pass
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await profile_cache.close()
+    if DB_MODE == "async":
+        await db_pool.close()
+    else:
+        db_pool.close()
 
 
 # Pydantic models
@@ -105,32 +284,19 @@ class ProfileSummary(BaseModel):
 @app.post(
     "/partners/", response_model=Partner, status_code=status.HTTP_201_CREATED
 )
-def create_partner(partner: PartnerCreate, conn=Depends(get_db_connection)):
+async def create_partner(partner: PartnerCreate):
     api_key = str(uuid.uuid4())
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
     try:
-        cursor.execute(
-            "INSERT INTO Partners (name, api_key) VALUES (%s, %s) RETURNING *;",
-            (partner.name, api_key),
-        )
-        new_partner = cursor.fetchone()
-        conn.commit()
-        return new_partner
-    except psycopg2.Error as e:
-        conn.rollback()
+        new_partner = await partners.create(partner.name, api_key)
+    except DATABASE_ERRORS as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
-    finally:
-        cursor.close()
-        conn.close()
+    return new_partner
 
 
 @app.get("/partners/{api_key}", response_model=Partner)
-def get_partner_by_api_key(api_key: str, conn=Depends(get_db_connection)):
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute("SELECT * FROM Partners WHERE api_key = %s;", (api_key,))
-    db_partner = cursor.fetchone()
-    cursor.close()
-    conn.close()
+async def get_partner_by_api_key(api_key: str):
+    # Served from the auth cache; the database is only hit on a miss
+    db_partner = await partner_auth.authenticate_async(api_key)
     if not db_partner:
         raise HTTPException(status_code=404, detail="Partner not found")
     return db_partner
@@ -140,55 +306,23 @@ def get_partner_by_api_key(api_key: str, conn=Depends(get_db_connection)):
     "/partners/{partner_id}/profile_summary",
     response_model=ProfileSummary,
 )
-def get_profile_summary(partner_id: int, conn=Depends(get_db_connection)):
-    cache_key = f"profile_summary:{partner_id}"
+async def get_profile_summary(partner_id: int):
+    async def compute_summary():
+        # Read the partner's maintained counter; None if it doesn't exist
+        return await partners.profile_summary(partner_id)
 
-    # Try to get from cache
-    cached_summary = redis_client.get(cache_key)
-
-    if cached_summary:
-        summary_data = json.loads(cached_summary)
-        summary_data["cache_status"] = "hit"
-        return summary_data
-
-    # If cache miss, fetch from DB and compute
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
     try:
-        # Fetch partner details
-        cursor.execute(
-            "SELECT * FROM Partners WHERE partner_id = %s;", (partner_id,)
+        summary, cache_status = await profile_cache.get_or_compute(
+            partner_id, compute_summary
         )
-        partner_data = cursor.fetchone()
-        if not partner_data:
-            raise HTTPException(status_code=404, detail="Partner not found")
-
-        # Fetch prediction request count
-        cursor.execute(
-            "SELECT COUNT(*) as total_requests "
-            "FROM PredictionRequests WHERE partner_id = %s;",
-            (partner_id,),
-        )
-        request_count = cursor.fetchone()
-
-        summary = {
-            "partner_id": partner_data["partner_id"],
-            "name": partner_data["name"],
-            "total_requests": request_count["total_requests"],
-            "cache_status": "miss",
-        }
-
-        # Store in cache with a 60-second TTL
-        redis_client.set(cache_key, json.dumps(summary), ex=60)
-
-        return summary
-
-    except psycopg2.Error as e:
+    except DATABASE_ERRORS as e:
         raise HTTPException(
             status_code=500, detail=f"Database error: {e}"
         ) from e
-    finally:
-        cursor.close()
-        conn.close()
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Partner not found")
+
+    return {**summary, "cache_status": cache_status}
 
 
 @app.get("/health")
@@ -196,6 +330,18 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/stats")
+def stats():
+    return {
+        "db_mode": DB_MODE,
+        "partner_auth": partner_auth.stats(),
+        "request_count_reconciliation": reconciliation,
+        "profile_cache": profile_cache.stats(),
+        "prediction_partitions": prediction_partitions.stats(),
+        "db_pool": db_pool.stats(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
 
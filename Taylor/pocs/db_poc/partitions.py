@@ -0,0 +1,391 @@
+import logging
+from datetime import datetime, timezone
+
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+PARENT = "predictionrequests"
+DEFAULT_PARTITION = f"{PARENT}_default"
+ARCHIVE_SCHEMA = "archive"
+
+CREATE_PARENT = """
+    CREATE TABLE IF NOT EXISTS PredictionRequests (
+        request_id BIGSERIAL,
+        partner_id INTEGER REFERENCES Partners(partner_id),
+        input_data JSONB,
+        prediction_output JSONB,
+        requested_at TIMESTAMP WITH TIME ZONE NOT NULL
+            DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (request_id, requested_at)
+    ) PARTITION BY RANGE (requested_at);
+"""
+# Defined on the parent, so every partition gets its own copy
+CREATE_INDEX = """
+    CREATE INDEX IF NOT EXISTS predictionrequests_partner_time_idx
+        ON PredictionRequests (partner_id, requested_at);
+"""
+# Catches rows no monthly partition covers (a skewed clock, a backfill),
+# so they don't fail the audit writer's whole batch; `maintain` moves them
+# into monthly partitions
+CREATE_DEFAULT_PARTITION = f"""
+    CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION}
+        PARTITION OF PredictionRequests DEFAULT;
+"""
+DEFAULT_PARTITION_MONTHS = f"""
+    SELECT DISTINCT date_trunc('month', requested_at, 'UTC')
+    FROM {DEFAULT_PARTITION};
+"""
+# Monthly tables in this schema that are no longer partitions: detached by
+# a retention run that stopped before finishing with them
+DETACHED_PARTITIONS = f"""
+    SELECT relname FROM pg_class
+    WHERE relnamespace = current_schema()::regnamespace
+        AND relkind = 'r' AND NOT relispartition
+        AND relname LIKE '{PARENT}\\_p%'
+    ORDER BY relname;
+"""
+ARCHIVE_COUNTS = """
+    INSERT INTO PartnerRequestCounts (partner_id, archived_requests)
+    VALUES %s
+    ON CONFLICT (partner_id) DO UPDATE SET archived_requests =
+        PartnerRequestCounts.archived_requests + EXCLUDED.archived_requests;
+"""
+
+
+def month_start(moment):
+    """First instant of `moment`'s month; partitions are UTC months."""
+    moment = moment.astimezone(timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month):
+    return f"{PARENT}_p{month:%Y%m}"
+
+
+def expired_partitions(names, current, retention_months):
+    """
+    The monthly partitions in `names` that ended more than
+    `retention_months` before the month starting at `current`. Names that
+    aren't monthly partitions are left alone.
+    """
+    cutoff = add_months(current, -retention_months)
+    expired = []
+    for name in names:
+        try:
+            month = datetime.strptime(
+                name[len(f"{PARENT}_p") :], "%Y%m"
+            ).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        if name == partition_name(month) and add_months(month, 1) <= cutoff:
+            expired.append(name)
+    return expired
+
+
+class PredictionRequestPartitions:
+    """
+    Manages `PredictionRequests` as a table range-partitioned by month of
+    `requested_at`, with a `(partner_id, requested_at)` index.
+
+    `ensure_schema` creates the partitioned table and its default
+    partition, converting a plain table left by earlier versions.
+    `maintain` creates partitions for the current month and
+    `premake_months` ahead, plus any month with rows in the default
+    partition (moving them over), and removes partitions that ended more
+    than `retention_months` ago. A removed partition is detached, which
+    locks the parent only briefly, then dropped or, with
+    `retention_action="detach"`, moved to the `archive` schema. Either way
+    it is a metadata operation, not a bulk DELETE. Before it is dropped or
+    moved, its per-partner row counts are added to
+    `PartnerRequestCounts.archived_requests`, so totals survive
+    retention.
+
+    Uses its own psycopg2 connections from `connect`, since this is
+    occasional DDL work that runs off the request path.
+    """
+
+    def __init__(
+        self,
+        connect,
+        premake_months=3,
+        retention_months=12,
+        retention_action="drop",
+        lock_timeout=5.0,
+        clock=lambda: datetime.now(timezone.utc),
+    ):
+        if retention_action not in ("drop", "detach"):
+            raise ValueError(
+                f"Unsupported retention action: {retention_action}"
+            )
+        self.connect = connect
+        self.premake_months = premake_months
+        self.retention_months = retention_months
+        self.retention_action = retention_action
+        self.lock_timeout = lock_timeout
+        self.clock = clock
+        # Stats
+        self.created = 0
+        self.moved_from_default = 0
+        self.removed = 0
+        self.last_maintained_at = None
+
+    def ensure_schema(self):
+        conn = self.connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT relkind FROM pg_class "
+                    "WHERE oid = to_regclass('predictionrequests');"
+                )
+                row = cursor.fetchone()
+                if row is not None and row[0] == "r":
+                    self._migrate_plain_table(cursor)
+                else:
+                    cursor.execute(CREATE_PARENT)
+                    cursor.execute(CREATE_INDEX)
+                    cursor.execute(CREATE_DEFAULT_PARTITION)
+            conn.commit()
+        finally:
+            conn.close()
+        self.maintain()
+
+    def maintain(self):
+        """Create upcoming partitions and apply retention."""
+        current = month_start(self.clock())
+        conn = self.connect()
+        try:
+            with conn.cursor() as cursor:
+                # Creating or removing a partition locks the parent
+                # exclusively, and inserts queue behind a waiting request;
+                # give up on a busy table and retry on the next run
+                cursor.execute(
+                    "SET lock_timeout = %s;", (f"{self.lock_timeout}s",)
+                )
+                cursor.execute(DEFAULT_PARTITION_MONTHS)
+                months = {month_start(month) for (month,) in cursor.fetchall()}
+                months.update(
+                    add_months(current, offset)
+                    for offset in range(self.premake_months + 1)
+                )
+                for month in sorted(months):
+                    if self._create_partition(cursor, month):
+                        self.created += 1
+            conn.commit()
+
+            for name in expired_partitions(
+                self._detached_names(conn), current, self.retention_months
+            ):
+                self._retire_partition(conn, name)
+            for name in expired_partitions(
+                self._partition_names(conn), current, self.retention_months
+            ):
+                self._detach_partition(conn, name)
+                self._retire_partition(conn, name)
+        finally:
+            conn.close()
+        self.last_maintained_at = self.clock().isoformat()
+
+    # --- Helpers ---
+    def _create_partition(self, cursor, month):
+        name = partition_name(month)
+        cursor.execute("SELECT to_regclass(%s);", (name,))
+        if cursor.fetchone()[0] is not None:
+            return False
+        partition = sql.Identifier(name)
+        bounds = (month, add_months(month, 1))
+        cursor.execute(
+            sql.SQL(
+                "SELECT EXISTS (SELECT 1 FROM {} "
+                "WHERE requested_at >= %s AND requested_at < %s);"
+            ).format(sql.Identifier(DEFAULT_PARTITION)),
+            bounds,
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                sql.SQL(
+                    "CREATE TABLE {} PARTITION OF PredictionRequests "
+                    "FOR VALUES FROM (%s) TO (%s);"
+                ).format(partition),
+                bounds,
+            )
+            logger.info("Created partition %s", name)
+            return True
+
+        # A new range can't overlap rows in the default partition, so
+        # they are moved to a standalone table which is then attached
+        cursor.execute(
+            sql.SQL(
+                "CREATE TABLE {} (LIKE PredictionRequests INCLUDING DEFAULTS);"
+            ).format(partition)
+        )
+        cursor.execute(
+            sql.SQL(
+                "WITH moved AS (DELETE FROM {} "
+                "WHERE requested_at >= %s AND requested_at < %s "
+                "RETURNING *) INSERT INTO {} SELECT * FROM moved;"
+            ).format(sql.Identifier(DEFAULT_PARTITION), partition),
+            bounds,
+        )
+        moved = cursor.rowcount
+        cursor.execute(
+            sql.SQL(
+                "ALTER TABLE PredictionRequests ATTACH PARTITION {} "
+                "FOR VALUES FROM (%s) TO (%s);"
+            ).format(partition),
+            bounds,
+        )
+        self.moved_from_default += moved
+        logger.info(
+            "Created partition %s with %d rows from %s",
+            name,
+            moved,
+            DEFAULT_PARTITION,
+        )
+        return True
+
+    def _partition_names(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'predictionrequests'::regclass "
+                "ORDER BY c.relname;"
+            )
+            return [
+                name
+                for (name,) in cursor.fetchall()
+                if name.startswith(f"{PARENT}_p")
+            ]
+
+    def _detached_names(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute(DETACHED_PARTITIONS)
+            return [name for (name,) in cursor.fetchall()]
+
+    def _detach_partition(self, conn, name):
+        """
+        Detach the partition in a transaction of its own, so the parent
+        is locked exclusively only for the catalog change. Not
+        CONCURRENTLY, which isn't allowed alongside a default partition.
+        """
+        with conn.cursor() as cursor:
+            cursor.execute(
+                sql.SQL(
+                    "ALTER TABLE PredictionRequests DETACH PARTITION {};"
+                ).format(sql.Identifier(name))
+            )
+        conn.commit()
+
+    def _retire_partition(self, conn, name):
+        """
+        Count a detached partition's rows into the archived totals, then
+        drop it or move it to the archive schema, in one transaction.
+
+        Detached, it takes no new rows, so counting it locks nothing the
+        audit writer needs; a late row for its month lands in the default
+        partition and is retired on a later run. Until this commits, a
+        reconciliation sees the partition's rows neither logged nor
+        archived; its next run repairs that.
+        """
+        partition = sql.Identifier(name)
+        with conn.cursor() as cursor:
+            cursor.execute(
+                sql.SQL(
+                    "SELECT partner_id, COUNT(*) FROM {} "
+                    "WHERE partner_id IS NOT NULL GROUP BY partner_id "
+                    "ORDER BY partner_id;"
+                ).format(partition)
+            )
+            counts = cursor.fetchall()
+            if counts:
+                execute_values(cursor, ARCHIVE_COUNTS, counts)
+            if self.retention_action == "drop":
+                cursor.execute(sql.SQL("DROP TABLE {};").format(partition))
+            else:
+                cursor.execute(
+                    sql.SQL("CREATE SCHEMA IF NOT EXISTS {};").format(
+                        sql.Identifier(ARCHIVE_SCHEMA)
+                    )
+                )
+                cursor.execute(
+                    sql.SQL("ALTER TABLE {} SET SCHEMA {};").format(
+                        partition, sql.Identifier(ARCHIVE_SCHEMA)
+                    )
+                )
+        conn.commit()
+        self.removed += 1
+        logger.info(
+            "Retention: %s partition %s",
+            "dropped" if self.retention_action == "drop" else "archived",
+            name,
+        )
+
+    def _migrate_plain_table(self, cursor):
+        """
+        Convert the original unpartitioned table in place: rename it, create
+        the partitioned table and the partitions its rows need, copy the
+        rows and keep request ids increasing. Runs once, in the caller's
+        transaction.
+        """
+        logger.info("Converting PredictionRequests to a partitioned table")
+        cursor.execute(
+            "ALTER TABLE PredictionRequests "
+            "RENAME TO predictionrequests_unpartitioned;"
+        )
+        # Index and constraint names must be free for the new table
+        cursor.execute(
+            "ALTER TABLE predictionrequests_unpartitioned "
+            "RENAME CONSTRAINT predictionrequests_pkey "
+            "TO predictionrequests_unpartitioned_pkey;"
+        )
+        cursor.execute(
+            "DROP INDEX IF EXISTS predictionrequests_partner_id_idx;"
+        )
+        cursor.execute(CREATE_PARENT)
+        cursor.execute(CREATE_INDEX)
+        cursor.execute(CREATE_DEFAULT_PARTITION)
+
+        cursor.execute(
+            "SELECT MIN(requested_at), MAX(requested_at), "
+            "MAX(request_id) FROM predictionrequests_unpartitioned;"
+        )
+        oldest, newest, last_id = cursor.fetchone()
+        now = self.clock()
+        month = month_start(oldest or now)
+        while month <= month_start(max(newest or now, now)):
+            self._create_partition(cursor, month)
+            month = add_months(month, 1)
+
+        cursor.execute(
+            "INSERT INTO PredictionRequests "
+            "(request_id, partner_id, input_data, prediction_output, "
+            "requested_at) "
+            "SELECT request_id, partner_id, input_data, prediction_output, "
+            "COALESCE(requested_at, now()) "
+            "FROM predictionrequests_unpartitioned;"
+        )
+        if last_id is not None:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence("
+                "'predictionrequests', 'request_id'), %s);",
+                (last_id,),
+            )
+        cursor.execute("DROP TABLE predictionrequests_unpartitioned;")
+
+    def stats(self):
+        return {
+            "premake_months": self.premake_months,
+            "retention_months": self.retention_months,
+            "retention_action": self.retention_action,
+            "created": self.created,
+            "moved_from_default": self.moved_from_default,
+            "removed": self.removed,
+            "last_maintained_at": self.last_maintained_at,
+        }
@@ -0,0 +1,197 @@
+from psycopg2.extras import RealDictCursor
+
+CREATE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS Partners (
+        partner_id SERIAL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        api_key VARCHAR(255) UNIQUE NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    # Running totals per partner, incremented by the audit writer in the
+    # same transaction as its inserts (see e2e_stub_poc/audit_log.py).
+    # archived_requests counts rows in partitions removed by retention.
+    # PredictionRequests itself is managed by partitions.py.
+    """
+    CREATE TABLE IF NOT EXISTS PartnerRequestCounts (
+        partner_id INTEGER PRIMARY KEY REFERENCES Partners(partner_id),
+        total_requests BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    """
+    ALTER TABLE PartnerRequestCounts
+        ADD COLUMN IF NOT EXISTS archived_requests BIGINT NOT NULL DEFAULT 0;
+    """,
+]
+
+PROFILE_SUMMARY_SQL = """
+    SELECT p.partner_id, p.name,
+           COALESCE(c.total_requests, 0) AS total_requests
+    FROM Partners p
+    LEFT JOIN PartnerRequestCounts c ON c.partner_id = p.partner_id
+    WHERE p.partner_id = {};
+"""
+
+# Reconciliation recounts each partner from the log, plus rows archived by
+# retention, and fixes counters that drifted, e.g. from rows written
+# outside the audit writer. Each partner gets its own short transaction:
+# locking its counter row waits for the partner's in-flight writers to
+# commit and holds new ones back only while that partner's rows are
+# counted (on the (partner_id, requested_at) index), instead of stalling
+# every writer behind a count of the whole log. Locks are taken in the
+# writer's order (log, then counters); the count is a separate statement
+# so it sees rows committed while waiting for the row lock.
+LIST_PARTNER_IDS = "SELECT partner_id FROM Partners ORDER BY partner_id;"
+LOCK_REQUEST_LOG = "LOCK TABLE PredictionRequests IN ACCESS SHARE MODE;"
+ADD_PARTNER_COUNT = """
+    INSERT INTO PartnerRequestCounts (partner_id) VALUES ({})
+    ON CONFLICT (partner_id) DO NOTHING;
+"""
+LOCK_PARTNER_COUNT = """
+    SELECT 1 FROM PartnerRequestCounts WHERE partner_id = {} FOR UPDATE;
+"""
+# Returns a row only if the counter was corrected
+RECOUNT_PARTNER = """
+    UPDATE PartnerRequestCounts c SET
+        total_requests = c.archived_requests + r.logged,
+        updated_at = now()
+    FROM (
+        SELECT COUNT(*) AS logged FROM PredictionRequests
+        WHERE partner_id = {0}
+    ) r
+    WHERE c.partner_id = {0}
+        AND c.total_requests IS DISTINCT FROM c.archived_requests + r.logged
+    RETURNING c.partner_id;
+"""
+
+
+class PartnerRepository:
+    """Blocking partner queries on a psycopg2 `ConnectionPool`."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def create_schema(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                for statement in CREATE_TABLES:
+                    cursor.execute(statement)
+            conn.commit()
+
+    def create(self, name, api_key):
+        with self.pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(
+                    "INSERT INTO Partners (name, api_key) VALUES (%s, %s) "
+                    "RETURNING *;",
+                    (name, api_key),
+                )
+                new_partner = cursor.fetchone()
+            conn.commit()
+        return dict(new_partner)
+
+    def get_by_api_key(self, api_key):
+        with self.pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(
+                    "SELECT * FROM Partners WHERE api_key = %s;", (api_key,)
+                )
+                db_partner = cursor.fetchone()
+        return dict(db_partner) if db_partner else None
+
+    def profile_summary(self, partner_id):
+        """
+        Return the partner's name and request count, or None.
+
+        One primary-key lookup on each table, however large the log is.
+        """
+        with self.pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(PROFILE_SUMMARY_SQL.format("%s"), (partner_id,))
+                summary = cursor.fetchone()
+        return dict(summary) if summary else None
+
+    def reconcile_request_counts(self):
+        """Recount requests per partner; returns how many were corrected."""
+        corrected = 0
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(LIST_PARTNER_IDS)
+                partner_ids = [row[0] for row in cursor.fetchall()]
+            conn.commit()
+            for partner_id in partner_ids:
+                with conn.cursor() as cursor:
+                    cursor.execute(LOCK_REQUEST_LOG)
+                    cursor.execute(
+                        ADD_PARTNER_COUNT.format("%s"), (partner_id,)
+                    )
+                    cursor.execute(
+                        LOCK_PARTNER_COUNT.format("%s"), (partner_id,)
+                    )
+                    cursor.execute(
+                        RECOUNT_PARTNER.format("%(partner_id)s"),
+                        {"partner_id": partner_id},
+                    )
+                    corrected += cursor.rowcount
+                conn.commit()
+        return corrected
+
+
+class AsyncPartnerRepository:
+    """`PartnerRepository` on an asyncpg `AsyncConnectionPool`."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def create_schema(self):
+        async with self.pool.connection() as conn:
+            for statement in CREATE_TABLES:
+                await conn.execute(statement)
+
+    async def create(self, name, api_key):
+        async with self.pool.connection() as conn:
+            row = await conn.fetchrow(
+                "INSERT INTO Partners (name, api_key) VALUES ($1, $2) "
+                "RETURNING *;",
+                name,
+                api_key,
+            )
+        return dict(row)
+
+    async def get_by_api_key(self, api_key):
+        async with self.pool.connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT * FROM Partners WHERE api_key = $1;", api_key
+            )
+        return dict(row) if row else None
+
+    async def profile_summary(self, partner_id):
+        async with self.pool.connection() as conn:
+            summary = await conn.fetchrow(
+                PROFILE_SUMMARY_SQL.format("$1"), partner_id
+            )
+        return dict(summary) if summary else None
+
+    async def reconcile_request_counts(self):
+        corrected = 0
+        async with self.pool.connection() as conn:
+            partner_ids = [
+                row["partner_id"] for row in await conn.fetch(LIST_PARTNER_IDS)
+            ]
+            for partner_id in partner_ids:
+                async with conn.transaction():
+                    await conn.execute(LOCK_REQUEST_LOG)
+                    await conn.execute(
+                        ADD_PARTNER_COUNT.format("$1"), partner_id
+                    )
+                    await conn.execute(
+                        LOCK_PARTNER_COUNT.format("$1"), partner_id
+                    )
+                    corrected += len(
+                        await conn.fetch(
+                            RECOUNT_PARTNER.format("$1"), partner_id
+                        )
+                    )
+        return corrected
@@ -0,0 +1,147 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+
+from repository import (
+    LIST_PARTNER_IDS,
+    LOCK_REQUEST_LOG,
+    AsyncPartnerRepository,
+    PartnerRepository,
+)
+
+
+def kind(statement):
+    """A short name for a reconciliation statement."""
+    statement = " ".join(statement.split())
+    if statement == LIST_PARTNER_IDS:
+        return "list"
+    if statement == LOCK_REQUEST_LOG:
+        return "lock log"
+    if statement.startswith("INSERT INTO PartnerRequestCounts"):
+        return "add counter"
+    if statement.endswith("FOR UPDATE;"):
+        return "lock counter"
+    if statement.startswith("UPDATE PartnerRequestCounts"):
+        return "recount"
+    return statement
+
+
+class RecordingCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, statement, params=None):
+        self.conn.log.append((kind(statement), params))
+        # Partner 2's counter has drifted
+        self.rowcount = int(params == {"partner_id": 2})
+
+    def fetchall(self):
+        return [(partner_id,) for partner_id in self.conn.partner_ids]
+
+
+class RecordingConnection:
+    def __init__(self, partner_ids):
+        self.partner_ids = partner_ids
+        self.log = []
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        self.log.append(("commit", None))
+
+
+class RecordingPool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @contextmanager
+    def connection(self, timeout=None):
+        yield self.conn
+
+
+def test_reconciliation_locks_one_partner_at_a_time():
+    """Tests that each partner is recounted in its own short transaction."""
+    conn = RecordingConnection(partner_ids=[1, 2])
+    partners = PartnerRepository(RecordingPool(conn))
+
+    corrected = partners.reconcile_request_counts()
+
+    assert corrected == 1
+    assert [entry[0] for entry in conn.log] == [
+        "list",
+        "commit",
+        "lock log",
+        "add counter",
+        "lock counter",
+        "recount",
+        "commit",
+        "lock log",
+        "add counter",
+        "lock counter",
+        "recount",
+        "commit",
+    ]
+    assert conn.log[5][1] == {"partner_id": 1}
+    assert conn.log[10][1] == {"partner_id": 2}
+
+
+class RecordingAsyncPool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def connection(self, timeout=None):
+        yield self.conn
+
+
+class RecordingAsyncConnection:
+    def __init__(self, partner_ids):
+        self.partner_ids = partner_ids
+        self.log = []
+
+    async def fetch(self, statement, *args):
+        self.log.append((kind(statement), args))
+        if kind(statement) == "list":
+            return [{"partner_id": i} for i in self.partner_ids]
+        return [{"partner_id": 2}] if args == (2,) else []
+
+    async def execute(self, statement, *args):
+        self.log.append((kind(statement), args))
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.log.append(("begin", ()))
+        yield
+        self.log.append(("commit", ()))
+
+
+def test_async_reconciliation_locks_one_partner_at_a_time():
+    """Tests the asyncpg version's per-partner transactions."""
+    conn = RecordingAsyncConnection(partner_ids=[1, 2])
+    pool = RecordingAsyncPool(conn)
+
+    corrected = asyncio.run(
+        AsyncPartnerRepository(pool).reconcile_request_counts()
+    )
+
+    assert corrected == 1
+    per_partner = [
+        "begin",
+        "lock log",
+        "add counter",
+        "lock counter",
+        "recount",
+        "commit",
+    ]
+    assert [entry[0] for entry in conn.log] == ["list"] + per_partner * 2
+    assert [args for name, args in conn.log if name == "recount"] == [
+        (1,),
+        (2,),
+    ]
@@ -0,0 +1,281 @@
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Queued by `stop` so the writer doesn't wait out a partial batch
+_FLUSH = object()
+
+
+@dataclass
+class AuditRecord:
+    partner_id: int
+    input_data: Dict[str, Any]
+    prediction_output: Dict[str, Any]
+    requested_at: datetime
+
+
+class AuditLogWriter:
+    """
+    Takes request/prediction audit logging off the request path.
+
+    Records go into a bounded in-memory queue that a background task drains
+    in batches of up to `batch_size`, waiting at most `flush_interval`
+    seconds to fill one. Each batch is handed to `sink` (a blocking callable
+    taking a list of `AuditRecord`) on a worker thread.
+
+    When the queue is full, `log` waits up to `block_timeout` seconds for
+    space and then drops the record, counting it in `dropped`. `stop`
+    flushes everything still queued, giving up after `stop_timeout`
+    seconds so a stuck sink can't hold up shutdown; it then waits up to
+    `sink_timeout` seconds for a batch already inside the sink, since its
+    thread can't be cancelled. `writing` tells whether that batch is still
+    running, in which case the sink must not be closed yet.
+    """
+
+    def __init__(
+        self,
+        sink,
+        max_queue_size=10000,
+        batch_size=500,
+        flush_interval=1.0,
+        block_timeout=0.0,
+        stop_timeout=10.0,
+        sink_timeout=5.0,
+    ):
+        self.sink = sink
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.stop_timeout = stop_timeout
+        self.sink_timeout = sink_timeout
+        self._queue = None
+        self._worker = None
+        self._inflight = None
+        self._closing = False
+        # Stats
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    async def start(self):
+        """Start the background writer on the running event loop."""
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush every queued record, then stop the background task."""
+        if self._worker is None:
+            return
+        # Refuse new records and let the worker drain the queue, so the
+        # sink is never called from two places at once
+        self._closing = True
+
+        async def flush():
+            await self._queue.put(_FLUSH)
+            await self._queue.join()
+
+        try:
+            await asyncio.wait_for(flush(), self.stop_timeout)
+        except asyncio.TimeoutError:
+            unwritten = 0
+            while not self._queue.empty():
+                if self._queue.get_nowait() is not _FLUSH:
+                    unwritten += 1
+            self.dropped += unwritten
+            logger.warning(
+                "Audit log flush timed out after %ss; dropping %d records",
+                self.stop_timeout,
+                unwritten,
+            )
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self.writing:
+            # Cancelling the worker doesn't stop the sink's thread
+            try:
+                await asyncio.wait_for(
+                    asyncio.shield(self._inflight), self.sink_timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Audit sink still writing after %ss; not waiting further",
+                    self.sink_timeout,
+                )
+            except Exception:
+                pass
+
+    @property
+    def writing(self):
+        """Whether a batch is still being written by the sink."""
+        return self._inflight is not None and not self._inflight.done()
+
+    async def log(self, record):
+        """Queue `record` for writing; returns False if it was dropped."""
+        if self._queue is None or self._closing:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.block_timeout > 0:
+            try:
+                await asyncio.wait_for(
+                    self._queue.put(record), self.block_timeout
+                )
+                return True
+            except asyncio.TimeoutError:
+                pass
+        self.dropped += 1
+        return False
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(items) < self.batch_size and items[-1] is not _FLUSH:
+                if not self._queue.empty():
+                    items.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(
+                        await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+            batch = [item for item in items if item is not _FLUSH]
+            if batch:
+                await self._write(batch)
+            for _ in items:
+                self._queue.task_done()
+
+    async def _write(self, batch):
+        loop = asyncio.get_running_loop()
+        self._inflight = loop.run_in_executor(None, self.sink, batch)
+        # Counted on completion, so a batch outliving a cancelled worker is
+        # still accounted for
+        self._inflight.add_done_callback(
+            lambda call: self._record(batch, call)
+        )
+        try:
+            await asyncio.shield(self._inflight)
+        except Exception:
+            pass
+
+    def _record(self, batch, call):
+        if call.cancelled():
+            return
+        e = call.exception()
+        if e is not None:
+            self.failed += len(batch)
+            logger.error("Failed to write %d audit records: %s", len(batch), e)
+            return
+        self.written += len(batch)
+        self.batches += 1
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+# --- Sinks ---
+def logging_sink(records):
+    """Fallback sink used when no database is configured."""
+    for record in records:
+        logger.info(
+            "Audit: partner %s at %s -> %s",
+            record.partner_id,
+            record.requested_at.isoformat(),
+            record.prediction_output,
+        )
+
+
+class PostgresSink:
+    """
+    Bulk-inserts audit records into `PredictionRequests` (see db_poc) with a
+    single multi-row INSERT and one commit per batch.
+
+    The per-partner totals in `PartnerRequestCounts` are incremented in the
+    same transaction, so they always agree with the logged rows.
+    """
+
+    INSERT_SQL = (
+        "INSERT INTO PredictionRequests "
+        "(partner_id, input_data, prediction_output, requested_at) "
+        "VALUES %s"
+    )
+    COUNT_SQL = (
+        "INSERT INTO PartnerRequestCounts (partner_id, total_requests) "
+        "VALUES %s ON CONFLICT (partner_id) DO UPDATE SET "
+        "total_requests = "
+        "PartnerRequestCounts.total_requests + EXCLUDED.total_requests, "
+        "updated_at = now()"
+    )
+
+    def __init__(self, dsn):
+        import psycopg2
+
+        self._psycopg2 = psycopg2
+        self.dsn = dsn
+        self._conn = None
+
+    def __call__(self, records):
+        from psycopg2.extras import Json, execute_values
+
+        rows = [
+            (
+                record.partner_id,
+                Json(record.input_data),
+                Json(record.prediction_output),
+                record.requested_at,
+            )
+            for record in records
+        ]
+        # Sorted so concurrent writers lock counter rows in the same order
+        counts = sorted(
+            Counter(record.partner_id for record in records).items()
+        )
+        # The writer calls the sink for one batch at a time, so a single
+        # long-lived connection is enough
+        if self._conn is None or self._conn.closed:
+            self._conn = self._psycopg2.connect(self.dsn)
+        try:
+            with self._conn.cursor() as cursor:
+                execute_values(
+                    cursor, self.INSERT_SQL, rows, page_size=len(rows)
+                )
+                execute_values(
+                    cursor, self.COUNT_SQL, counts, page_size=len(counts)
+                )
+            self._conn.commit()
+        except self._psycopg2.Error:
+            self._conn.close()
+            self._conn = None
+            raise
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -2,6 +2,16 @@ from fastapi import FastAPI, HTTPException, Header
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+from audit_log import AuditLogWriter, AuditRecord, PostgresSink, logging_sink
+from prediction_cache import PredictionCache
+
+# Shared PoC modules live in pocs/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.partner_auth import PartnerAuthenticator  # noqa: E402
 
 # Basic logging setup
 logging.basicConfig(level=logging.INFO)
@@ -34,6 +44,95 @@ mock_partners = {
     "partner-key-67890": {"id": 2, "name": "Partner B"},
 }
 
+# Partner records are cached by hashed API key; unknown keys are cached
+# briefly too, so invalid-key floods don't reach the partner store.
+PARTNER_CACHE_TTL = float(os.getenv("PARTNER_CACHE_TTL", "300"))
+PARTNER_NEGATIVE_CACHE_TTL = float(
+    os.getenv("PARTNER_NEGATIVE_CACHE_TTL", "5")
+)
+partner_auth = PartnerAuthenticator(
+    mock_partners.get,
+    ttl=PARTNER_CACHE_TTL,
+    negative_ttl=PARTNER_NEGATIVE_CACHE_TTL,
+)
+
+
+# --- Prediction Cache ---
+# Set REDIS_URL to share cached predictions across workers; without it only
+# the in-process tier is used.
+REDIS_URL = os.getenv("REDIS_URL")
+PREDICTION_CACHE_MAX_ENTRIES = int(
+    os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "10000")
+)
+PREDICTION_CACHE_DEFAULT_TTL = int(
+    os.getenv("PREDICTION_CACHE_DEFAULT_TTL", "300")
+)
+# How long a prediction stays valid, per insight type (seconds)
+INSIGHT_TTL_SECONDS = {
+    "user_churn_risk": 3600,
+}
+
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_MAX_ENTRIES,
+    default_ttl=PREDICTION_CACHE_DEFAULT_TTL,
+    ttl_by_insight_type=INSIGHT_TTL_SECONDS,
+)
+
+
+@app.on_event("startup")
+def connect_cache():
+    """Attach the optional Redis tier to the prediction cache."""
+    if REDIS_URL:
+        import redis.asyncio as aioredis
+
+        prediction_cache.redis_client = aioredis.from_url(
+            REDIS_URL, decode_responses=True
+        )
+        logger.info("Prediction cache using Redis at %s", REDIS_URL)
+
+
+@app.on_event("shutdown")
+async def disconnect_cache():
+    """Close the Redis connection pool, if one was opened."""
+    if prediction_cache.redis_client is not None:
+        await prediction_cache.redis_client.aclose()
+
+
+# --- Audit Logging ---
+# With AUDIT_DB_DSN set (e.g. "dbname=taylor user=andrei host=localhost"),
+# records are bulk-inserted into db_poc's PredictionRequests table;
+# otherwise they are written to the application log.
+AUDIT_DB_DSN = os.getenv("AUDIT_DB_DSN")
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_STOP_TIMEOUT = float(os.getenv("AUDIT_STOP_TIMEOUT", "10.0"))
+AUDIT_SINK_TIMEOUT = float(os.getenv("AUDIT_SINK_TIMEOUT", "5.0"))
+
+audit_log = AuditLogWriter(
+    sink=PostgresSink(AUDIT_DB_DSN) if AUDIT_DB_DSN else logging_sink,
+    max_queue_size=AUDIT_QUEUE_SIZE,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval=AUDIT_FLUSH_INTERVAL,
+    stop_timeout=AUDIT_STOP_TIMEOUT,
+    sink_timeout=AUDIT_SINK_TIMEOUT,
+)
+
+
+@app.on_event("startup")
+async def start_audit_log():
+    """Start the background audit log writer."""
+    await audit_log.start()
+
+
+@app.on_event("shutdown")
+async def stop_audit_log():
+    """Flush queued audit records before the process exits."""
+    await audit_log.stop()
+    # Closing under a batch that's still being written would break it
+    if isinstance(audit_log.sink, PostgresSink) and not audit_log.writing:
+        audit_log.sink.close()
+
 
 # --- Health Check ---
 @app.get("/health")
@@ -42,6 +141,16 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/stats")
+def stats():
+    """Partner auth, prediction cache and audit log counters."""
+    return {
+        "partner_auth": partner_auth.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "audit_log": audit_log.stats(),
+    }
+
+
 # --- Simplified Prediction Endpoint ---
 @app.post("/predict/simplified", response_model=PredictionResponse)
 async def simplified_predict(
@@ -50,8 +159,9 @@ async def simplified_predict(
     """
     A simplified endpoint that mocks the end-to-end flow of a prediction.
     """
-    # 1. Authenticate Partner (mocked)
-    if not x_api_key or x_api_key not in mock_partners:
+    # 1. Authenticate Partner (mocked store, cached lookups)
+    partner = partner_auth.authenticate(x_api_key)
+    if partner is None:
         logger.warning(
             "Authentication failed for API key: %s",
             x_api_key or "None provided",
@@ -60,34 +170,60 @@ async def simplified_predict(
             status_code=401, detail="Invalid or missing API Key"
         )
 
-    partner = mock_partners[x_api_key]
     logger.info("Step 1: Partner '%s' authenticated.", partner["name"])
 
-    # 2. Process Data (mocked)
-    logger.info("Step 2: Data processing called with: %s", request.event_data)
+    async def compute_prediction():
+        # 2. Process Data (mocked)
+        logger.info(
+            "Step 2: Data processing called with: %s", request.event_data
+        )
 
-    # 3. Get Prediction (mocked)
-    mocked_prediction = {
-        "insight_type": "user_churn_risk",
-        "value": "high",
-        "confidence": 0.88,
-        "model_version": "stub-v0.1.0",
-    }
-    logger.info("Step 3: Mocked ML inference returned: %s", mocked_prediction)
+        # 3. Get Prediction (mocked)
+        mocked_prediction = {
+            "insight_type": "user_churn_risk",
+            "value": "high",
+            "confidence": 0.88,
+            "model_version": "stub-v0.1.0",
+        }
+        logger.info(
+            "Step 3: Mocked ML inference returned: %s", mocked_prediction
+        )
+        return mocked_prediction
 
-    # 4. Cache Result (mocked)
-    cache_key = (
-        f"{partner['id']}:{hash(frozenset(request.event_data.items()))}"
+    # 4. Cache Result: steps 2-3 only run on a miss, and concurrent
+    # identical requests from the same partner share one computation
+    prediction, cache_status, cache_key = (
+        await prediction_cache.get_or_compute(
+            partner["id"], request.event_data, compute_prediction
+        )
     )
-    logger.info("Step 4: Prediction would be cached with key: %s", cache_key)
-
-    # 5. Log Request/Prediction (mocked)
     logger.info(
-        "Step 5: Request/Prediction logged for partner ID: %s", partner["id"]
+        "Step 4: Prediction cache %s for key: %s", cache_status, cache_key
+    )
+
+    # 5. Log Request/Prediction: queued for a background bulk insert so
+    # the database write stays off the request path
+    queued = await audit_log.log(
+        AuditRecord(
+            partner_id=partner["id"],
+            input_data=request.event_data,
+            prediction_output=prediction,
+            requested_at=datetime.now(timezone.utc),
+        )
     )
+    if queued:
+        logger.info(
+            "Step 5: Request/Prediction queued for partner ID: %s",
+            partner["id"],
+        )
+    else:
+        logger.warning(
+            "Step 5: Audit log queue full; dropped record for partner ID: %s",
+            partner["id"],
+        )
 
     # 6. Return the prediction
-    return mocked_prediction
+    return prediction
 
 
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict
+
+# Shared PoC modules live in pocs/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.single_flight import SingleFlight  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_hash(event_data):
+    """
+    Stable SHA-256 of `event_data`.
+
+    Keys are sorted at every nesting level and separators are fixed, so
+    equal payloads hash the same across processes and restarts, unlike the
+    built-in `hash()`. Nested dicts and lists are supported; values JSON
+    can't represent are hashed by their `str()`.
+    """
+    encoded = json.dumps(
+        event_data,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class PredictionCache:
+    """
+    Two-tier prediction cache scoped per partner.
+
+    Results live in a bounded in-process LRU and, when a `redis_client`
+    (an asyncio Redis client) is given, in Redis shared across workers.
+    Each result expires after the TTL configured for its `insight_type`.
+    Concurrent requests for the same key are coalesced so the prediction
+    is computed once.
+    """
+
+    def __init__(
+        self,
+        max_entries=10000,
+        default_ttl=300,
+        ttl_by_insight_type=None,
+        redis_client=None,
+        key_prefix="prediction",
+        clock=time.time,
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttl_by_insight_type = ttl_by_insight_type or {}
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._single_flight = SingleFlight()
+        # Stats
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.redis_errors = 0
+
+    def make_key(self, partner_id, event_data):
+        return f"{self.key_prefix}:{partner_id}:{canonical_hash(event_data)}"
+
+    def ttl_for(self, prediction):
+        return self.ttl_by_insight_type.get(
+            prediction.get("insight_type"), self.default_ttl
+        )
+
+    async def get_or_compute(self, partner_id, event_data, compute):
+        """
+        Return `(prediction, cache_status, key)`, calling the `compute`
+        coroutine function only if no tier has a fresh result and no
+        identical request is already computing one.
+
+        `cache_status` is one of "hit", "redis_hit", "coalesced" or "miss".
+        """
+        key = self.make_key(partner_id, event_data)
+
+        prediction = self._get_local(key)
+        if prediction is not None:
+            self.local_hits += 1
+            return prediction, "hit", key
+
+        (prediction, status), shared = await self._single_flight.run(
+            key, lambda: self._load_or_compute(key, compute)
+        )
+        if shared:
+            self.coalesced += 1
+            return prediction, "coalesced", key
+        return prediction, status, key
+
+    async def _load_or_compute(self, key, compute):
+        record = await self._get_redis(key)
+        if record is not None:
+            self.redis_hits += 1
+            self._set_local(key, record["value"], record["expires_at"])
+            return record["value"], "redis_hit"
+
+        self.misses += 1
+        prediction = await compute()
+        expires_at = self.clock() + self.ttl_for(prediction)
+        self._set_local(key, prediction, expires_at)
+        await self._set_redis(key, prediction, expires_at)
+        return prediction, "miss"
+
+    # --- In-process tier ---
+    def _get_local(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # --- Redis tier ---
+    # Redis is an optimization: on any error, carry on without it.
+    async def _get_redis(self, key):
+        if self.redis_client is None:
+            return None
+        try:
+            raw = await self.redis_client.get(key)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning("Redis get failed for %s: %s", key, e)
+            return None
+        if raw is None:
+            return None
+        record = json.loads(raw)
+        if record["expires_at"] <= self.clock():
+            return None
+        return record
+
+    async def _set_redis(self, key, value, expires_at):
+        if self.redis_client is None:
+            return
+        ttl = max(1, int(expires_at - self.clock()))
+        record = json.dumps({"expires_at": expires_at, "value": value})
+        try:
+            await self.redis_client.set(key, record, ex=ttl)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning("Redis set failed for %s: %s", key, e)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "redis_errors": self.redis_errors,
+        }
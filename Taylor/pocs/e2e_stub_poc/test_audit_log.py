@@ -0,0 +1,176 @@
+import asyncio
+import threading
+from datetime import datetime
+
+from audit_log import AuditLogWriter, AuditRecord
+
+
+def record(index):
+    return AuditRecord(
+        partner_id=index % 3,
+        input_data={"index": index},
+        prediction_output={"score": 0.5},
+        requested_at=datetime(2024, 1, 1),
+    )
+
+
+class RecordingSink:
+    """Keeps each batch it is given, optionally waiting to be released."""
+
+    def __init__(self, release=None):
+        self.batches = []
+        self.release = release
+
+    def __call__(self, records):
+        if self.release is not None:
+            self.release.wait(5)
+        self.batches.append([r.input_data["index"] for r in records])
+
+
+def test_full_batches_are_written_without_waiting():
+    """Tests that a batch is written as soon as batch_size records queue."""
+    sink = RecordingSink()
+    writer = AuditLogWriter(sink, batch_size=4, flush_interval=60)
+
+    async def run():
+        await writer.start()
+        for index in range(8):
+            await writer.log(record(index))
+        while writer.written < 8:
+            await asyncio.sleep(0.01)
+        await writer.stop()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+    assert sink.batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert writer.stats()["batches"] == 2
+
+
+def test_partial_batch_is_written_after_flush_interval():
+    """Tests that a partial batch waits at most flush_interval."""
+    sink = RecordingSink()
+    writer = AuditLogWriter(sink, batch_size=100, flush_interval=0.05)
+
+    async def run():
+        await writer.start()
+        for index in range(3):
+            await writer.log(record(index))
+        await asyncio.sleep(0.5)
+        written = writer.written
+        await writer.stop()
+        return written
+
+    assert asyncio.run(run()) == 3
+    assert sink.batches == [[0, 1, 2]]
+
+
+def test_full_queue_drops_or_blocks():
+    """Tests that a full queue drops records, or waits with block_timeout."""
+    release = threading.Event()
+    sink = RecordingSink(release=release)
+
+    async def run(block_timeout):
+        writer = AuditLogWriter(
+            sink,
+            max_queue_size=2,
+            batch_size=1,
+            flush_interval=0,
+            block_timeout=block_timeout,
+        )
+        await writer.start()
+        # The first record is taken by the worker, stuck in the sink
+        await writer.log(record(0))
+        await asyncio.sleep(0.05)
+        queued = [await writer.log(record(index)) for index in (1, 2)]
+        full = asyncio.ensure_future(writer.log(record(3)))
+        await asyncio.sleep(0.05)
+        release.set()
+        queued.append(await full)
+        await writer.stop()
+        release.clear()
+        return queued, writer
+
+    queued, writer = asyncio.run(run(block_timeout=0))
+    assert queued == [True, True, False]
+    assert writer.dropped == 1
+    assert writer.written == 3
+
+    queued, writer = asyncio.run(run(block_timeout=2))
+    assert queued == [True, True, True]
+    assert writer.dropped == 0
+    assert writer.written == 4
+
+
+def test_stop_flushes_queued_records():
+    """Tests that stop() writes everything queued, and then refuses more."""
+    sink = RecordingSink()
+    writer = AuditLogWriter(sink, batch_size=2, flush_interval=60)
+
+    async def run():
+        await writer.start()
+        for index in range(5):
+            await writer.log(record(index))
+        await writer.stop()
+        return await writer.log(record(5))
+
+    assert asyncio.run(asyncio.wait_for(run(), timeout=5)) is False
+    assert sorted(sum(sink.batches, [])) == [0, 1, 2, 3, 4]
+    assert writer.written == 5
+
+
+def test_stop_gives_up_on_a_stuck_sink():
+    """Tests that stop() returns after its timeouts if the sink hangs."""
+    release = threading.Event()
+    sink = RecordingSink(release=release)
+    writer = AuditLogWriter(
+        sink,
+        batch_size=1,
+        flush_interval=0,
+        stop_timeout=0.1,
+        sink_timeout=0.1,
+    )
+
+    async def run():
+        await writer.start()
+        for index in range(3):
+            await writer.log(record(index))
+        await asyncio.sleep(0.05)
+        await writer.stop()
+        writing = writer.writing
+        release.set()
+        while writer.writing:
+            await asyncio.sleep(0.01)
+        return writing
+
+    # The first record was still in the sink when stop() gave up
+    assert asyncio.run(asyncio.wait_for(run(), timeout=5)) is True
+    assert writer.dropped == 2
+    assert writer.written == 1
+
+
+def test_stop_waits_for_the_batch_in_the_sink():
+    """Tests that stop() doesn't return while a slow sink is still writing."""
+    release = threading.Event()
+    sink = RecordingSink(release=release)
+    writer = AuditLogWriter(
+        sink,
+        batch_size=1,
+        flush_interval=0,
+        stop_timeout=0.1,
+        sink_timeout=5,
+    )
+
+    async def run():
+        await writer.start()
+        for index in range(3):
+            await writer.log(record(index))
+        await asyncio.sleep(0.05)
+        # Finishes the batch well after stop_timeout has fired
+        threading.Timer(0.3, release.set).start()
+        await writer.stop()
+        return writer.writing
+
+    assert asyncio.run(asyncio.wait_for(run(), timeout=5)) is False
+    assert sink.batches == [[0]]
+    assert writer.written == 1
+    assert writer.dropped == 2
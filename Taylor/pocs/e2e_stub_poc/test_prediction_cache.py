@@ -0,0 +1,164 @@
+import asyncio
+
+from prediction_cache import PredictionCache, canonical_hash
+
+PREDICTION = {
+    "insight_type": "user_churn_risk",
+    "value": "high",
+    "confidence": 0.88,
+    "model_version": "stub-v0.1.0",
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StandInRedis:
+    """Local stand-in for an asyncio Redis client (get/set with expiry)."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+
+    async def get(self, key):
+        value, expires_at = self.data.get(key, (None, 0))
+        return value if expires_at > self.clock() else None
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = (value, self.clock() + ex)
+
+
+class CountingModel:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return dict(PREDICTION)
+
+
+def test_canonical_hash_is_order_independent_and_handles_nesting():
+    """Tests that equal payloads hash equally, nested values included."""
+    a = {"user_id": "xyz-789", "items": [1, {"b": 2, "a": 1}], "x": None}
+    b = {"x": None, "items": [1, {"a": 1, "b": 2}], "user_id": "xyz-789"}
+    assert canonical_hash(a) == canonical_hash(b)
+    assert canonical_hash(a) != canonical_hash({**a, "x": 0})
+
+
+def test_cache_hit_and_partner_scoping():
+    """Tests that repeats hit the cache but partners don't share entries."""
+    cache = PredictionCache()
+    model = CountingModel()
+    event = {"user_id": "xyz-789", "value": 123.45}
+
+    async def run():
+        _, first, _ = await cache.get_or_compute(1, event, model)
+        _, second, _ = await cache.get_or_compute(1, event, model)
+        _, other, _ = await cache.get_or_compute(2, event, model)
+        return first, second, other
+
+    assert asyncio.run(run()) == ("miss", "hit", "miss")
+    assert model.calls == 2
+
+
+def test_ttl_per_insight_type():
+    """Tests that entries expire after their insight type's TTL."""
+    clock = FakeClock()
+    cache = PredictionCache(
+        default_ttl=5, ttl_by_insight_type={"user_churn_risk": 60}, clock=clock
+    )
+    model = CountingModel()
+
+    async def lookup():
+        _, status, _ = await cache.get_or_compute(1, {"a": 1}, model)
+        return status
+
+    assert asyncio.run(lookup()) == "miss"
+    clock.now += 30
+    assert asyncio.run(lookup()) == "hit"
+    clock.now += 31
+    assert asyncio.run(lookup()) == "miss"
+
+
+def test_lru_eviction():
+    """Tests that the in-process tier stays within max_entries."""
+    cache = PredictionCache(max_entries=2)
+    model = CountingModel()
+
+    async def run():
+        for i in range(3):
+            await cache.get_or_compute(1, {"i": i}, model)
+        _, status, _ = await cache.get_or_compute(1, {"i": 0}, model)
+        return status
+
+    assert asyncio.run(run()) == "miss"
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_single_flight():
+    """Tests that concurrent identical requests compute only once."""
+    cache = PredictionCache()
+    model = CountingModel(delay=0.05)
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get_or_compute(1, {"a": 1}, model) for _ in range(10))
+        )
+
+    results = asyncio.run(run())
+    assert model.calls == 1
+    assert sorted(status for _, status, _ in results) == (
+        ["coalesced"] * 9 + ["miss"]
+    )
+
+
+def test_cancelled_leader_does_not_fail_waiters():
+    """Tests that waiters still get the result if the first caller leaves."""
+    cache = PredictionCache()
+    model = CountingModel(delay=0.05)
+
+    async def run():
+        leader = asyncio.create_task(cache.get_or_compute(1, {"a": 1}, model))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(cache.get_or_compute(1, {"a": 1}, model))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        _, status, _ = await cache.get_or_compute(1, {"a": 1}, model)
+        return leader.cancelled(), results, status
+
+    leader_cancelled, results, status = asyncio.run(run())
+    assert leader_cancelled
+    assert [status for _, status, _ in results] == ["coalesced"] * 3
+    assert all(prediction == PREDICTION for prediction, _, _ in results)
+    # The computation finished and was cached, once
+    assert status == "hit"
+    assert model.calls == 1
+
+
+def test_redis_tier_shared_between_workers():
+    """Tests that a second worker's cache is warmed through Redis."""
+    clock = FakeClock()
+    redis_client = StandInRedis(clock)
+    worker_a = PredictionCache(redis_client=redis_client, clock=clock)
+    worker_b = PredictionCache(redis_client=redis_client, clock=clock)
+    model = CountingModel()
+
+    async def run():
+        _, first, _ = await worker_a.get_or_compute(1, {"a": 1}, model)
+        _, second, _ = await worker_b.get_or_compute(1, {"a": 1}, model)
+        _, third, _ = await worker_b.get_or_compute(1, {"a": 1}, model)
+        return first, second, third
+
+    assert asyncio.run(run()) == ("miss", "redis_hit", "hit")
+    assert model.calls == 1
@@ -0,0 +1,141 @@
+"""
+Compare rows/sec of the single-row item endpoints against the bulk
+endpoints for create, update and delete. Starts a uvicorn server (see
+`load_test.py`) with the given `DB_MODE` against a local Postgres.
+
+    python benchmark_bulk.py --rows 5000 --batch-size 1000
+    python benchmark_bulk.py --mode async --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from load_test import start_server, wait_until_healthy
+
+
+async def run_single(client, rows, concurrency):
+    """Create, update and delete `rows` items one request at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(method, url, **kwargs):
+        async with semaphore:
+            response = await client.request(method, url, **kwargs)
+            response.raise_for_status()
+            return response
+
+    timings = {}
+    started = time.perf_counter()
+    responses = await asyncio.gather(
+        *(
+            call("POST", "/items/", json={"name": f"single-{i}"})
+            for i in range(rows)
+        )
+    )
+    timings["create"] = time.perf_counter() - started
+    item_ids = [response.json()["id"] for response in responses]
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            call("PUT", f"/items/{item_id}", json={"name": "updated"})
+            for item_id in item_ids
+        )
+    )
+    timings["update"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(call("DELETE", f"/items/{item_id}") for item_id in item_ids)
+    )
+    timings["delete"] = time.perf_counter() - started
+    return timings
+
+
+async def run_bulk(client, rows, batch_size):
+    """Create, update and delete `rows` items in `batch_size` requests."""
+
+    def batches(values):
+        for start in range(0, len(values), batch_size):
+            yield values[start : start + batch_size]
+
+    async def call(method, url, payload):
+        response = await client.request(method, url, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    timings = {}
+    item_ids = []
+    started = time.perf_counter()
+    for batch in batches(range(rows)):
+        results = await call(
+            "POST", "/items/bulk", [{"name": f"bulk-{i}"} for i in batch]
+        )
+        item_ids.extend(result["id"] for result in results)
+    timings["create"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for batch in batches(item_ids):
+        await call(
+            "PUT",
+            "/items/bulk",
+            [{"id": item_id, "name": "updated"} for item_id in batch],
+        )
+    timings["update"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for batch in batches(item_ids):
+        await call("DELETE", "/items/bulk", {"ids": batch})
+    timings["delete"] = time.perf_counter() - started
+    return timings
+
+
+async def run(base_url, rows, batch_size, concurrency):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=120.0
+    ) as client:
+        single = await run_single(client, rows, concurrency)
+        bulk = await run_bulk(client, rows, batch_size)
+    return single, bulk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    server = start_server(app_dir, args.mode, args.port)
+    try:
+        wait_until_healthy(base_url)
+        single, bulk = asyncio.run(
+            run(base_url, args.rows, args.batch_size, args.concurrency)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(
+        f"\n{args.rows} rows, {args.mode} mode, single-row endpoints with "
+        f"{args.concurrency} concurrent requests vs bulk batches of "
+        f"{args.batch_size}"
+    )
+    print(f"{'operation':<10} {'single rows/s':>14} {'bulk rows/s':>12}")
+    for operation in ("create", "update", "delete"):
+        print(
+            f"{operation:<10} {args.rows / single[operation]:>14.0f} "
+            f"{args.rows / bulk[operation]:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Compare requests/sec and latency percentiles of the sync (psycopg2 on the
+threadpool) and async (asyncpg) data-access modes against a local
+Postgres. Each mode gets its own uvicorn server, started with `DB_MODE`
+set, and the same closed-loop load from `--concurrency` clients. The
+client, server and Postgres compete for CPU, so run it on a machine with
+a few spare cores.
+
+    python load_test.py --duration 20 --concurrency 200
+    python load_test.py --app-dir ../db_poc --scenario partners
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+SCENARIOS = ("items", "partners")
+
+
+# --- Scenarios ---
+# Each returns an async `request(client)` callable for one operation.
+async def items_scenario(client, seed_count=200):
+    """80% single-item reads, 15% page reads, 5% inserts."""
+    item_ids = []
+    for i in range(seed_count):
+        response = await client.post(
+            "/items/", json={"name": f"load-{i}", "description": "seed"}
+        )
+        response.raise_for_status()
+        item_ids.append(response.json()["id"])
+
+    async def request(client):
+        roll = random.random()
+        if roll < 0.80:
+            return await client.get(f"/items/{random.choice(item_ids)}")
+        if roll < 0.95:
+            return await client.get("/items/", params={"limit": 20})
+        return await client.post(
+            "/items/", json={"name": "load", "description": "insert"}
+        )
+
+    return request
+
+
+async def partners_scenario(client):
+    """Auth lookups for unknown keys (always a database miss), plus signups."""
+
+    async def request(client):
+        if random.random() < 0.9:
+            return await client.get(f"/partners/unknown-{random.random()}")
+        return await client.post("/partners/", json={"name": "load"})
+
+    return request
+
+
+# --- Load generation ---
+async def run_load(base_url, scenario, duration, concurrency):
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30.0
+    ) as client:
+        if scenario == "items":
+            request = await items_scenario(client)
+        else:
+            request = await partners_scenario(client)
+
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await request(client)
+                    ok = response.status_code < 500
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - started)
+                if not ok:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stats = (await client.get("/stats")).json()
+
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "db_pool": stats.get("db_pool", {}),
+    }
+
+
+def start_server(app_dir, mode, port):
+    env = dict(os.environ, DB_MODE=mode)
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=app_dir,
+        env=env,
+    )
+
+
+def wait_until_healthy(base_url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--app-dir", default=os.path.dirname(os.path.abspath(__file__))
+    )
+    parser.add_argument("--scenario", choices=SCENARIOS, default="items")
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    for mode in args.modes:
+        server = start_server(args.app_dir, mode, args.port)
+        try:
+            wait_until_healthy(base_url)
+            results[mode] = asyncio.run(
+                run_load(
+                    base_url, args.scenario, args.duration, args.concurrency
+                )
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(
+        f"\nScenario '{args.scenario}', {args.concurrency} clients, "
+        f"{args.duration:.0f}s per mode"
+    )
+    print(
+        f"{'mode':<6} {'requests':>9} {'errors':>7} {'req/s':>9} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'pool wait ms':>13}"
+    )
+    for mode, result in results.items():
+        pool = result["db_pool"]
+        pool_wait = pool.get("mean_wait_ms", pool.get("mean_acquire_ms", 0))
+        print(
+            f"{mode:<6} {result['requests']:>9} {result['errors']:>7} "
+            f"{result['rps']:>9.1f} {result['p50_ms']:>8.1f} "
+            f"{result['p99_ms']:>8.1f} {pool_wait:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
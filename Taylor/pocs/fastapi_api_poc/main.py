@@ -1,10 +1,23 @@
 from typing import List, Optional
+import asyncio
+import base64
+import binascii
+import json
 import os
-import time
+import sys
+import asyncpg
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from fastapi import FastAPI, HTTPException, status, Depends
+from fastapi import FastAPI, HTTPException, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from repository import AsyncItemRepository, ItemRepository
+
+# Shared PoC modules live in pocs/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.async_db import AsyncConnectionPool, ThreadpoolProxy  # noqa: E402
+from common.db_pool import ConnectionPool, PoolTimeoutError  # noqa: E402
 
 # --- Database Connection Parameters ---
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -13,6 +26,23 @@ DB_USER = os.getenv("DB_USER", "andrei")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "mysecretpassword")
 DB_PORT = os.getenv("DB_PORT", "5432")
 
+# --- Connection Pool Settings ---
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+
+# Rows fetched per round trip by the NDJSON export's server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+# Upper bound on rows in one bulk request (one statement, one transaction)
+MAX_BULK_ITEMS = int(os.getenv("MAX_BULK_ITEMS", "10000"))
+
+# "sync": blocking psycopg2 on Starlette's threadpool
+# "async": asyncpg with prepared statements on the event loop
+DB_MODE = os.getenv("DB_MODE", "sync")
+if DB_MODE not in ("sync", "async"):
+    raise ValueError(f"Unsupported DB_MODE: {DB_MODE}")
+
 # --- FastAPI App ---
 app = FastAPI(
     title="FastAPI CRUD PoC",
@@ -23,41 +53,84 @@ app = FastAPI(
 )
 
 
-def get_db_connection():
-    """Establishes and returns a database connection."""
-    conn = None
-    while conn is None:
-        try:
-            conn = psycopg2.connect(
-                host=DB_HOST,
-                dbname=DB_NAME,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                port=DB_PORT,
-            )
-        except psycopg2.OperationalError as e:
-            print(f"Database connection failed: {e}. Retrying in 5 seconds...")
-            time.sleep(5)
-    return conn
+def connect():
+    """Open a new database connection for the pool."""
+    return psycopg2.connect(
+        host=DB_HOST,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        port=DB_PORT,
+    )
+
+
+if DB_MODE == "async":
+    db_pool = AsyncConnectionPool(
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+        host=DB_HOST,
+        port=int(DB_PORT),
+        database=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+    )
+    items = AsyncItemRepository(db_pool)
+else:
+    db_pool = ConnectionPool(
+        connect,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+    )
+    # Same coroutine interface; each query runs on the threadpool
+    items = ThreadpoolProxy(ItemRepository(db_pool))
+
+
+@app.exception_handler(PoolTimeoutError)
+@app.exception_handler(psycopg2.OperationalError)
+@app.exception_handler(asyncpg.PostgresConnectionError)
+@app.exception_handler(ConnectionError)
+def database_unavailable(request, exc):
+    """Fail fast with 503 instead of retrying inside the request."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": f"Database unavailable: {exc}"},
+    )
+
+
+async def open_pool():
+    if DB_MODE == "async":
+        await db_pool.open()
+    else:
+        await run_in_threadpool(db_pool.open)
 
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     """Create the 'items' table on application startup if it doesn't exist."""
-    conn = get_db_connection()
-    with conn.cursor() as cursor:
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS items (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                description TEXT
-            );
-        """
-        )
-        conn.commit()
-    conn.close()
-    print("Database table 'items' is ready.")
+    while True:
+        try:
+            await open_pool()
+            break
+        except (
+            psycopg2.OperationalError,
+            asyncpg.PostgresError,
+            OSError,
+        ) as e:
+            print(f"Database connection failed: {e}. Retrying in 5 seconds...")
+            await asyncio.sleep(5)
+
+    await items.create_schema()
+    print(f"Database table 'items' is ready ({DB_MODE} mode).")
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if DB_MODE == "async":
+        await db_pool.close()
+    else:
+        db_pool.close()
 
 
 # --- Pydantic Models ---
@@ -77,77 +150,198 @@ class Item(ItemBase):
         orm_mode = True
 
 
+class ItemUpdate(ItemBase):
+    id: int
+
+
+class BulkDelete(BaseModel):
+    ids: List[int]
+
+
+class BulkItemResult(BaseModel):
+    id: int
+    # "created", "updated", "deleted" or "not_found"
+    status: str
+    item: Optional[Item] = None
+
+
+# --- Pagination ---
+# Largest id a cursor can carry: items.id is a Postgres integer
+MAX_ITEM_ID = 2**31 - 1
+
+
+# Cursors are opaque to clients so the keyset can change without breaking
+# them; today they wrap the last id of the previous page.
+def encode_cursor(after_id):
+    payload = json.dumps({"after_id": after_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after_id = json.loads(base64.urlsafe_b64decode(padded))["after_id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        after_id = None
+    # bool is an int too, so it's excluded explicitly
+    if (
+        not isinstance(after_id, int)
+        or isinstance(after_id, bool)
+        or not 0 <= after_id <= MAX_ITEM_ID
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after_id
+
+
 # --- API Endpoints ---
 @app.post("/items/", response_model=Item, status_code=status.HTTP_201_CREATED)
-def create_item(item: ItemCreate, conn=Depends(get_db_connection)):
+async def create_item(item: ItemCreate):
     """Create a new item."""
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute(
-            "INSERT INTO items (name, description) VALUES (%s, %s) RETURNING *;",
-            (item.name, item.description),
-        )
-        new_item = cursor.fetchone()
-        conn.commit()
-    conn.close()
-    return new_item
+    return await items.create(item.name, item.description)
 
 
 @app.get("/items/", response_model=List[Item])
-def read_items(
-    skip: int = 0, limit: int = 100, conn=Depends(get_db_connection)
+async def read_items(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    skip: int = 0,
 ):
-    """Retrieve all items with optional pagination."""
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute(
-            "SELECT * FROM items ORDER BY id LIMIT %s OFFSET %s;", (limit, skip)
+    """
+    Retrieve items in id order, one page at a time.
+
+    Pass the `X-Next-Cursor` header of a page as `cursor` to get the next
+    one; it is omitted on the last page. Cursor pages use `WHERE id > ...`
+    on the primary key, so they cost the same however deep they are.
+    `skip` (OFFSET) is still accepted for existing clients.
+    """
+    if cursor is not None and skip:
+        raise HTTPException(
+            status_code=400, detail="Use either cursor or skip, not both"
+        )
+    if skip:
+        page = await items.list(skip, limit)
+    else:
+        after_id = decode_cursor(cursor) if cursor is not None else 0
+        page = await items.list_after(after_id, limit)
+    if limit > 0 and len(page) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(page[-1]["id"])
+    return page
+
+
+@app.get("/items/export")
+async def export_items():
+    """
+    Stream every item as NDJSON (one JSON object per line), in id order.
+
+    Rows come from a server-side cursor in batches of EXPORT_BATCH_SIZE,
+    so memory use stays flat however large the table is.
+    """
+
+    async def ndjson():
+        async for rows in items.stream(EXPORT_BATCH_SIZE):
+            yield "".join(json.dumps(dict(row)) + "\n" for row in rows)
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+# --- Bulk Endpoints ---
+# Each request is applied in a single transaction: either every row is
+# written or none is. Results are per row, in the order of the request.
+def check_bulk_size(rows):
+    if len(rows) > MAX_BULK_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BULK_ITEMS} items per bulk request",
+        )
+
+
+def check_unique_ids(item_ids):
+    if len(set(item_ids)) != len(item_ids):
+        raise HTTPException(
+            status_code=400, detail="Duplicate ids in bulk request"
+        )
+
+
+@app.post(
+    "/items/bulk",
+    response_model=List[BulkItemResult],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_items(new_items: List[ItemCreate]):
+    """Create many items with one multi-row INSERT ... RETURNING."""
+    check_bulk_size(new_items)
+    if not new_items:
+        return []
+    created = await items.create_many(
+        [(item.name, item.description) for item in new_items]
+    )
+    return [
+        {"id": item["id"], "status": "created", "item": item}
+        for item in created
+    ]
+
+
+@app.put("/items/bulk", response_model=List[BulkItemResult])
+async def update_items(changes: List[ItemUpdate]):
+    """Update many items with one UPDATE ... FROM (VALUES ...)."""
+    check_bulk_size(changes)
+    check_unique_ids([change.id for change in changes])
+    if not changes:
+        return []
+    updated = await items.update_many(
+        [(change.id, change.name, change.description) for change in changes]
+    )
+    by_id = {item["id"]: item for item in updated}
+    return [
+        (
+            {"id": change.id, "status": "updated", "item": by_id[change.id]}
+            if change.id in by_id
+            else {"id": change.id, "status": "not_found"}
         )
-        items = cursor.fetchall()
-    conn.close()
-    return items
+        for change in changes
+    ]
+
+
+@app.delete("/items/bulk", response_model=List[BulkItemResult])
+async def delete_items(request: BulkDelete):
+    """Delete many items with one DELETE ... WHERE id = ANY(...)."""
+    check_bulk_size(request.ids)
+    check_unique_ids(request.ids)
+    if not request.ids:
+        return []
+    deleted = set(await items.delete_many(request.ids))
+    return [
+        {
+            "id": item_id,
+            "status": "deleted" if item_id in deleted else "not_found",
+        }
+        for item_id in request.ids
+    ]
 
 
 @app.get("/items/{item_id}", response_model=Item)
-def read_item(item_id: int, conn=Depends(get_db_connection)):
+async def read_item(item_id: int):
     """Retrieve a single item by its ID."""
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute("SELECT * FROM items WHERE id = %s;", (item_id,))
-        item = cursor.fetchone()
-    conn.close()
+    item = await items.get(item_id)
     if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
 
 
 @app.put("/items/{item_id}", response_model=Item)
-def update_item(
-    item_id: int, item: ItemCreate, conn=Depends(get_db_connection)
-):
+async def update_item(item_id: int, item: ItemCreate):
     """Update an existing item."""
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute(
-            "UPDATE items SET name = %s, description = %s WHERE id = %s "
-            "RETURNING *;",
-            (item.name, item.description, item_id),
-        )
-        updated_item = cursor.fetchone()
-        conn.commit()
-    conn.close()
+    updated_item = await items.update(item_id, item.name, item.description)
     if updated_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return updated_item
 
 
 @app.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_item(item_id: int, conn=Depends(get_db_connection)):
+async def delete_item(item_id: int):
     """Delete an item."""
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute(
-            "DELETE FROM items WHERE id = %s RETURNING id;", (item_id,)
-        )
-        deleted_item = cursor.fetchone()
-        conn.commit()
-    conn.close()
-    if deleted_item is None:
+    if not await items.delete(item_id):
         raise HTTPException(status_code=404, detail="Item not found")
     return
 
@@ -157,6 +351,12 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/stats")
+def stats():
+    """Connection pool metrics."""
+    return {"db_mode": DB_MODE, "db_pool": db_pool.stats()}
+
+
 if __name__ == "__main__":
     import uvicorn
 
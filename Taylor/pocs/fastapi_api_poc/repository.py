@@ -0,0 +1,305 @@
+from psycopg2.extras import RealDictCursor, execute_values
+
+CREATE_ITEMS_TABLE = """
+    CREATE TABLE IF NOT EXISTS items (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        description TEXT
+    );
+"""
+
+# RETURNING doesn't promise any row order, so each row carries its
+# position in the request and is matched back up by id. The ids come
+# from `numbered`, which is evaluated once (it calls nextval).
+CREATE_MANY_SQL = """
+    WITH numbered AS (
+        SELECT new_rows.*,
+            nextval(pg_get_serial_sequence('items', 'id')) AS id
+        FROM ({new_rows}) AS new_rows
+    ),
+    inserted AS (
+        INSERT INTO items (id, name, description)
+        SELECT id, name, description FROM numbered
+        RETURNING *
+    )
+    SELECT inserted.* FROM inserted JOIN numbered USING (id)
+    ORDER BY numbered.ordinal;
+"""
+
+
+class ItemRepository:
+    """Blocking item queries on a psycopg2 `ConnectionPool`."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def create_schema(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(CREATE_ITEMS_TABLE)
+            conn.commit()
+
+    def create(self, name, description):
+        with self.pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(
+                    "INSERT INTO items (name, description) VALUES (%s, %s) "
+                    "RETURNING *;",
+                    (name, description),
+                )
+                new_item = cursor.fetchone()
+            conn.commit()
+        return new_item
+
+    def list(self, skip, limit):
+        with self.pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(
+                    "SELECT * FROM items ORDER BY id LIMIT %s OFFSET %s;",
+                    (limit, skip),
+                )
+                return cursor.fetchall()
+
+    def list_after(self, after_id, limit):
+        """Keyset page: the first `limit` items with an id above `after_id`."""
+        with self.pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(
+                    "SELECT * FROM items WHERE id > %s ORDER BY id LIMIT %s;",
+                    (after_id, limit),
+                )
+                return cursor.fetchall()
+
+    def stream(self, batch_size):
+        """
+        Yield every item, in id order, as lists of up to `batch_size` rows.
+
+        Uses a server-side (named) cursor, so only one batch is held in
+        memory at a time regardless of table size.
+        """
+        with self.pool.connection() as conn:
+            with conn.cursor(
+                name="items_export", cursor_factory=RealDictCursor
+            ) as cursor:
+                cursor.itersize = batch_size
+                cursor.execute("SELECT * FROM items ORDER BY id;")
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+
+    def get(self, item_id):
+        with self.pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(
+                    "SELECT * FROM items WHERE id = %s;", (item_id,)
+                )
+                return cursor.fetchone()
+
+    def update(self, item_id, name, description):
+        with self.pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(
+                    "UPDATE items SET name = %s, description = %s "
+                    "WHERE id = %s RETURNING *;",
+                    (name, description, item_id),
+                )
+                updated_item = cursor.fetchone()
+            conn.commit()
+        return updated_item
+
+    def delete(self, item_id):
+        """Delete an item; returns False if it didn't exist."""
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "DELETE FROM items WHERE id = %s RETURNING id;", (item_id,)
+                )
+                deleted = cursor.fetchone() is not None
+            conn.commit()
+        return deleted
+
+    # --- Bulk operations: one transaction each ---
+    def create_many(self, rows):
+        """Insert `(name, description)` rows; returns them in input order."""
+        numbered = [
+            (ordinal, name, description)
+            for ordinal, (name, description) in enumerate(rows)
+        ]
+        with self.pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                created = execute_values(
+                    cursor,
+                    CREATE_MANY_SQL.format(
+                        new_rows="SELECT * FROM (VALUES %s) "
+                        "AS v (ordinal, name, description)"
+                    ),
+                    numbered,
+                    template="(%s::integer, %s::varchar, %s::text)",
+                    page_size=len(numbered),
+                    fetch=True,
+                )
+            conn.commit()
+        return created
+
+    def update_many(self, rows):
+        """Apply `(id, name, description)` rows; returns the updated items."""
+        # Rows are locked in id order first, so two bulk updates of
+        # overlapping ids wait for each other instead of deadlocking
+        rows = sorted(rows, key=lambda row: row[0])
+        with self.pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(
+                    "SELECT id FROM items WHERE id = ANY(%s) "
+                    "ORDER BY id FOR UPDATE;",
+                    ([row[0] for row in rows],),
+                )
+                updated = execute_values(
+                    cursor,
+                    "UPDATE items SET name = v.name, "
+                    "description = v.description "
+                    "FROM (VALUES %s) AS v (id, name, description) "
+                    "WHERE items.id = v.id RETURNING items.*;",
+                    rows,
+                    template="(%s::integer, %s::varchar, %s::text)",
+                    page_size=len(rows),
+                    fetch=True,
+                )
+            conn.commit()
+        return updated
+
+    def delete_many(self, item_ids):
+        """Delete items by id; returns the ids that existed."""
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "DELETE FROM items WHERE id = ANY(%s) RETURNING id;",
+                    (list(item_ids),),
+                )
+                deleted = [row[0] for row in cursor.fetchall()]
+            conn.commit()
+        return deleted
+
+
+class AsyncItemRepository:
+    """`ItemRepository` on an asyncpg `AsyncConnectionPool`."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def create_schema(self):
+        async with self.pool.connection() as conn:
+            await conn.execute(CREATE_ITEMS_TABLE)
+
+    async def create(self, name, description):
+        async with self.pool.connection() as conn:
+            row = await conn.fetchrow(
+                "INSERT INTO items (name, description) VALUES ($1, $2) "
+                "RETURNING *;",
+                name,
+                description,
+            )
+        return dict(row)
+
+    async def list(self, skip, limit):
+        async with self.pool.connection() as conn:
+            rows = await conn.fetch(
+                "SELECT * FROM items ORDER BY id LIMIT $1 OFFSET $2;",
+                limit,
+                skip,
+            )
+        return [dict(row) for row in rows]
+
+    async def list_after(self, after_id, limit):
+        async with self.pool.connection() as conn:
+            rows = await conn.fetch(
+                "SELECT * FROM items WHERE id > $1 ORDER BY id LIMIT $2;",
+                after_id,
+                limit,
+            )
+        return [dict(row) for row in rows]
+
+    async def stream(self, batch_size):
+        # asyncpg cursors are server-side portals and need a transaction
+        async with self.pool.connection() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor("SELECT * FROM items ORDER BY id;")
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        break
+                    yield [dict(row) for row in rows]
+
+    async def get(self, item_id):
+        async with self.pool.connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT * FROM items WHERE id = $1;", item_id
+            )
+        return dict(row) if row else None
+
+    async def update(self, item_id, name, description):
+        async with self.pool.connection() as conn:
+            row = await conn.fetchrow(
+                "UPDATE items SET name = $1, description = $2 "
+                "WHERE id = $3 RETURNING *;",
+                name,
+                description,
+                item_id,
+            )
+        return dict(row) if row else None
+
+    async def delete(self, item_id):
+        async with self.pool.connection() as conn:
+            deleted_id = await conn.fetchval(
+                "DELETE FROM items WHERE id = $1 RETURNING id;", item_id
+            )
+        return deleted_id is not None
+
+    # --- Bulk operations: one transaction each ---
+    # Rows are passed as one array per column and expanded with unnest, so
+    # every batch size shares a single prepared statement.
+    async def create_many(self, rows):
+        names, descriptions = zip(*rows)
+        async with self.pool.connection() as conn:
+            created = await conn.fetch(
+                CREATE_MANY_SQL.format(
+                    new_rows="SELECT * FROM unnest($1::varchar[], $2::text[]) "
+                    "WITH ORDINALITY AS v (name, description, ordinal)"
+                ),
+                names,
+                descriptions,
+            )
+        return [dict(row) for row in created]
+
+    async def update_many(self, rows):
+        item_ids, names, descriptions = zip(
+            *sorted(rows, key=lambda row: row[0])
+        )
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "SELECT id FROM items WHERE id = ANY($1::integer[]) "
+                    "ORDER BY id FOR UPDATE;",
+                    item_ids,
+                )
+                updated = await conn.fetch(
+                    "UPDATE items SET name = v.name, "
+                    "description = v.description "
+                    "FROM unnest($1::integer[], $2::varchar[], $3::text[]) "
+                    "AS v (id, name, description) "
+                    "WHERE items.id = v.id RETURNING items.*;",
+                    item_ids,
+                    names,
+                    descriptions,
+                )
+        return [dict(row) for row in updated]
+
+    async def delete_many(self, item_ids):
+        async with self.pool.connection() as conn:
+            deleted = await conn.fetch(
+                "DELETE FROM items WHERE id = ANY($1::integer[]) "
+                "RETURNING id;",
+                list(item_ids),
+            )
+        return [row["id"] for row in deleted]
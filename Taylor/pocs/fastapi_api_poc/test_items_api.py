@@ -0,0 +1,263 @@
+import base64
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+class FakeItemRepository:
+    """The repository's coroutine interface over a dict of rows."""
+
+    def __init__(self):
+        self.rows = {}
+        self.next_id = 1
+
+    def add(self, name, description=None):
+        item = {"id": self.next_id, "name": name, "description": description}
+        self.rows[item["id"]] = item
+        self.next_id += 1
+        return dict(item)
+
+    async def list(self, skip, limit):
+        return [self.rows[i] for i in sorted(self.rows)][skip : skip + limit]
+
+    async def list_after(self, after_id, limit):
+        return [self.rows[i] for i in sorted(self.rows) if i > after_id][
+            :limit
+        ]
+
+    async def create_many(self, rows):
+        return [self.add(name, description) for name, description in rows]
+
+    async def update_many(self, rows):
+        # Like the SQL, results come back in id order, not request order
+        for item_id, name, description in sorted(rows):
+            if item_id in self.rows:
+                self.rows[item_id].update(name=name, description=description)
+        return [
+            dict(self.rows[item_id])
+            for item_id, _, _ in sorted(rows)
+            if item_id in self.rows
+        ]
+
+    async def delete_many(self, item_ids):
+        deleted = sorted(set(item_ids) & set(self.rows))
+        for item_id in deleted:
+            del self.rows[item_id]
+        return deleted
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    repository = FakeItemRepository()
+    monkeypatch.setattr(main, "items", repository)
+    return repository
+
+
+@pytest.fixture
+def client(repository):
+    # Not entered as a context manager: startup would connect to Postgres
+    return TestClient(main.app)
+
+
+def walk_pages(client, limit, between_pages=None):
+    """Follow X-Next-Cursor from the first page; returns the pages."""
+    pages = []
+    params = {"limit": limit}
+    while True:
+        response = client.get("/items/", params=params)
+        assert response.status_code == 200
+        pages.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+        if between_pages is not None:
+            between_pages(pages[-1])
+        params = {"limit": limit, "cursor": cursor}
+
+
+def test_cursor_round_trip():
+    """Tests that a cursor decodes to the id it was made from."""
+    for after_id in (0, 1, 12345, main.MAX_ITEM_ID):
+        cursor = main.encode_cursor(after_id)
+        assert "=" not in cursor
+        assert main.decode_cursor(cursor) == after_id
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        None,
+        b"not json",
+        b"[1, 2]",
+        b'{"id": 5}',
+        b'{"after_id": "5"}',
+        b'{"after_id": true}',
+        b'{"after_id": -1}',
+        b'{"after_id": 1e3}',
+        b'{"after_id": 99999999999}',
+    ],
+)
+def test_malformed_or_tampered_cursor_is_rejected(client, payload):
+    """Tests that a cursor the server didn't issue gets a 400."""
+    if payload is None:
+        cursor = "%%% not base64 %%%"
+    else:
+        cursor = base64.urlsafe_b64encode(payload).decode("ascii")
+
+    response = client.get("/items/", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_cursor_and_skip_are_exclusive(client):
+    """Tests that cursor and skip can't be combined."""
+    cursor = main.encode_cursor(3)
+    response = client.get("/items/", params={"cursor": cursor, "skip": 2})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 12])
+def test_walking_pages_neither_skips_nor_repeats(client, repository, limit):
+    """Tests that pages cover every row once, with duplicate names too."""
+    for index in range(12):
+        # Runs of identical rows, split across page boundaries
+        repository.add(f"item-{index // 5}", "same description")
+
+    pages = walk_pages(client, limit)
+
+    seen = [item_id for page in pages for item_id in page]
+    assert seen == sorted(repository.rows)
+    assert all(len(page) <= limit for page in pages)
+
+
+def test_rows_deleted_between_pages_do_not_shift_later_pages(
+    client, repository
+):
+    """Tests that deleting a seen row doesn't make the next page skip one."""
+    for index in range(9):
+        repository.add("same name")
+
+    def delete_last_seen(page):
+        del repository.rows[page[-1]]
+
+    pages = walk_pages(client, 3, between_pages=delete_last_seen)
+
+    assert pages == [[1, 2, 3], [4, 5, 6], [7, 8, 9], []]
+
+
+def test_last_page_has_no_cursor(client, repository):
+    """Tests that a page shorter than the limit has no next cursor."""
+    repository.add("only", "description")
+
+    response = client.get("/items/", params={"limit": 10})
+
+    assert "X-Next-Cursor" not in response.headers
+    assert response.json() == [
+        {"id": 1, "name": "only", "description": "description"}
+    ]
+
+
+def test_bulk_create_returns_items_in_request_order(client, repository):
+    """Tests that each created item is reported at its request position."""
+    response = client.post(
+        "/items/bulk",
+        json=[{"name": "b"}, {"name": "a", "description": "first"}],
+    )
+
+    assert response.status_code == 201
+    assert response.json() == [
+        {
+            "id": 1,
+            "status": "created",
+            "item": {"id": 1, "name": "b", "description": None},
+        },
+        {
+            "id": 2,
+            "status": "created",
+            "item": {"id": 2, "name": "a", "description": "first"},
+        },
+    ]
+
+
+def test_bulk_update_reports_missing_ids(client, repository):
+    """Tests that unknown ids are not_found, the rest updated, in order."""
+    for name in ("a", "b", "c"):
+        repository.add(name)
+
+    response = client.put(
+        "/items/bulk",
+        json=[
+            {"id": 3, "name": "C"},
+            {"id": 99, "name": "missing"},
+            {"id": 1, "name": "A"},
+        ],
+    )
+
+    assert response.status_code == 200
+    assert [(r["id"], r["status"]) for r in response.json()] == [
+        (3, "updated"),
+        (99, "not_found"),
+        (1, "updated"),
+    ]
+    assert response.json()[0]["item"]["name"] == "C"
+    assert response.json()[1]["item"] is None
+    assert [repository.rows[i]["name"] for i in (1, 2, 3)] == ["A", "b", "C"]
+
+
+def test_bulk_delete_reports_missing_ids(client, repository):
+    """Tests that bulk delete reports which ids existed, in order."""
+    for name in ("a", "b", "c"):
+        repository.add(name)
+
+    response = client.request("DELETE", "/items/bulk", json={"ids": [3, 7, 1]})
+
+    assert response.status_code == 200
+    assert [(r["id"], r["status"]) for r in response.json()] == [
+        (3, "deleted"),
+        (7, "not_found"),
+        (1, "deleted"),
+    ]
+    assert list(repository.rows) == [2]
+
+
+@pytest.mark.parametrize(
+    "method, body",
+    [
+        ("POST", [{"name": "x"}] * 3),
+        ("PUT", [{"id": i, "name": "x"} for i in range(3)]),
+        ("DELETE", {"ids": [1, 2, 3]}),
+    ],
+)
+def test_bulk_requests_over_the_limit_are_rejected(
+    client, repository, monkeypatch, method, body
+):
+    """Tests that a bulk request above MAX_BULK_ITEMS gets a 413."""
+    monkeypatch.setattr(main, "MAX_BULK_ITEMS", 2)
+
+    response = client.request(method, "/items/bulk", json=body)
+
+    assert response.status_code == 413
+    assert repository.rows == {}
+
+
+@pytest.mark.parametrize(
+    "method, body",
+    [
+        ("PUT", [{"id": 1, "name": "x"}, {"id": 1, "name": "y"}]),
+        ("DELETE", {"ids": [1, 2, 1]}),
+    ],
+)
+def test_bulk_requests_with_duplicate_ids_are_rejected(
+    client, repository, method, body
+):
+    """Tests that an id repeated in one bulk request gets a 400."""
+    repository.add("a")
+    repository.add("b")
+
+    response = client.request(method, "/items/bulk", json=body)
+
+    assert response.status_code == 400
+    assert [item["name"] for item in repository.rows.values()] == ["a", "b"]
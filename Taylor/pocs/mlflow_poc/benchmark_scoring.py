@@ -0,0 +1,112 @@
+"""
+Compare scoring a LogisticRegression through its MLflow sklearn model and
+through the NumPy-only `linear-model` artifact: worker cold start (a fresh
+process importing, loading and scoring one row) and single-row latency.
+
+    python benchmark_scoring.py --features 5 --calls 10000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import mlflow.sklearn
+import numpy as np
+from mlflow.sklearn import SERIALIZATION_FORMAT_CLOUDPICKLE
+from sklearn.linear_model import LogisticRegression
+
+from linear_scorer import LinearScorer, export_linear_model
+
+POC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+COLD_START = {
+    "sklearn": (
+        "import mlflow.sklearn\n"
+        "model = mlflow.sklearn.load_model({path!r})\n"
+    ),
+    "linear": (
+        "from linear_scorer import LinearScorer\n"
+        "model = LinearScorer.load({path!r})\n"
+    ),
+}
+
+
+def cold_start_seconds(kind, path, features, repeats):
+    """Best wall-clock time of a fresh process scoring one row."""
+    script = COLD_START[kind].format(path=path) + (
+        f"model.predict_proba([[0.5] * {features}])\n"
+    )
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=POC_DIR,
+            check=True,
+            capture_output=True,
+        )
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def row_latency_us(model, rows):
+    """Median microseconds per single-row `predict_proba` call."""
+    timings = np.empty(len(rows))
+    for index, row in enumerate(rows):
+        started = time.perf_counter()
+        model.predict_proba(row[np.newaxis, :])
+        timings[index] = time.perf_counter() - started
+    return np.median(timings) * 1e6, np.percentile(timings, 99) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--features", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=10_000)
+    parser.add_argument("--cold-starts", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X = rng.random((1_000, args.features))
+    model = LogisticRegression(C=0.5, random_state=42)
+    model.fit(X, X[:, 0] > 0.5)
+    rows = rng.random((args.calls, args.features))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {
+            "sklearn": os.path.join(tmp, "sklearn-model"),
+            "linear": os.path.join(tmp, "linear-model"),
+        }
+        mlflow.sklearn.save_model(
+            model,
+            paths["sklearn"],
+            serialization_format=SERIALIZATION_FORMAT_CLOUDPICKLE,
+        )
+        export_linear_model(model, paths["linear"])
+        scorers = {
+            "sklearn": mlflow.sklearn.load_model(paths["sklearn"]),
+            "linear": LinearScorer.load(paths["linear"]),
+        }
+        matches = np.allclose(
+            scorers["linear"].predict_proba(rows),
+            scorers["sklearn"].predict_proba(rows),
+        )
+
+        print(f"{args.features} features, {args.calls} single-row calls")
+        print(
+            f"{'artifact':<8} {'cold start s':>12} {'p50 us':>8} {'p99 us':>8}"
+        )
+        for kind, path in paths.items():
+            seconds = cold_start_seconds(
+                kind, path, args.features, args.cold_starts
+            )
+            p50, p99 = row_latency_us(scorers[kind], rows)
+            print(f"{kind:<8} {seconds:>12.2f} {p50:>8.1f} {p99:>8.1f}")
+    print(f"\nProbabilities match: {'yes' if matches else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from model_serving import (
+    MLRUNS_DIR,
+    MODEL_LOADERS,
+    ModelCache,
+    ModelNotFoundError,
+    ScoringService,
+)
+
+# --- Model Store Configuration ---
+# Models are read from the local file store, so no tracking server is
+# needed; MODEL_POLL_SECONDS is how often newly registered versions are
+# picked up (0 disables polling, leaving POST /models/{name}/refresh).
+MLRUNS_PATH = os.getenv("MLRUNS_DIR", MLRUNS_DIR)
+MODEL_CACHE_MAX_MB = float(os.getenv("MODEL_CACHE_MAX_MB", "256"))
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", "30"))
+# MODEL_FORMAT is "sklearn" for the logged sklearn model, or "linear" for
+# the NumPy-only copy, which loads without importing sklearn or mlflow
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "sklearn")
+
+app = FastAPI(
+    title="MLflow Model Scoring PoC",
+    description="Score batches with models registered in MLflow.",
+    version="0.1.0",
+)
+
+scoring = ScoringService(
+    ModelCache(
+        max_bytes=int(MODEL_CACHE_MAX_MB * 2**20),
+        loader=MODEL_LOADERS[MODEL_FORMAT],
+    ),
+    mlruns_dir=MLRUNS_PATH,
+)
+
+
+# --- Pydantic Models ---
+class ScoreRequest(BaseModel):
+    instances: List[List[float]]
+    version: Optional[str] = None
+
+
+class ScoreResponse(BaseModel):
+    model: str
+    version: int
+    classes: List[str]
+    probabilities: List[List[float]]
+
+
+@app.on_event("startup")
+def start_watching():
+    """Poll the registry for new versions of the models being served."""
+    if MODEL_POLL_SECONDS > 0:
+        scoring.watch(MODEL_POLL_SECONDS)
+
+
+@app.on_event("shutdown")
+def stop_watching():
+    scoring.stop()
+
+
+# Plain `def` endpoints run on the threadpool, so scoring doesn't block
+# the event loop
+@app.post("/models/{name}/score", response_model=ScoreResponse)
+def score(name: str, request: ScoreRequest):
+    """Score a batch of feature rows in one `predict_proba` call."""
+    if not request.instances:
+        raise HTTPException(status_code=422, detail="No instances to score")
+    try:
+        scores = scoring.score(name, request.instances, request.version)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {
+        "model": name,
+        "version": scores.model.version,
+        "classes": [str(label) for label in scores.classes],
+        "probabilities": scores.probabilities.tolist(),
+    }
+
+
+@app.post("/models/{name}/refresh")
+def refresh(name: str):
+    """Switch to the latest registered version of a model right away."""
+    try:
+        model_version = scoring.refresh(name)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"model": name, "version": model_version.version}
+
+
+@app.get("/models/stats")
+def stats():
+    """Versions being served and model cache counters."""
+    return scoring.stats()
+
+
+@app.get("/health")
+def health_check():
+    return {"status": "ok"}
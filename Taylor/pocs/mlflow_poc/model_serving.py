@@ -0,0 +1,398 @@
+"""
+Serve models registered by `run_mlflow_experiment.py` straight from the
+local `mlruns` file store, without a tracking server.
+
+Registered versions are resolved by reading the registry's `meta.yaml`
+files, and their artifacts are found under the local `mlruns` directory
+even if the store was written on another machine. Loaded models are kept
+in a memory-bounded LRU cache, so each version is unpickled once per
+process, and `ScoringService` swaps to a newly registered version only
+once it has been loaded.
+"""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import NamedTuple
+from urllib.parse import unquote, urlparse
+
+import numpy as np
+import yaml
+
+from linear_scorer import ARTIFACT_FILE, ARTIFACT_PATH, LinearScorer
+
+MLRUNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mlruns")
+READY = "READY"
+
+
+class ModelNotFoundError(LookupError):
+    pass
+
+
+class ModelVersion(NamedTuple):
+    name: str
+    version: int
+    run_id: str
+    path: str
+
+
+class Scores(NamedTuple):
+    """`probabilities[i, j]` is the probability of `classes[j]` for row i."""
+
+    model: ModelVersion
+    classes: np.ndarray
+    probabilities: np.ndarray
+
+
+def _read_yaml(path):
+    with open(path, "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _local_artifact_path(source, mlruns_dir):
+    """
+    Map a version's `file://` source to a path under `mlruns_dir`; the
+    store records absolute paths from wherever it was written.
+    """
+    path = unquote(urlparse(source).path) if "://" in source else source
+    head, sep, tail = path.rpartition("/mlruns/")
+    if sep:
+        return os.path.join(mlruns_dir, *tail.split("/"))
+    return path
+
+
+def resolve_version(name, version=None, mlruns_dir=MLRUNS_DIR):
+    """
+    Return the `ModelVersion` of registered model `name`: `version` is a
+    version number, a stage such as "Production", or None for the latest
+    ready version.
+    """
+    model_dir = os.path.join(mlruns_dir, "models", name)
+    versions = []
+    if os.path.isdir(model_dir):
+        for entry in os.listdir(model_dir):
+            meta_file = os.path.join(model_dir, entry, "meta.yaml")
+            if entry.startswith("version-") and os.path.isfile(meta_file):
+                versions.append(_read_yaml(meta_file))
+    versions = [meta for meta in versions if meta.get("status") == READY]
+    if version is not None and str(version).isdigit():
+        versions = [
+            meta for meta in versions if meta["version"] == int(version)
+        ]
+    elif version is not None:
+        versions = [
+            meta
+            for meta in versions
+            if str(meta.get("current_stage")).lower() == str(version).lower()
+        ]
+    if not versions:
+        raise ModelNotFoundError(
+            f"No ready version {version or 'at all'} of model '{name}' in "
+            f"{mlruns_dir}"
+        )
+    meta = max(versions, key=lambda meta: int(meta["version"]))
+    source = meta.get("storage_location") or meta["source"]
+    return ModelVersion(
+        name,
+        int(meta["version"]),
+        meta["run_id"],
+        _local_artifact_path(source, mlruns_dir),
+    )
+
+
+def load_sklearn_model(path):
+    # Imported here so resolving versions doesn't pay for importing mlflow
+    import mlflow.sklearn
+
+    return mlflow.sklearn.load_model(path)
+
+
+def _run_artifacts_dir(model_path):
+    """
+    The artifacts directory of the run that logged the model at
+    `model_path`. MLflow 2 keeps the model inside it; MLflow 3 keeps it
+    under the experiment's `models/<model id>/artifacts`, with the run id
+    in that model's `meta.yaml`.
+    """
+    model_dir = os.path.dirname(model_path)
+    meta_file = os.path.join(model_dir, "meta.yaml")
+    if os.path.basename(model_path) == "artifacts" and os.path.isfile(
+        meta_file
+    ):
+        run_id = _read_yaml(meta_file).get("source_run_id")
+        if run_id:
+            experiment_dir = os.path.dirname(os.path.dirname(model_dir))
+            return os.path.join(experiment_dir, run_id, "artifacts")
+    return model_dir
+
+
+def load_linear_model(path):
+    """
+    Load the NumPy-only copy of the model that its run logged under
+    `linear-model`, without importing sklearn or mlflow.
+    """
+    directory = os.path.join(_run_artifacts_dir(path), ARTIFACT_PATH)
+    if not os.path.isfile(os.path.join(directory, ARTIFACT_FILE)):
+        # Versions logged before the export existed have none
+        raise ModelNotFoundError(
+            f"No {ARTIFACT_PATH} artifact for the model at {path}; serve "
+            f"this version with MODEL_FORMAT=sklearn"
+        )
+    return LinearScorer.load(directory)
+
+
+MODEL_LOADERS = {"sklearn": load_sklearn_model, "linear": load_linear_model}
+
+
+def pickled_size(model):
+    """Approximate a model's in-memory size by its pickled size."""
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ModelCache:
+    """
+    Loaded models keyed by `(name, version)`, least recently used evicted
+    once their total size passes `max_bytes`.
+
+    Concurrent misses on one version share a single load. A model that is
+    evicted while a request is scoring with it stays alive until that
+    request finishes. The most recently loaded model is always kept, even
+    if it alone is larger than `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        max_bytes=256 * 2**20,
+        loader=load_sklearn_model,
+        sizer=pickled_size,
+    ):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.sizer = sizer
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, model_version):
+        """Return the loaded model for a `ModelVersion`, loading it once."""
+        key = (model_version.name, model_version.version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            future = self._loading.get(key)
+            loading = future is None
+            if loading:
+                future = self._loading[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not loading:
+            return future.result()
+
+        started = time.perf_counter()
+        try:
+            model = self.loader(model_version.path)
+            size = self.sizer(model)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self.load_seconds += time.perf_counter() - started
+            self._entries[key] = (model, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+            del self._loading[key]
+        future.set_result(model)
+        return model
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "models": [f"{name}/{version}" for name, version in self._entries],
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "load_seconds": self.load_seconds,
+            "hit_rate": (
+                (self.hits + self.coalesced) / lookups if lookups else 0.0
+            ),
+        }
+
+
+class ScoringService:
+    """
+    Scores batches with the current version of each registered model.
+
+    A model's version is resolved on its first request and then only by
+    `refresh`, which `watch` can call periodically. A new version is
+    loaded before it replaces the old one, so requests keep being served
+    by the old version until then and none are dropped; requests already
+    scoring finish on the model they started with. Versions pinned by
+    request are resolved once too: a number for good, a stage until
+    `refresh` sees it move.
+    """
+
+    def __init__(self, cache=None, mlruns_dir=MLRUNS_DIR):
+        self.cache = cache if cache is not None else ModelCache()
+        self.mlruns_dir = mlruns_dir
+        self._current = {}
+        # Resolved pins, keyed by (name, version or lowercased stage)
+        self._pinned = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        # Stats
+        self.swaps = 0
+
+    def current_version(self, name):
+        """The `ModelVersion` requests for `name` are served with."""
+        current = self._current.get(name)
+        if current is not None:
+            return current
+        # Loaded outside the lock: the cache already shares one load among
+        # concurrent requests, and other models' requests needn't wait
+        latest = resolve_version(name, mlruns_dir=self.mlruns_dir)
+        self.cache.get(latest)
+        with self._lock:
+            current = self._current.get(name)
+            if current is None or latest.version > current.version:
+                self._current[name] = latest
+            return self._current[name]
+
+    def pinned_version(self, name, version):
+        """The `ModelVersion` a version number or stage resolves to."""
+        key = (name, str(version).lower())
+        pinned = self._pinned.get(key)
+        if pinned is None:
+            pinned = resolve_version(name, version, self.mlruns_dir)
+            self._pinned[key] = pinned
+        return pinned
+
+    def refresh(self, name):
+        """
+        Switch `name` to its latest registered version, loading it first,
+        and move its stage pins to the versions now in those stages;
+        return the version now served.
+        """
+        latest = resolve_version(name, mlruns_dir=self.mlruns_dir)
+        with self._lock:
+            current = self._current.get(name)
+        if latest != current:
+            self.cache.get(latest)
+            with self._lock:
+                current = self._current.get(name)
+                # Never go back to an older version than a concurrent
+                # refresh already installed
+                if current is None or latest.version > current.version:
+                    self._current[name] = latest
+                    if current is not None:
+                        self.swaps += 1
+                current = self._current[name]
+        self._refresh_stage_pins({name})
+        return current
+
+    def score(self, name, instances, version=None):
+        """
+        Class probabilities for a 2-D batch of feature rows (a single row
+        is accepted too), in one `predict_proba` call. `version` pins a
+        version instead of the current one.
+        """
+        if version is None:
+            model_version = self.current_version(name)
+        else:
+            model_version = self.pinned_version(name, version)
+        model = self.cache.get(model_version)
+        batch = np.asarray(instances, dtype=np.float64)
+        if batch.ndim == 1:
+            batch = batch[np.newaxis, :]
+        expected = getattr(model, "n_features_in_", batch.shape[-1])
+        if batch.ndim != 2 or batch.shape[1] != expected:
+            raise ValueError(
+                f"Expected rows of {expected} features, got an array of "
+                f"shape {batch.shape}"
+            )
+        return Scores(
+            model_version, model.classes_, model.predict_proba(batch)
+        )
+
+    def watch(self, interval=30.0):
+        """Refresh every served model every `interval` seconds."""
+        if self._watcher is not None:
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), daemon=True
+        )
+        self._watcher.start()
+
+    def stop(self):
+        if self._watcher is None:
+            return
+        self._stop_watching.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def _watch(self, interval):
+        while not self._stop_watching.wait(interval):
+            for name in list(self._current):
+                try:
+                    self.refresh(name)
+                except Exception as e:
+                    print(f"Failed to refresh model '{name}': {e}")
+            # Models only ever requested with a pinned stage
+            self._refresh_stage_pins(
+                {name for name, _ in list(self._pinned)} - set(self._current)
+            )
+
+    def _refresh_stage_pins(self, names):
+        for (name, stage), pinned in list(self._pinned.items()):
+            if name not in names or stage.isdigit():
+                continue
+            try:
+                latest = resolve_version(name, stage, self.mlruns_dir)
+                if latest != pinned:
+                    self.cache.get(latest)
+                    self._pinned[(name, stage)] = latest
+            except ModelNotFoundError:
+                # Nothing in the stage now; resolved again on next request
+                self._pinned.pop((name, stage), None)
+            except Exception as e:
+                print(f"Failed to refresh model '{name}' ({stage}): {e}")
+
+    def stats(self):
+        return {
+            "current": {
+                name: model_version.version
+                for name, model_version in self._current.items()
+            },
+            "swaps": self.swaps,
+            "cache": self.cache.stats(),
+        }
@@ -1,23 +1,72 @@
+"""
+Train a LogisticRegression, log it to MLflow and register it; or, with
+`--sweep`, train a grid of hyperparameters, one MLflow run per point,
+across a process pool.
+
+Runs are logged to the local `mlruns` file store unless
+MLFLOW_TRACKING_URI (or `--tracking-uri`) points at a tracking server.
+
+    python run_mlflow_experiment.py
+    python run_mlflow_experiment.py --sweep --workers 4 --compare
+"""
+
+import argparse
+import itertools
+import os
+import pathlib
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
 import mlflow
 import mlflow.sklearn
-from sklearn.model_selection import train_test_split
+import numpy as np
+from mlflow.entities import Metric, Param
+from mlflow.sklearn import SERIALIZATION_FORMAT_CLOUDPICKLE
+from mlflow.tracking import MlflowClient
+from sklearn.datasets import make_classification
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score
-import numpy as np
-import uuid
+from sklearn.model_selection import train_test_split
+
+from linear_scorer import ARTIFACT_PATH, export_linear_model
 
-MLFLOW_TRACKING_URI = "http://127.0.0.1:5001"
-mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+MLRUNS_DIR = pathlib.Path(__file__).resolve().parent / "mlruns"
+# e.g. http://127.0.0.1:5001 to log to a tracking server
+MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", MLRUNS_DIR.as_uri())
+# Newer MLflow releases refuse to use the file store unless opted in
+os.environ.setdefault("MLFLOW_ALLOW_FILE_STORE", "true")
+EXPERIMENT_NAME = "PoC_Sklearn_Experiment"
+SWEEP_C = [float(C) for C in np.logspace(-3, 3, 13)]
+SWEEP_SOLVERS = ["lbfgs", "liblinear"]
 
 # Generate a unique model name for each run to avoid conflicts
 model_name = f"poc-lr-model-{uuid.uuid4().hex[:8]}"
 
 
-def run_experiment():
+def log_run_data(client, run_id, params=None, metrics=None):
+    """Log a run's params and metrics in a single `log_batch` call."""
+    timestamp = int(time.time() * 1000)
+    client.log_batch(
+        run_id,
+        metrics=[
+            Metric(key, float(value), timestamp, 0)
+            for key, value in (metrics or {}).items()
+        ],
+        params=[
+            Param(key, str(value)) for key, value in (params or {}).items()
+        ],
+    )
+
+
+def run_experiment(tracking_uri=MLFLOW_TRACKING_URI):
     """
     Trains a simple model, logs it to MLflow, and registers it.
     """
-    mlflow.set_experiment("PoC_Sklearn_Experiment")
+    mlflow.set_tracking_uri(tracking_uri)
+    mlflow.set_experiment(EXPERIMENT_NAME)
+    client = MlflowClient(tracking_uri)
 
     # 1. Prepare dummy data
     X = np.random.rand(100, 5)
@@ -41,11 +90,13 @@ def run_experiment():
 
         # 4. Log parameters, metrics, and artifacts
         print(f"Logging parameters: C={C}")
-        mlflow.log_param("C", C)
-        mlflow.log_param("model_type", "LogisticRegression")
-
         print(f"Logging metrics: accuracy={accuracy:.4f}")
-        mlflow.log_metric("accuracy", accuracy)
+        log_run_data(
+            client,
+            run_id,
+            params={"C": C, "model_type": "LogisticRegression"},
+            metrics={"accuracy": accuracy},
+        )
 
         # Log an artifact (e.g., a simple text file)
         with open("experiment_notes.txt", "w") as f:
@@ -62,14 +113,153 @@ def run_experiment():
             artifact_path="sklearn-model",
             registered_model_name=model_name,
             input_example=input_example,
+            # What MLflow 2 wrote by default; newer releases default to
+            # skops, which isn't installed alongside the serving code
+            serialization_format=SERIALIZATION_FORMAT_CLOUDPICKLE,
         )
 
+        # 6. Log the coefficients, for scoring without sklearn
+        with tempfile.TemporaryDirectory() as tmp:
+            export_linear_model(model, tmp)
+            mlflow.log_artifacts(tmp, artifact_path=ARTIFACT_PATH)
+
         print(f"Model '{model_name}' logged and registered successfully.")
+        if tracking_uri.startswith("file:"):
+            print(f"Run stored under: {tracking_uri}")
+        else:
+            print(
+                f"View run at: {tracking_uri}/#/experiments/"
+                f"{run.info.experiment_id}/runs/{run_id}"
+            )
+
+
+def sweep_data(rows=20_000, features=20, seed=42):
+    """A fixed train/test split, so every grid point sees the same data."""
+    X, y = make_classification(
+        n_samples=rows,
+        n_features=features,
+        n_informative=features // 2,
+        random_state=seed,
+    )
+    return train_test_split(X, y, test_size=0.3, random_state=seed)
+
+
+def sweep_grid(C_values=SWEEP_C, solvers=SWEEP_SOLVERS):
+    return [
+        {"C": C, "solver": solver}
+        for C, solver in itertools.product(C_values, solvers)
+    ]
+
+
+# Set in each worker by `_init_worker`, so the data is sent once per
+# process rather than with every grid point
+_worker_state = {}
+
+
+def _init_worker(tracking_uri, data):
+    _worker_state["client"] = MlflowClient(tracking_uri)
+    _worker_state["data"] = data
+
+
+def train_grid_point(experiment_id, sweep_id, params):
+    """
+    Train one grid point and log it as its own run, params and metrics
+    in one batch; return `(run_id, params, accuracy)`.
+    """
+    client = _worker_state["client"]
+    X_train, X_test, y_train, y_test = _worker_state["data"]
+    run = client.create_run(
+        experiment_id,
+        tags={"sweep_id": sweep_id},
+        run_name=f"C={params['C']:g}-{params['solver']}",
+    )
+    started = time.perf_counter()
+    model = LogisticRegression(**params, max_iter=1000, random_state=42)
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    accuracy = accuracy_score(y_test, model.predict(X_test))
+    log_run_data(
+        client,
+        run.info.run_id,
+        params={**params, "model_type": "LogisticRegression"},
+        metrics={"accuracy": accuracy, "fit_seconds": fit_seconds},
+    )
+    client.set_terminated(run.info.run_id)
+    return run.info.run_id, params, accuracy
+
+
+def run_sweep(grid, data, workers=1, tracking_uri=MLFLOW_TRACKING_URI):
+    """
+    Train every grid point, each as a run in the experiment, with a loop
+    in this process when `workers` is 1 or across a process pool.
+    Return `(results, seconds)`, results in grid order.
+    """
+    started = time.perf_counter()
+    client = MlflowClient(tracking_uri)
+    experiment = client.get_experiment_by_name(EXPERIMENT_NAME)
+    if experiment is None:
+        experiment_id = client.create_experiment(EXPERIMENT_NAME)
+    else:
+        experiment_id = experiment.experiment_id
+    sweep_id = uuid.uuid4().hex[:8]
+
+    if workers <= 1:
+        _init_worker(tracking_uri, data)
+        results = [
+            train_grid_point(experiment_id, sweep_id, params)
+            for params in grid
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(tracking_uri, data),
+        ) as executor:
+            results = list(
+                executor.map(
+                    train_grid_point,
+                    itertools.repeat(experiment_id),
+                    itertools.repeat(sweep_id),
+                    grid,
+                )
+            )
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tracking-uri", default=MLFLOW_TRACKING_URI)
+    parser.add_argument("--sweep", action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Also run the sweep as a sequential loop and compare",
+    )
+    args = parser.parse_args()
+
+    if not args.sweep:
+        run_experiment(args.tracking_uri)
+        return
+
+    data = sweep_data(args.rows)
+    grid = sweep_grid()
+    results, seconds = run_sweep(grid, data, args.workers, args.tracking_uri)
+    run_id, params, accuracy = max(results, key=lambda result: result[2])
+    print(
+        f"{len(grid)} grid points on {args.rows} rows, {args.workers} "
+        f"workers: {seconds:.2f}s; best C={params['C']:g} "
+        f"solver={params['solver']} accuracy={accuracy:.4f} (run {run_id})"
+    )
+    if args.compare:
+        _, sequential_seconds = run_sweep(grid, data, 1, args.tracking_uri)
         print(
-            f"View run at: {MLFLOW_TRACKING_URI}/#/experiments/"
-            f"{run.info.experiment_id}/runs/{run_id}"
+            f"Sequential loop: {sequential_seconds:.2f}s; "
+            f"{args.workers} workers are "
+            f"{sequential_seconds / seconds:.2f}x as fast"
         )
 
 
 if __name__ == "__main__":
-    run_experiment()
+    main()
@@ -0,0 +1,120 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+from linear_scorer import LinearScorer, export_linear_model
+from model_serving import (
+    ModelCache,
+    ModelNotFoundError,
+    ScoringService,
+    load_linear_model,
+    resolve_version,
+)
+from run_mlflow_experiment import run_experiment
+
+POC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def split(classes=2):
+    X, y = make_classification(
+        n_samples=600,
+        n_features=8,
+        n_informative=5,
+        n_classes=classes,
+        random_state=0,
+    )
+    return train_test_split(X, y, test_size=0.3, random_state=42)
+
+
+@pytest.mark.parametrize("classes", [2, 3])
+def test_matches_sklearn_on_test_split(tmp_path, classes):
+    """Tests that exported scoring equals model.predict/predict_proba."""
+    X_train, X_test, y_train, _ = split(classes)
+    model = LogisticRegression(C=0.5, random_state=42)
+    model.fit(X_train, y_train)
+
+    scorer = LinearScorer.load(export_linear_model(model, str(tmp_path)))
+
+    np.testing.assert_array_equal(
+        scorer.predict(X_test), model.predict(X_test)
+    )
+    np.testing.assert_allclose(
+        scorer.predict_proba(X_test), model.predict_proba(X_test), rtol=1e-9
+    )
+    np.testing.assert_allclose(
+        scorer.predict_proba(X_test[0]), model.predict_proba(X_test[:1])
+    )
+    with pytest.raises(ValueError):
+        scorer.predict(np.ones((1, 3)))
+
+
+def test_loads_without_importing_sklearn(tmp_path):
+    """Tests that a worker scores with the artifact and no sklearn."""
+    X_train, X_test, y_train, _ = split()
+    model = LogisticRegression().fit(X_train, y_train)
+    path = export_linear_model(model, str(tmp_path))
+    np.save(tmp_path / "rows.npy", X_test)
+
+    script = (
+        "import sys, numpy as np\n"
+        "from linear_scorer import LinearScorer\n"
+        f"scorer = LinearScorer.load({path!r})\n"
+        f"rows = np.load({str(tmp_path / 'rows.npy')!r})\n"
+        "print(' '.join(map(str, scorer.predict(rows))))\n"
+        "assert 'sklearn' not in sys.modules\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=POC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert output.split() == [str(label) for label in model.predict(X_test)]
+
+
+def test_experiment_logs_artifact_next_to_sklearn_model(tmp_path, monkeypatch):
+    """Tests that a registered run serves the same with either artifact."""
+    monkeypatch.chdir(tmp_path)
+    mlruns_dir = tmp_path / "mlruns"
+    run_experiment(mlruns_dir.as_uri())
+    name = os.listdir(mlruns_dir / "models")[0]
+    model_version = resolve_version(name, mlruns_dir=str(mlruns_dir))
+    batch = np.random.default_rng(0).random((16, 5))
+
+    sklearn_scores = ScoringService(mlruns_dir=str(mlruns_dir)).score(
+        name, batch
+    )
+    linear = ScoringService(
+        ModelCache(loader=load_linear_model),
+        mlruns_dir=str(mlruns_dir),
+    )
+    linear_scores = linear.score(name, batch)
+
+    assert linear.cache.loader is load_linear_model
+    assert isinstance(
+        linear.cache.get(model_version), LinearScorer
+    ), "scored with the sklearn model"
+    assert linear_scores.model == model_version
+    np.testing.assert_array_equal(
+        linear_scores.classes, sklearn_scores.classes
+    )
+    np.testing.assert_allclose(
+        linear_scores.probabilities, sklearn_scores.probabilities, rtol=1e-9
+    )
+
+
+def test_version_without_artifact_is_not_found(tmp_path):
+    """Tests that a version logged before the export is a lookup error."""
+    model_dir = tmp_path / "artifacts" / "sklearn-model"
+    model_dir.mkdir(parents=True)
+
+    with pytest.raises(ModelNotFoundError):
+        load_linear_model(str(model_dir))
@@ -0,0 +1,237 @@
+import threading
+import time
+import uuid
+
+import mlflow.sklearn
+import numpy as np
+import pytest
+import yaml
+from sklearn.linear_model import LogisticRegression
+
+import model_serving
+from model_serving import (
+    ModelCache,
+    ModelNotFoundError,
+    ModelVersion,
+    ScoringService,
+    resolve_version,
+)
+
+NAME = "poc-lr-model-test"
+
+
+def register(mlruns_dir, version, C=1.0, status="READY", stage="None"):
+    """
+    Register a fitted model as the file store would, with a source path
+    from another machine, and return the model.
+    """
+    rng = np.random.default_rng(version)
+    X = rng.random((50, 5))
+    model = LogisticRegression(C=C).fit(X, X[:, 0] > 0.5)
+    run_id = uuid.uuid4().hex
+    # The format run_mlflow_experiment.py's models are stored in
+    mlflow.sklearn.save_model(
+        model,
+        str(mlruns_dir / "0" / run_id / "artifacts" / "sklearn-model"),
+        serialization_format=mlflow.sklearn.SERIALIZATION_FORMAT_CLOUDPICKLE,
+    )
+    version_dir = mlruns_dir / "models" / NAME / f"version-{version}"
+    version_dir.mkdir(parents=True)
+    source = (
+        f"file:///Users/someone/mlflow_poc/mlruns/0/{run_id}/artifacts/"
+        "sklearn-model"
+    )
+    meta = {
+        "name": NAME,
+        "version": version,
+        "run_id": run_id,
+        "source": source,
+        "storage_location": source,
+        "status": status,
+        "current_stage": stage,
+    }
+    (version_dir / "meta.yaml").write_text(yaml.safe_dump(meta))
+    return model
+
+
+class CountingLoader:
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    def __call__(self, path):
+        self.calls.append(path)
+        time.sleep(self.delay)
+        return f"model at {path}"
+
+
+def model_version(version):
+    return ModelVersion(NAME, version, "run", f"path-{version}")
+
+
+def test_scores_batch_from_relocated_store(tmp_path):
+    """Tests that a version is found locally and scores a whole batch."""
+    model = register(tmp_path, 1)
+    register(tmp_path, 2, status="FAILED_REGISTRATION")
+    service = ScoringService(mlruns_dir=str(tmp_path))
+    batch = np.random.default_rng(0).random((32, 5))
+
+    scores = service.score(NAME, batch)
+    service.score(NAME, batch[0])
+
+    assert scores.model.version == 1
+    assert scores.model.path.startswith(str(tmp_path))
+    np.testing.assert_array_equal(
+        scores.probabilities, model.predict_proba(batch)
+    )
+    assert service.cache.stats()["misses"] == 1
+    with pytest.raises(ValueError):
+        service.score(NAME, np.ones((2, 3)))
+    with pytest.raises(ModelNotFoundError):
+        resolve_version("missing", mlruns_dir=str(tmp_path))
+
+
+def test_new_version_is_loaded_before_it_is_served(tmp_path):
+    """Tests that refresh swaps to a new version only once loaded."""
+    register(tmp_path, 1)
+    service = ScoringService(mlruns_dir=str(tmp_path))
+    batch = np.ones((4, 5))
+    assert service.score(NAME, batch).model.version == 1
+    model = register(tmp_path, 2, C=0.01)
+
+    # Not picked up until refreshed
+    assert service.score(NAME, batch).model.version == 1
+    assert service.refresh(NAME).version == 2
+
+    assert (NAME, 2) in service.cache
+    scores = service.score(NAME, batch)
+    assert scores.model.version == 2
+    np.testing.assert_array_equal(
+        scores.probabilities, model.predict_proba(batch)
+    )
+    assert service.score(NAME, batch, version=1).model.version == 1
+    assert service.stats()["swaps"] == 1
+
+
+def test_cache_evicts_least_recently_used_by_size():
+    """Tests that models are evicted oldest first once over max_bytes."""
+    loader = CountingLoader()
+    cache = ModelCache(max_bytes=250, loader=loader, sizer=lambda _: 100)
+
+    cache.get(model_version(1))
+    cache.get(model_version(2))
+    cache.get(model_version(1))
+    cache.get(model_version(3))
+
+    assert (NAME, 1) in cache and (NAME, 3) in cache
+    assert (NAME, 2) not in cache
+    assert cache.total_bytes == 200
+    assert cache.stats()["evictions"] == 1
+    assert loader.calls == ["path-1", "path-2", "path-3"]
+
+
+def test_concurrent_misses_load_once():
+    """Tests that requests racing on a cold version share one load."""
+    loader = CountingLoader(delay=0.1)
+    cache = ModelCache(loader=loader, sizer=len)
+    results = []
+
+    def get():
+        results.append(cache.get(model_version(1)))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == ["path-1"]
+    assert results == ["model at path-1"] * 8
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_given_cache_is_used_even_when_empty():
+    """Tests that an empty cache passed in isn't replaced by a default."""
+    cache = ModelCache(loader=CountingLoader(), sizer=len)
+    service = ScoringService(cache=cache)
+
+    assert service.cache is cache
+
+
+def test_slow_load_does_not_block_other_models(monkeypatch):
+    """Tests that a model's first load doesn't hold up other models."""
+    release = threading.Event()
+    loading = threading.Event()
+
+    def loader(path):
+        if path == "path-slow":
+            loading.set()
+            release.wait(5)
+        return f"model at {path}"
+
+    monkeypatch.setattr(
+        model_serving,
+        "resolve_version",
+        lambda name, mlruns_dir: ModelVersion(name, 1, "run", f"path-{name}"),
+    )
+    service = ScoringService(cache=ModelCache(loader=loader, sizer=len))
+    slow = threading.Thread(target=service.current_version, args=("slow",))
+    slow.start()
+    loading.wait(5)
+
+    try:
+        assert service.current_version("fast").path == "path-fast"
+        assert slow.is_alive()
+    finally:
+        release.set()
+        slow.join()
+    assert service.current_version("slow").path == "path-slow"
+
+
+def test_pinned_versions_are_resolved_once(tmp_path, monkeypatch):
+    """Tests that pins are cached, and stage pins follow the stage."""
+    resolved = []
+    resolve = model_serving.resolve_version
+
+    def counting_resolve(name, version=None, mlruns_dir=None):
+        resolved.append(version)
+        return resolve(name, version, mlruns_dir)
+
+    monkeypatch.setattr(model_serving, "resolve_version", counting_resolve)
+    register(tmp_path, 1, stage="Production")
+    service = ScoringService(mlruns_dir=str(tmp_path))
+    batch = np.ones((2, 5))
+
+    for version in (1, "1", "Production", "production"):
+        assert service.score(NAME, batch, version=version).model.version == 1
+    assert resolved == [1, "Production"]
+
+    # Version 2 is promoted; the stage pin moves once watch sees it
+    register(tmp_path, 2, stage="Production")
+    assert service.score(NAME, batch, version="Production").model.version == 1
+    service.watch(interval=0.01)
+    try:
+        deadline = time.monotonic() + 5
+        while service.pinned_version(NAME, "Production").version != 2:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        service.stop()
+    assert (NAME, 2) in service.cache
+    assert service.score(NAME, batch, version=1).model.version == 1
+
+
+def test_refresh_moves_stage_pins(tmp_path):
+    """Tests that refresh re-resolves stage pins when nothing polls."""
+    register(tmp_path, 1, stage="Staging")
+    service = ScoringService(mlruns_dir=str(tmp_path))
+    batch = np.ones((2, 5))
+    assert service.score(NAME, batch, version="staging").model.version == 1
+    assert service.score(NAME, batch, version=1).model.version == 1
+
+    register(tmp_path, 2, stage="Staging")
+    assert service.score(NAME, batch, version="staging").model.version == 1
+
+    assert service.refresh(NAME).version == 2
+    assert service.score(NAME, batch, version="staging").model.version == 2
+    assert service.score(NAME, batch, version=1).model.version == 1
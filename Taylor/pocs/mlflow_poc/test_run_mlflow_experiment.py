@@ -0,0 +1,60 @@
+from mlflow.tracking import MlflowClient
+
+from run_mlflow_experiment import (
+    EXPERIMENT_NAME,
+    run_sweep,
+    sweep_data,
+    sweep_grid,
+)
+
+GRID = sweep_grid(C_values=[0.01, 1.0], solvers=["lbfgs", "liblinear"])
+
+
+def logged_runs(tracking_uri):
+    client = MlflowClient(tracking_uri)
+    experiment = client.get_experiment_by_name(EXPERIMENT_NAME)
+    return client.search_runs([experiment.experiment_id])
+
+
+def test_parallel_sweep_logs_every_point_to_file_store(tmp_path):
+    """Tests that a pooled sweep logs the same runs as the loop would."""
+    tracking_uri = (tmp_path / "mlruns").as_uri()
+    data = sweep_data(rows=500)
+
+    results, _ = run_sweep(GRID, data, workers=2, tracking_uri=tracking_uri)
+    sequential, _ = run_sweep(GRID, data, workers=1, tracking_uri=tracking_uri)
+
+    assert [params for _, params, _ in results] == GRID
+    assert [accuracy for _, _, accuracy in results] == [
+        accuracy for _, _, accuracy in sequential
+    ]
+    runs = {run.info.run_id: run for run in logged_runs(tracking_uri)}
+    assert len(runs) == 2 * len(GRID)
+    for run_id, params, accuracy in results:
+        run = runs[run_id]
+        assert run.info.status == "FINISHED"
+        assert run.data.params["C"] == str(params["C"])
+        assert run.data.params["solver"] == params["solver"]
+        assert run.data.metrics["accuracy"] == accuracy
+        assert "fit_seconds" in run.data.metrics
+
+
+def test_each_run_is_logged_in_one_batch(tmp_path, monkeypatch):
+    """Tests that params and metrics go out in one call per run."""
+    calls = []
+    log_batch = MlflowClient.log_batch
+
+    def counting_log_batch(self, run_id, metrics=(), params=(), **kwargs):
+        calls.append((run_id, len(metrics), len(params)))
+        return log_batch(self, run_id, metrics, params, **kwargs)
+
+    monkeypatch.setattr(MlflowClient, "log_batch", counting_log_batch)
+
+    results, _ = run_sweep(
+        GRID,
+        sweep_data(rows=500),
+        workers=1,
+        tracking_uri=(tmp_path / "mlruns").as_uri(),
+    )
+
+    assert calls == [(run_id, 2, 3) for run_id, _, _ in results]
@@ -0,0 +1,128 @@
+"""
+Measure the per-user feature stage in `features.py` on synthetic events:
+in memory, streamed from Parquet, and against a pandas `groupby.apply`
+that builds each user's features in Python, run on a sample since it is
+orders of magnitude slower.
+
+    python benchmark_features.py --rows 10000000
+    python benchmark_features.py --rows 10000000 --apply-rows 50000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmark_pipeline import peak_rss_mb
+from convert_events import convert_events
+from event_pipeline import DEFAULT_CHUNKSIZE
+from features import (
+    DEFAULT_WINDOWS,
+    build_features,
+    feature_names,
+    stream_features,
+)
+from sample_data import generate_events, write_events_csv
+
+
+def apply_features(events, as_of, windows=DEFAULT_WINDOWS):
+    """The same features with a Python function per user."""
+    day = pd.Timedelta(days=1)
+
+    def user_features(user):
+        sales = user[user["category"] == "sales"]
+        tenure = (as_of - user["timestamp"].min()) / day
+        since_sale = tenure
+        if len(sales):
+            since_sale = (as_of - sales["timestamp"].max()) / day
+        row = [
+            (as_of - user["timestamp"].max()) / day,
+            tenure,
+            since_sale,
+            len(user),
+            len(user) / max(tenure, 1.0),
+            len(sales),
+            sales["value"].sum(),
+            sales["value"].mean() if len(sales) else 0.0,
+            sales["value"].max() if len(sales) else 0.0,
+        ]
+        for window in windows:
+            start = as_of - pd.Timedelta(window)
+            recent_sales = sales[sales["timestamp"] > start]
+            row += [
+                (user["timestamp"] > start).sum(),
+                len(recent_sales),
+                recent_sales["value"].sum(),
+            ]
+        return pd.Series(row, index=feature_names(windows))
+
+    events = events[events["timestamp"] <= as_of]
+    return events.groupby("user_id").apply(user_features).astype("float32")
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--apply-rows", type=int, default=20_000)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    print(f"{args.rows} events, {args.users} users")
+    print(
+        f"{'method':<24} {'rows':>10} {'seconds':>8} {'rows/s':>10} "
+        f"{'users':>7} {'peak MiB':>9}"
+    )
+
+    def report(method, rows, seconds, users):
+        print(
+            f"{method:<24} {rows:>10} {seconds:>8.2f} "
+            f"{rows / seconds:>10.0f} {users:>7} {peak_rss_mb():>9.0f}"
+        )
+
+    events = generate_events(args.rows, users=args.users)
+    as_of = events["timestamp"].max()
+    features, seconds = timed(build_features, events, as_of)
+    users = len(features.user_ids)
+    report("vectorized, in memory", args.rows, seconds, users)
+
+    sample = events.iloc[: args.apply_rows]
+    sample_as_of = sample["timestamp"].max()
+    expected, apply_seconds = timed(apply_features, sample, sample_as_of)
+    report("groupby.apply", len(sample), apply_seconds, len(expected))
+    sample_features, seconds = timed(build_features, sample, sample_as_of)
+    report("vectorized, same sample", len(sample), seconds, len(expected))
+    matches = np.allclose(
+        sample_features.matrix, expected.to_numpy(), rtol=1e-6
+    )
+    del events, sample
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, "events.csv")
+        parquet_file = os.path.join(tmp, "events.parquet")
+        write_events_csv(csv_file, args.rows, users=args.users)
+        convert_events(csv_file, parquet_file)
+        os.remove(csv_file)
+        _, stats = stream_features(parquet_file, chunksize=args.chunksize)
+    report(
+        "vectorized, Parquet", stats["rows"], stats["seconds"], stats["users"]
+    )
+
+    print(
+        f"\n{features.matrix.shape[0]} x {features.matrix.shape[1]} float32 "
+        f"matrix, {features.matrix.nbytes / 2**20:.1f} MiB; "
+        f"sample matches groupby.apply: {'yes' if matches else 'NO'}"
+    )
+
+
+if __name__ == "__main__":
+    main()
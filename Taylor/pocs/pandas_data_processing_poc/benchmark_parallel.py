@@ -0,0 +1,75 @@
+"""
+Measure how the per-user sales rollup in `event_pipeline.py` scales with
+the number of worker processes, on synthetic events stored as CSV,
+Parquet and Feather, and check every result against the single-process
+one.
+
+    python benchmark_parallel.py --rows 8000000 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from convert_events import convert_events
+from event_pipeline import DEFAULT_CHUNKSIZE, stream_user_sales
+from sample_data import write_events_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=8_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument(
+        "--unit-mib",
+        type=int,
+        default=16,
+        help="CSV byte range size, and CSV block size when converting "
+        "(which sets the Parquet row group and IPC batch sizes)",
+    )
+    args = parser.parse_args()
+    unit_bytes = args.unit_mib * 2**20
+
+    print(f"{os.cpu_count()} CPUs, {args.rows} events")
+    print(
+        f"{'format':<8} {'units':>5} {'workers':>7} {'seconds':>8} "
+        f"{'rows/s':>10} {'speedup':>7}  identical"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, "events.csv")
+        write_events_csv(csv_file, args.rows, users=args.users)
+        paths = {"csv": csv_file}
+        for file_format in ("parquet", "feather"):
+            paths[file_format] = os.path.join(tmp, f"events.{file_format}")
+            convert_events(csv_file, paths[file_format], unit_bytes)
+
+        for file_format, path in paths.items():
+            baseline = None
+            for workers in args.workers:
+                user_sales, stats = stream_user_sales(
+                    path, args.chunksize, workers, unit_bytes
+                )
+                if baseline is None:
+                    baseline, baseline_seconds = user_sales, stats["seconds"]
+                try:
+                    pd.testing.assert_frame_equal(
+                        user_sales, baseline, check_exact=True
+                    )
+                    identical = "yes"
+                except AssertionError:
+                    identical = "NO"
+                print(
+                    f"{file_format:<8} {stats['units']:>5} {workers:>7} "
+                    f"{stats['seconds']:>8.2f} "
+                    f"{stats['rows_per_second']:>10.0f} "
+                    f"{baseline_seconds / stats['seconds']:>6.2f}x  "
+                    f"{identical}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Compare rows/sec and peak memory of the in-memory `process_data.py`
+rollup against the chunked `event_pipeline.py` one, on synthetic events
+of growing size stored as CSV, Parquet and Feather. Each run gets a fresh
+process, so peak RSS is its own.
+
+    python benchmark_pipeline.py --rows 1000000 4000000
+    python benchmark_pipeline.py --rows 2000000 --chunksize 250000
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from convert_events import convert_events
+from event_pipeline import DEFAULT_CHUNKSIZE, stream_user_sales
+from sample_data import write_events_csv
+
+# (method, file format) pairs to run
+RUNS = [
+    ("in-memory", "csv"),
+    ("chunked", "csv"),
+    ("in-memory", "parquet"),
+    ("chunked", "parquet"),
+    ("chunked", "feather"),
+]
+
+
+def in_memory_user_sales(path):
+    """The original rollup: load every column, then filter and group."""
+    if path.endswith(".csv"):
+        df = pd.read_csv(path, parse_dates=["timestamp"])
+    else:
+        df = pd.read_parquet(path)
+    df_sales = df[df["category"] == "sales"].copy()
+    return (
+        df_sales.groupby("user_id")["value"]
+        .sum()
+        .reset_index()
+        .sort_values(by="value", ascending=False)
+    )
+
+
+def peak_rss_mb():
+    # VmHWM is this process's own peak; ru_maxrss carries the parent's
+    # peak over an exec on Linux. Both are in KiB.
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(method, path, chunksize):
+    """Run one rollup; returns (seconds, baseline MiB, peak MiB)."""
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    if method == "in-memory":
+        in_memory_user_sales(path)
+    else:
+        stream_user_sales(path, chunksize)
+    return time.perf_counter() - started, baseline, peak_rss_mb()
+
+
+def measure_in_fresh_process(method, path, chunksize):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(measure, method, path, chunksize).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[1_000_000, 4_000_000]
+    )
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>10} {'format':<8} {'MiB':>5} {'method':<10} "
+        f"{'rows/s':>10} {'peak MiB':>9} {'over baseline':>14}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            paths = {"csv": os.path.join(tmp, f"events_{rows}.csv")}
+            write_events_csv(paths["csv"], rows, users=args.users)
+            for file_format in ("parquet", "feather"):
+                paths[file_format] = os.path.join(
+                    tmp, f"events_{rows}.{file_format}"
+                )
+                convert_events(paths["csv"], paths[file_format])
+            for method, file_format in RUNS:
+                path = paths[file_format]
+                size = os.path.getsize(path) / 2**20
+                seconds, baseline, peak = measure_in_fresh_process(
+                    method, path, args.chunksize
+                )
+                print(
+                    f"{rows:>10} {file_format:<8} {size:>5.0f} {method:<10} "
+                    f"{rows / seconds:>10.0f} {peak:>9.0f} "
+                    f"{peak - baseline:>14.0f}"
+                )
+            for path in paths.values():
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
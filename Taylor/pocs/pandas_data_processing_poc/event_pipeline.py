@@ -0,0 +1,435 @@
+"""
+Streaming version of the `process_data.py` sales rollup for event exports
+too large to load at once: total "sales" value per user, read in chunks.
+
+Events can be stored as CSV, Parquet, or Arrow IPC / Feather (see
+`convert_events.py`). The columnar formats are read through Arrow, which
+reads only the needed columns and applies the "sales" filter before
+anything is converted to pandas; Feather files are memory-mapped.
+
+With `--workers`, independent parts of the file (CSV byte ranges, Parquet
+row groups or IPC record batches) are aggregated across a process pool.
+
+    python event_pipeline.py events.csv --chunksize 500000
+    python event_pipeline.py events.parquet --workers 4
+"""
+
+import argparse
+import collections
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+# Compact dtypes: the few event categories as a categorical, float32
+# values. user_id has too many distinct values to categorize every chunk
+# cheaply (it roughly doubles parse time), so it stays a string column,
+# which pandas stores as one Arrow buffer rather than Python objects.
+EVENT_DTYPES = {
+    "event_id": "int64",
+    "user_id": "str",
+    "category": "category",
+    "value": "float32",
+}
+# The rollup doesn't need event_id or timestamp, so they're never parsed
+SALES_COLUMNS = ["user_id", "category", "value"]
+DEFAULT_CHUNKSIZE = 1_000_000
+BATCH_READAHEAD = 2
+# Target size of the byte ranges a CSV is split into
+DEFAULT_UNIT_BYTES = 64 * 2**20
+# Per-user partial sums are combined this many at a time
+COMBINE_BATCH = 16
+
+EVENT_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "ipc",
+    ".feather": "ipc",
+    ".ipc": "ipc",
+}
+
+
+def event_format(path):
+    extension = os.path.splitext(str(path))[1].lower()
+    try:
+        return EVENT_FORMATS[extension]
+    except KeyError:
+        raise ValueError(f"Unsupported event file: {path}") from None
+
+
+def split_events(path, unit_bytes=DEFAULT_UNIT_BYTES):
+    """
+    Split the events in `path` into units that can be read independently,
+    in file order: Parquet row group and IPC record batch indices, or
+    `(start, end)` byte ranges of about `unit_bytes` that begin and end on
+    line boundaries of a CSV (fields must not contain newlines).
+    """
+    file_format = event_format(path)
+    if file_format == "parquet":
+        return list(range(pq.ParquetFile(path).num_row_groups))
+    if file_format == "ipc":
+        reader = pyarrow.ipc.open_file(pa.memory_map(str(path)))
+        return list(range(reader.num_record_batches))
+    units = []
+    with open(path, "rb") as csv_file:
+        csv_file.readline()
+        start = csv_file.tell()
+        size = os.fstat(csv_file.fileno()).st_size
+        while start < size:
+            # Finish the line the target offset falls in
+            csv_file.seek(min(start + unit_bytes, size))
+            csv_file.readline()
+            end = csv_file.tell()
+            units.append((start, end))
+            start = end
+    return units
+
+
+class EventReader:
+    """
+    Iterate over `columns` of the events in `path` as DataFrames of up to
+    `chunksize` rows, keeping only events of `category` and events after
+    the `since` timestamp if given. For Parquet, `since` also skips row
+    groups whose timestamps all precede it.
+
+    With `unit` (see `split_events`), only that part of the file is read.
+
+    `rows_scanned` counts the events read, including those the filter
+    dropped, once iteration is done.
+    """
+
+    def __init__(
+        self,
+        path,
+        columns=SALES_COLUMNS,
+        chunksize=DEFAULT_CHUNKSIZE,
+        category=None,
+        since=None,
+        unit=None,
+    ):
+        self.path = path
+        self.format = event_format(path)
+        self.columns = list(columns)
+        self.chunksize = chunksize
+        self.category = category
+        self.since = pd.Timestamp(since) if since is not None else None
+        self.unit = unit
+        self.rows_scanned = 0
+
+    def __iter__(self):
+        if self.format == "csv":
+            return self._read_csv()
+        if self.unit is not None:
+            return self._read_columnar_unit()
+        return self._read_columnar()
+
+    def _read_columns(self):
+        """`columns` plus the columns the filters need."""
+        columns = list(self.columns)
+        if self.category is not None and "category" not in columns:
+            columns.append("category")
+        if self.since is not None and "timestamp" not in columns:
+            columns.append("timestamp")
+        return columns
+
+    def _read_csv(self):
+        columns = self._read_columns()
+        source = self.path
+        if self.unit is not None:
+            start, end = self.unit
+            with open(self.path, "rb") as csv_file:
+                header = csv_file.readline()
+                csv_file.seek(start)
+                source = io.BytesIO(header + csv_file.read(end - start))
+        with pd.read_csv(
+            source,
+            usecols=columns,
+            dtype={c: EVENT_DTYPES[c] for c in columns if c in EVENT_DTYPES},
+            parse_dates=["timestamp"] if "timestamp" in columns else False,
+            chunksize=self.chunksize,
+        ) as reader:
+            for chunk in reader:
+                self.rows_scanned += len(chunk)
+                if self.category is not None:
+                    chunk = chunk[chunk["category"] == self.category]
+                if self.since is not None:
+                    chunk = chunk[chunk["timestamp"] > self.since]
+                yield chunk[self.columns]
+
+    def _read_columnar(self):
+        if self.format == "parquet":
+            # Parquet stores categories dictionary-encoded already; read
+            # them as a dictionary instead of decoding to strings
+            file_format = ds.ParquetFileFormat(
+                read_options=ds.ParquetReadOptions(
+                    dictionary_columns=["category"]
+                )
+            )
+        else:
+            file_format = ds.IpcFileFormat()
+        dataset = ds.dataset(
+            self.path,
+            format=file_format,
+            # Uncompressed IPC columns are used in place from the mapping.
+            # Parquet is decoded anyway, so mapping it would only add the
+            # file's pages to RSS.
+            filesystem=pyarrow.fs.LocalFileSystem(
+                use_mmap=self.format == "ipc"
+            ),
+        )
+        # From the file footer, without reading any data
+        self.rows_scanned = dataset.count_rows()
+        batches = dataset.to_batches(
+            columns=self.columns,
+            filter=self._filter_expression(dataset.schema),
+            batch_size=self.chunksize,
+            # Bound how many decoded batches wait ahead of the consumer
+            batch_readahead=BATCH_READAHEAD,
+            fragment_readahead=1,
+        )
+        return self._frames(batches)
+
+    def _filter_expression(self, schema):
+        expression = None
+        if self.category is not None:
+            expression = ds.field("category") == self.category
+        if self.since is not None:
+            # Truncating to the column's unit keeps `>` exact: stored
+            # timestamps are whole units, so ts > since iff ts > floor(since)
+            since = pa.scalar(self.since).cast(
+                schema.field("timestamp").type, safe=False
+            )
+            after = ds.field("timestamp") > since
+            expression = after if expression is None else expression & after
+        return expression
+
+    def _read_columnar_unit(self):
+        columns = self._read_columns()
+        if self.format == "parquet":
+            parquet_file = pq.ParquetFile(
+                self.path, read_dictionary=["category"]
+            )
+            schema = parquet_file.schema_arrow
+            # Decoded chunksize rows at a time, not the whole row group
+            batches = parquet_file.iter_batches(
+                batch_size=self.chunksize,
+                row_groups=[self.unit],
+                columns=columns,
+            )
+        else:
+            reader = pyarrow.ipc.open_file(pa.memory_map(str(self.path)))
+            schema = reader.schema
+            # Uncompressed batches are used in place from the mapping, so
+            # slices of one are views rather than copies
+            batch = reader.get_batch(self.unit).select(columns)
+            batches = (
+                batch.slice(offset, self.chunksize)
+                for offset in range(0, batch.num_rows, self.chunksize)
+            )
+        return self._frames(self._filter_batches(batches, schema))
+
+    def _filter_batches(self, batches, schema):
+        expression = self._filter_expression(schema)
+        for batch in batches:
+            self.rows_scanned += batch.num_rows
+            if expression is not None:
+                batch = batch.filter(expression)
+            yield batch.select(self.columns)
+
+    def _frames(self, batches):
+        # Filtered batches can be small; convert them in chunksize groups,
+        # carrying what doesn't fit over to the next one
+        pending, pending_rows = [], 0
+        for batch in batches:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= self.chunksize:
+                table = pa.Table.from_batches(pending)
+                yield self._to_frame(table.slice(0, self.chunksize))
+                rest = table.slice(self.chunksize)
+                pending, pending_rows = rest.to_batches(), rest.num_rows
+        if pending_rows:
+            yield self._to_frame(pa.Table.from_batches(pending))
+
+    def _to_frame(self, table):
+        for name, dtype in EVENT_DTYPES.items():
+            if name not in table.column_names:
+                continue
+            index = table.schema.get_field_index(name)
+            column = table.column(index)
+            if dtype == "category" and not pa.types.is_dictionary(column.type):
+                column = pc.dictionary_encode(column)
+            elif dtype == "float32" and column.type != pa.float32():
+                column = column.cast(pa.float32())
+            table = table.set_column(index, name, column)
+        return table.to_pandas()
+
+
+def partial_user_sales(chunk):
+    """Sum of "sales" values per user in one chunk, as a float64 Series."""
+    # A no-op when the reader already filtered to sales
+    sales = chunk[chunk["category"] == "sales"]
+    # Accumulate in float64 so totals over many chunks don't lose precision.
+    # Grouping by the bare array skips pandas checking whether a named
+    # Series is a label of `values`, which hashes the whole row index.
+    values = sales["value"].astype("float64")
+    return values.groupby(sales["user_id"].array, sort=False).sum()
+
+
+def combine_user_sales(partials):
+    """
+    Sum per-user partial sums into one Series, or None if there are none.
+    One concat and groupby factorizes every user once, where adding the
+    Series pairwise would align their indexes once per pair. (Grouping
+    by `level=0` instead is several times slower on string indexes.)
+    """
+    partials = [partial for partial in partials if partial is not None]
+    if len(partials) <= 1:
+        return partials[0] if partials else None
+    combined = pd.concat(partials)
+    return combined.groupby(combined.index.array, sort=False).sum()
+
+
+def finish_user_sales(total):
+    """Shape merged sums like `process_data.py`'s `user_sales` frame."""
+    if total is None:
+        total = pd.Series(dtype="float64")
+    # Ties in user_id order, so the result doesn't depend on merge order
+    return (
+        total.rename_axis("user_id")
+        .rename("value")
+        .reset_index()
+        .sort_values(
+            by=["value", "user_id"],
+            ascending=[False, True],
+            ignore_index=True,
+        )
+    )
+
+
+def unit_user_sales(path, unit, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Per-user sales sums for one unit of `path`; returns
+    `(partial, rows_scanned, sales_rows, chunks)`.
+    """
+    reader = EventReader(
+        path, chunksize=chunksize, category="sales", unit=unit
+    )
+    partials = []
+    sales_rows = 0
+    for chunk in reader:
+        partials.append(partial_user_sales(chunk))
+        sales_rows += len(chunk)
+    return (
+        combine_user_sales(partials),
+        reader.rows_scanned,
+        sales_rows,
+        len(partials),
+    )
+
+
+def map_in_order(pool, fn, args_list, prefetch):
+    """
+    Like `pool.map`, but with at most `prefetch` tasks submitted ahead of
+    the result being consumed, so finished results can't pile up.
+    """
+    pending = collections.deque()
+    for args in args_list:
+        pending.append(pool.submit(fn, *args))
+        if len(pending) >= prefetch:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def stream_user_sales(
+    path, chunksize=DEFAULT_CHUNKSIZE, workers=1, unit_bytes=DEFAULT_UNIT_BYTES
+):
+    """
+    Return `(user_sales, stats)` for the events in `path`, holding at most
+    one chunk per worker plus the per-user totals in memory.
+
+    The file is aggregated unit by unit (see `split_events`), with
+    `workers` processes if more than one. Unit results are merged in file
+    order either way, so the float sums, and the result, are identical
+    for any number of workers. Unit results are combined `COMBINE_BATCH`
+    at a time.
+    """
+    started = time.perf_counter()
+    units = split_events(path, unit_bytes)
+    args_list = [(path, unit, chunksize) for unit in units]
+    pool = None
+    if workers > 1:
+        # Arrow's thread pools don't survive fork(); start clean processes
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        results = map_in_order(
+            pool, unit_user_sales, args_list, prefetch=2 * workers
+        )
+    else:
+        results = (unit_user_sales(*args) for args in args_list)
+
+    partials = []
+    rows = sales_rows = chunks = 0
+    try:
+        for partial, unit_rows, unit_sales_rows, unit_chunks in results:
+            partials.append(partial)
+            if len(partials) >= COMBINE_BATCH:
+                partials = [combine_user_sales(partials)]
+            rows += unit_rows
+            sales_rows += unit_sales_rows
+            chunks += unit_chunks
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    user_sales = finish_user_sales(combine_user_sales(partials))
+    seconds = time.perf_counter() - started
+    stats = {
+        "format": event_format(path),
+        "workers": workers,
+        "units": len(units),
+        "rows": rows,
+        "sales_rows": sales_rows,
+        "chunks": chunks,
+        "users": len(user_sales),
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+    }
+    return user_sales, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="CSV, Parquet or Arrow/Feather file")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    user_sales, stats = stream_user_sales(
+        args.path, args.chunksize, args.workers
+    )
+    print(user_sales.head(args.top).to_string(index=False))
+    print(
+        f"\n{stats['rows']} {stats['format']} rows "
+        f"({stats['sales_rows']} sales) in {stats['units']} units, "
+        f"{stats['chunks']} chunks, {stats['workers']} workers, "
+        f"{stats['users']} users, {stats['seconds']:.2f}s "
+        f"({stats['rows_per_second']:.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Per-user features for the churn and lead-scoring models, computed from
+events in the `process_data.py` schema: recency, frequency and monetary
+(RFM) aggregates plus event and sales counts over trailing windows, as a
+float32 matrix with one row per user, ready to score in one batch.
+
+Everything is computed with array operations over chunks of events
+(`np.bincount` and `ufunc.at` on per-chunk user codes), never with a
+Python loop over rows or users, and chunk results merge exactly, so a
+file of any size can be streamed through `EventReader`.
+
+    python features.py events.parquet --as-of 2023-09-01 --windows 7D 30D
+"""
+
+import argparse
+import time
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from event_pipeline import (
+    COMBINE_BATCH,
+    DEFAULT_CHUNKSIZE,
+    EventReader,
+    event_format,
+)
+
+FEATURE_COLUMNS = ["timestamp", "user_id", "category", "value"]
+DEFAULT_WINDOWS = ("7D", "30D", "90D")
+NANOSECONDS_PER_DAY = 86_400 * 10**9
+# "No sale yet" in the last sale timestamp, so a max over chunks keeps it
+# only if the user has no sale anywhere
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+
+class UserFeatures(NamedTuple):
+    """`matrix[i]` holds the features `names` of user `user_ids[i]`."""
+
+    user_ids: pd.Index
+    matrix: np.ndarray
+    names: list
+
+    def to_frame(self):
+        return pd.DataFrame(
+            self.matrix, index=self.user_ids, columns=self.names
+        )
+
+
+def feature_names(windows=DEFAULT_WINDOWS):
+    names = [
+        "recency_days",
+        "tenure_days",
+        "days_since_sale",
+        "events",
+        "events_per_day",
+        "sales",
+        "sales_value",
+        "mean_sale",
+        "max_sale",
+    ]
+    for window in windows:
+        label = window.lower()
+        names += [f"events_{label}", f"sales_{label}", f"sales_value_{label}"]
+    return names
+
+
+def _aggregations(windows):
+    """How each partial aggregate column merges across chunks."""
+    aggregations = {
+        "first_ns": "min",
+        "last_ns": "max",
+        "last_sale_ns": "max",
+        "events": "sum",
+        "sales": "sum",
+        "sales_value": "sum",
+        "max_sale": "max",
+    }
+    for window in windows:
+        label = window.lower()
+        for name in ("events", "sales", "sales_value"):
+            aggregations[f"{name}_{label}"] = "sum"
+    return aggregations
+
+
+def partial_features(chunk, as_of, windows=DEFAULT_WINDOWS):
+    """
+    Per-user aggregates of one chunk's events up to `as_of`, indexed by
+    user_id; merge them with `combine_features`. Timestamps are int64
+    nanoseconds, counts and sums float64.
+    """
+    # Compares as pandas does, so naive and tz-aware can't be mixed
+    chunk = chunk[(chunk["timestamp"] <= as_of).to_numpy()]
+    codes, users = pd.factorize(chunk["user_id"].array)
+    size = len(users)
+    timestamps = pd.DatetimeIndex(chunk["timestamp"]).as_unit("ns").asi8
+    is_sale = (chunk["category"] == "sales").to_numpy()
+    values = np.where(is_sale, chunk["value"].to_numpy("float64"), 0.0)
+    values = np.nan_to_num(values, copy=False)
+
+    first_ns = np.full(size, np.iinfo(np.int64).max)
+    np.minimum.at(first_ns, codes, timestamps)
+    last_ns = np.full(size, NO_TIMESTAMP)
+    np.maximum.at(last_ns, codes, timestamps)
+    last_sale_ns = np.full(size, NO_TIMESTAMP)
+    np.maximum.at(last_sale_ns, codes[is_sale], timestamps[is_sale])
+    max_sale = np.full(size, -np.inf)
+    np.maximum.at(max_sale, codes[is_sale], values[is_sale])
+
+    columns = {
+        "first_ns": first_ns,
+        "last_ns": last_ns,
+        "last_sale_ns": last_sale_ns,
+        "events": np.bincount(codes, minlength=size).astype("float64"),
+        "sales": np.bincount(codes, weights=is_sale, minlength=size),
+        "sales_value": np.bincount(codes, weights=values, minlength=size),
+        "max_sale": max_sale,
+    }
+    as_of_ns = pd.Timestamp(as_of).as_unit("ns").value
+    for window in windows:
+        label = window.lower()
+        in_window = timestamps > as_of_ns - pd.Timedelta(window).value
+        columns[f"events_{label}"] = np.bincount(
+            codes, weights=in_window, minlength=size
+        )
+        columns[f"sales_{label}"] = np.bincount(
+            codes, weights=in_window & is_sale, minlength=size
+        )
+        columns[f"sales_value_{label}"] = np.bincount(
+            codes, weights=np.where(in_window, values, 0.0), minlength=size
+        )
+    return pd.DataFrame(columns, index=pd.Index(users, name="user_id"))
+
+
+def combine_features(partials, windows=DEFAULT_WINDOWS):
+    """Merge per-user partial aggregates, like `combine_user_sales`."""
+    partials = [partial for partial in partials if len(partial)]
+    if len(partials) <= 1:
+        return partials[0] if partials else None
+    combined = pd.concat(partials)
+    grouped = combined.groupby(combined.index.array, sort=False)
+    return grouped.agg(_aggregations(windows)).rename_axis("user_id")
+
+
+def finish_features(aggregates, as_of, windows=DEFAULT_WINDOWS):
+    """
+    Turn merged aggregates into a `UserFeatures` matrix, rows in user_id
+    order. Users without a sale get 0 sales values and their tenure as
+    days since a sale, so the matrix has no NaNs.
+    """
+    names = feature_names(windows)
+    if aggregates is None:
+        return UserFeatures(
+            pd.Index([], dtype="str", name="user_id"),
+            np.empty((0, len(names)), dtype=np.float32),
+            names,
+        )
+    aggregates = aggregates.sort_index()
+    as_of_ns = pd.Timestamp(as_of).as_unit("ns").value
+
+    def days_before_as_of(ns):
+        return (as_of_ns - ns) / NANOSECONDS_PER_DAY
+
+    tenure_days = days_before_as_of(aggregates["first_ns"].to_numpy())
+    last_sale_ns = aggregates["last_sale_ns"].to_numpy()
+    events = aggregates["events"].to_numpy()
+    sales = aggregates["sales"].to_numpy()
+    sales_value = aggregates["sales_value"].to_numpy()
+    columns = {
+        "recency_days": days_before_as_of(aggregates["last_ns"].to_numpy()),
+        "tenure_days": tenure_days,
+        "days_since_sale": np.where(
+            last_sale_ns == NO_TIMESTAMP,
+            tenure_days,
+            days_before_as_of(last_sale_ns),
+        ),
+        "events": events,
+        # At least a day, so one-off users don't get huge rates
+        "events_per_day": events / np.maximum(tenure_days, 1.0),
+        "sales": sales,
+        "sales_value": sales_value,
+        "mean_sale": sales_value / np.maximum(sales, 1.0),
+        "max_sale": np.maximum(aggregates["max_sale"].to_numpy(), 0.0),
+    }
+    matrix = np.empty((len(aggregates), len(names)), dtype=np.float32)
+    for index, name in enumerate(names):
+        column = columns.get(name)
+        if column is None:
+            column = aggregates[name].to_numpy()
+        matrix[:, index] = column
+    return UserFeatures(aggregates.index, matrix, names)
+
+
+def build_features(events, as_of=None, windows=DEFAULT_WINDOWS):
+    """
+    `UserFeatures` for an in-memory events frame, as of `as_of` (the
+    latest event by default). Later events are ignored.
+    """
+    if as_of is None:
+        as_of = events["timestamp"].max()
+    as_of = pd.Timestamp(as_of)
+    aggregates = partial_features(events, as_of, windows)
+    return finish_features(
+        aggregates if len(aggregates) else None, as_of, windows
+    )
+
+
+def latest_timestamp(path, chunksize=DEFAULT_CHUNKSIZE):
+    """The latest event timestamp in `path`, reading only that column."""
+    latest = None
+    for chunk in EventReader(path, columns=["timestamp"], chunksize=chunksize):
+        if len(chunk):
+            chunk_latest = chunk["timestamp"].max()
+            if latest is None or chunk_latest > latest:
+                latest = chunk_latest
+    return latest
+
+
+def stream_features(
+    path, as_of=None, windows=DEFAULT_WINDOWS, chunksize=DEFAULT_CHUNKSIZE
+):
+    """
+    Return `(features, stats)` for the events in `path`, holding one chunk
+    plus the per-user aggregates in memory. Without `as_of`, the file's
+    latest timestamp is found first, which costs a read of that column.
+    """
+    started = time.perf_counter()
+    if as_of is None:
+        as_of = latest_timestamp(path, chunksize)
+    as_of = pd.Timestamp(as_of)
+    reader = EventReader(path, columns=FEATURE_COLUMNS, chunksize=chunksize)
+    partials = []
+    chunks = 0
+    for chunk in reader:
+        partials.append(partial_features(chunk, as_of, windows))
+        if len(partials) >= COMBINE_BATCH:
+            partials = [combine_features(partials, windows)]
+        chunks += 1
+    features = finish_features(
+        combine_features(partials, windows), as_of, windows
+    )
+    seconds = time.perf_counter() - started
+    stats = {
+        "format": event_format(path),
+        "as_of": as_of.isoformat(),
+        "rows": reader.rows_scanned,
+        "chunks": chunks,
+        "users": len(features.user_ids),
+        "features": len(features.names),
+        "matrix_bytes": features.matrix.nbytes,
+        "seconds": seconds,
+        "rows_per_second": reader.rows_scanned / seconds if seconds else 0.0,
+    }
+    return features, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="CSV, Parquet or Arrow/Feather file")
+    parser.add_argument(
+        "--as-of", help="Compute features as of this time (default: latest)"
+    )
+    parser.add_argument(
+        "--windows",
+        nargs="+",
+        default=list(DEFAULT_WINDOWS),
+        help="Trailing windows, e.g. 7D 30D",
+    )
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    features, stats = stream_features(
+        args.path, args.as_of, args.windows, args.chunksize
+    )
+    print(features.to_frame().head(args.top).to_string())
+    print(
+        f"\n{stats['rows']} {stats['format']} rows in {stats['chunks']} "
+        f"chunks -> {stats['users']} x {stats['features']} float32 matrix "
+        f"({stats['matrix_bytes'] / 2**20:.1f} MiB) as of {stats['as_of']}, "
+        f"{stats['seconds']:.2f}s ({stats['rows_per_second']:.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import pandas as pd
 import os
 
+from event_pipeline import stream_user_sales
+
 
 def create_and_process_data():
     """
@@ -83,6 +85,11 @@ def create_and_process_data():
     print("\nTotal sales value per user:")
     print(user_sales)
 
+    # 5. Same totals, streamed in chunks with compact dtypes
+    streamed_sales, stats = stream_user_sales(csv_file, chunksize=4)
+    print(f"\nTotal sales value per user, read in {stats['chunks']} chunks:")
+    print(streamed_sales)
+
     # Clean up the created file
     os.remove(csv_file)
     print(f"\n'{csv_file}' removed.")
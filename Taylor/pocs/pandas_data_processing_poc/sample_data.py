@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ["login", "sales", "logout", "view"]
+CATEGORY_WEIGHTS = [0.3, 0.25, 0.15, 0.3]
+
+
+def generate_events(
+    rows, users=10_000, start="2023-01-01", first_event_id=0, seed=42
+):
+    """
+    Synthetic events in the `process_data.py` schema, one every few
+    seconds from `start`. Only "sales" events have a value.
+    """
+    rng = np.random.default_rng(seed)
+    seconds = np.cumsum(rng.integers(0, 6, rows))
+    category = rng.choice(CATEGORIES, size=rows, p=CATEGORY_WEIGHTS)
+    value = np.where(
+        category == "sales",
+        np.round(rng.uniform(1, 500, rows), 2),
+        np.nan,
+    )
+    return pd.DataFrame(
+        {
+            "event_id": np.arange(first_event_id, first_event_id + rows),
+            "timestamp": pd.Timestamp(start)
+            + pd.to_timedelta(seconds, unit="s"),
+            "user_id": np.char.add(
+                "u", rng.integers(0, users, rows).astype(str)
+            ),
+            "category": category,
+            "value": value,
+        }
+    )
+
+
+def write_events_csv(csv_file, rows, users=10_000, chunk_rows=1_000_000):
+    """Write `rows` synthetic events to `csv_file` a chunk at a time."""
+    start = pd.Timestamp("2023-01-01")
+    for index, offset in enumerate(range(0, rows, chunk_rows)):
+        events = generate_events(
+            min(chunk_rows, rows - offset),
+            users=users,
+            start=start,
+            first_event_id=offset,
+            seed=index,
+        )
+        start = events["timestamp"].iloc[-1]
+        events.to_csv(
+            csv_file,
+            mode="w" if index == 0 else "a",
+            header=index == 0,
+            index=False,
+        )
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from convert_events import convert_events
+from event_pipeline import EventReader, split_events, stream_user_sales
+from sample_data import generate_events, write_events_csv
+
+
+def in_memory_user_sales(csv_file):
+    df = pd.read_csv(csv_file)
+    return df[df["category"] == "sales"].groupby("user_id")["value"].sum()
+
+
+def test_streamed_totals_match_in_memory(tmp_path):
+    """Tests that chunked totals equal the whole-file groupby."""
+    csv_file = tmp_path / "events.csv"
+    write_events_csv(csv_file, rows=20_000, users=500, chunk_rows=7_000)
+
+    # A chunk size that doesn't divide the row count
+    user_sales, stats = stream_user_sales(csv_file, chunksize=3_001)
+
+    expected = in_memory_user_sales(csv_file)
+    actual = user_sales.set_index("user_id")["value"]
+    pd.testing.assert_series_equal(
+        actual.sort_index(), expected.sort_index(), check_names=False
+    )
+    assert stats["rows"] == 20_000
+    assert stats["chunks"] == 7
+    assert user_sales["value"].is_monotonic_decreasing
+
+
+def test_chunks_use_compact_dtypes(tmp_path):
+    """Tests that chunks hold only the needed columns, compactly typed."""
+    csv_file = tmp_path / "events.csv"
+    generate_events(100).to_csv(csv_file, index=False)
+
+    chunk = next(iter(EventReader(csv_file, chunksize=50)))
+
+    assert list(chunk.columns) == ["user_id", "category", "value"]
+    assert chunk["user_id"].dtype == "str"
+    assert isinstance(chunk["category"].dtype, pd.CategoricalDtype)
+    assert chunk["value"].dtype == np.float32
+
+
+def test_no_sales(tmp_path):
+    """Tests that files without sales events give an empty result."""
+    csv_file = tmp_path / "events.csv"
+    events = generate_events(100)
+    events[events["category"] != "sales"].to_csv(csv_file, index=False)
+
+    user_sales, stats = stream_user_sales(csv_file, chunksize=10)
+
+    assert user_sales.empty
+    assert list(user_sales.columns) == ["user_id", "value"]
+    assert stats["users"] == 0
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".feather"])
+def test_columnar_formats_match_csv(tmp_path, extension):
+    """Tests that converted files give the same totals as the CSV."""
+    csv_file = tmp_path / "events.csv"
+    write_events_csv(csv_file, rows=20_000, users=500, chunk_rows=7_000)
+    converted = tmp_path / f"events{extension}"
+    assert convert_events(csv_file, converted, block_size=64 * 1024) == 20_000
+
+    expected, _ = stream_user_sales(csv_file)
+    actual, stats = stream_user_sales(converted, chunksize=3_001)
+
+    pd.testing.assert_frame_equal(
+        actual.sort_values("user_id", ignore_index=True),
+        expected.sort_values("user_id", ignore_index=True),
+    )
+    assert stats["rows"] == 20_000
+    assert stats["sales_rows"] < stats["rows"]
+
+
+def test_columnar_reader_pushes_down_columns_and_filter(tmp_path):
+    """Tests that only the requested columns and category are returned."""
+    csv_file = tmp_path / "events.csv"
+    generate_events(1_000).to_csv(csv_file, index=False)
+    parquet_file = tmp_path / "events.parquet"
+    convert_events(csv_file, parquet_file)
+
+    reader = EventReader(parquet_file, chunksize=100, category="sales")
+    chunks = list(reader)
+
+    assert reader.rows_scanned == 1_000
+    for chunk in chunks:
+        assert list(chunk.columns) == ["user_id", "category", "value"]
+        assert (chunk["category"] == "sales").all()
+        assert isinstance(chunk["category"].dtype, pd.CategoricalDtype)
+        assert chunk["value"].dtype == np.float32
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet", ".feather"])
+def test_parallel_matches_single_process(tmp_path, extension):
+    """Tests that worker count doesn't change the result, to the bit."""
+    path = tmp_path / "events.csv"
+    write_events_csv(path, rows=20_000, users=500, chunk_rows=7_000)
+    if extension != ".csv":
+        csv_file, path = path, tmp_path / f"events{extension}"
+        convert_events(csv_file, path, block_size=100_000)
+
+    single, single_stats = stream_user_sales(
+        path, chunksize=3_001, unit_bytes=100_000
+    )
+    parallel, stats = stream_user_sales(
+        path, chunksize=3_001, workers=3, unit_bytes=100_000
+    )
+
+    pd.testing.assert_frame_equal(parallel, single, check_exact=True)
+    assert stats["units"] == single_stats["units"] > 3
+    assert stats["rows"] == single_stats["rows"] == 20_000
+    assert stats["sales_rows"] == single_stats["sales_rows"]
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".feather"])
+def test_unit_reader_yields_bounded_chunks(tmp_path, extension):
+    """Tests that one unit is read in chunks of at most chunksize rows."""
+    csv_file = tmp_path / "events.csv"
+    write_events_csv(csv_file, rows=20_000, users=500, chunk_rows=7_000)
+    path = tmp_path / f"events{extension}"
+    # One unit holding every row
+    convert_events(csv_file, path, block_size=64 * 2**20)
+    assert split_events(path) == [0]
+
+    reader = EventReader(path, chunksize=1_000, category="sales", unit=0)
+    chunks = list(reader)
+
+    assert reader.rows_scanned == 20_000
+    assert all(len(chunk) == 1_000 for chunk in chunks[:-1])
+    assert 0 < len(chunks[-1]) <= 1_000
+    expected = pd.concat(EventReader(path, category="sales"))
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True),
+        expected.reset_index(drop=True),
+    )
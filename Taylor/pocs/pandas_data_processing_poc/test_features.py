@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from convert_events import convert_events
+from features import build_features, feature_names, stream_features
+from sample_data import generate_events
+
+WINDOWS = ("1D", "7D")
+
+
+def naive_features(events, as_of):
+    """The same features, one user at a time."""
+    day = pd.Timedelta(days=1)
+    rows = {}
+    for user_id, user in events[events["timestamp"] <= as_of].groupby(
+        "user_id"
+    ):
+        sales = user[user["category"] == "sales"]
+        tenure = (as_of - user["timestamp"].min()) / day
+        row = [
+            (as_of - user["timestamp"].max()) / day,
+            tenure,
+            (as_of - sales["timestamp"].max()) / day if len(sales) else tenure,
+            len(user),
+            len(user) / max(tenure, 1.0),
+            len(sales),
+            sales["value"].sum(),
+            sales["value"].mean() if len(sales) else 0.0,
+            sales["value"].max() if len(sales) else 0.0,
+        ]
+        for window in WINDOWS:
+            recent = user["timestamp"] > as_of - pd.Timedelta(window)
+            recent_sales = sales[
+                sales["timestamp"] > as_of - pd.Timedelta(window)
+            ]
+            row += [
+                recent.sum(),
+                len(recent_sales),
+                recent_sales["value"].sum(),
+            ]
+        rows[user_id] = row
+    return pd.DataFrame.from_dict(
+        rows, orient="index", columns=feature_names(WINDOWS)
+    ).sort_index()
+
+
+@pytest.fixture
+def events():
+    # About two weeks of events, so the windows cut through them
+    events = generate_events(20_000, users=200)
+    events["timestamp"] = events["timestamp"].dt.floor("s")
+    events["timestamp"] += pd.to_timedelta(events.index * 60, unit="s")
+    return events
+
+
+def test_features_match_per_user_computation(events):
+    """Tests that vectorized features equal a per-user computation."""
+    as_of = events["timestamp"].quantile(0.9).floor("s")
+
+    features = build_features(events, as_of, WINDOWS)
+
+    expected = naive_features(events, as_of)
+    assert list(features.user_ids) == list(expected.index)
+    np.testing.assert_allclose(
+        features.matrix, expected.to_numpy("float32"), rtol=1e-6
+    )
+
+
+def test_matrix_is_compact_and_complete(events):
+    """Tests that the matrix is contiguous float32 with no NaNs."""
+    # A user whose only event isn't a sale
+    events.loc[len(events)] = [
+        -1,
+        events["timestamp"].iloc[0],
+        "u-no-sales",
+        "login",
+        np.nan,
+    ]
+
+    features = build_features(events, windows=WINDOWS)
+
+    assert features.matrix.dtype == np.float32
+    assert features.matrix.flags["C_CONTIGUOUS"]
+    assert not np.isnan(features.matrix).any()
+    assert features.matrix.shape == (201, len(feature_names(WINDOWS)))
+    no_sales = features.to_frame().loc["u-no-sales"]
+    assert no_sales["sales_value"] == no_sales["max_sale"] == 0
+    assert no_sales["days_since_sale"] == no_sales["tenure_days"]
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet"])
+def test_streamed_features_match_in_memory(tmp_path, events, extension):
+    """Tests that features merged over chunks equal one pass in memory."""
+    csv_file = tmp_path / "events.csv"
+    events.to_csv(csv_file, index=False)
+    path = csv_file
+    if extension != ".csv":
+        path = tmp_path / f"events{extension}"
+        convert_events(csv_file, path, block_size=64 * 2**10)
+
+    # A chunk size that doesn't divide the row count
+    features, stats = stream_features(path, windows=WINDOWS, chunksize=3_001)
+
+    expected = build_features(events, windows=WINDOWS)
+    assert list(features.user_ids) == list(expected.user_ids)
+    np.testing.assert_allclose(features.matrix, expected.matrix, rtol=1e-6)
+    assert stats["rows"] == len(events)
+    assert stats["users"] == 200
+    assert stats["as_of"] == events["timestamp"].max().isoformat()
@@ -0,0 +1,161 @@
+import pandas as pd
+import pytest
+
+from convert_events import convert_events
+from incremental import IncrementalUserSales
+from sample_data import generate_events
+
+
+def daily_files(tmp_path, events, extension):
+    """Write one file per day of `events`, in the given format."""
+    paths = []
+    for day, day_events in events.groupby(events["export_day"]):
+        csv_file = tmp_path / f"events-{day}.csv"
+        day_events.drop(columns="export_day").to_csv(csv_file, index=False)
+        path = csv_file
+        if extension != ".csv":
+            path = tmp_path / f"events-{day}{extension}"
+            convert_events(csv_file, path)
+        paths.append(path)
+    return paths
+
+
+def full_recompute(events):
+    sales = events[events["category"] == "sales"].drop_duplicates("event_id")
+    grouped = sales.groupby("user_id")
+    return pd.DataFrame(
+        {
+            "value": grouped["value"].sum(),
+            "count": grouped["value"].size(),
+            "last_timestamp": grouped["timestamp"].max(),
+        }
+    )
+
+
+def assert_matches(aggregates, expected):
+    actual = aggregates.totals.set_index("user_id").sort_index()
+    expected = expected.sort_index()
+    pd.testing.assert_series_equal(
+        actual["value"], expected["value"], check_index_type=False
+    )
+    pd.testing.assert_series_equal(
+        actual["count"], expected["count"], check_index_type=False
+    )
+    pd.testing.assert_series_equal(
+        actual["last_timestamp"].astype("datetime64[ns]"),
+        expected["last_timestamp"].astype("datetime64[ns]"),
+        check_index_type=False,
+    )
+
+
+@pytest.fixture
+def events():
+    """A few days of events; some arrive hours late or twice."""
+    events = generate_events(100_000, users=300)
+    events["timestamp"] = events["timestamp"].dt.floor("s")
+    events["export_day"] = events["timestamp"].dt.date.astype(str)
+    days = sorted(events["export_day"].unique())
+    # Events from the last two hours of a day exported with the next day
+    next_day = dict(zip(days, days[1:]))
+    late = (events["timestamp"].dt.hour >= 22) & (
+        events["export_day"] != days[-1]
+    )
+    late &= events["event_id"] % 3 == 0
+    events.loc[late, "export_day"] = events.loc[late, "export_day"].map(
+        next_day
+    )
+    # Some on-time events delivered again with the next day's export
+    repeats = events[
+        (events["timestamp"].dt.hour >= 22)
+        & ~late
+        & (events["export_day"] != days[-1])
+        & (events["event_id"] % 2 == 0)
+    ].copy()
+    repeats["export_day"] = repeats["export_day"].map(next_day)
+    return pd.concat([events, repeats], ignore_index=True)
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet"])
+def test_daily_updates_match_full_recompute(tmp_path, events, extension):
+    """Tests that day-by-day updates equal recomputing from scratch."""
+    paths = daily_files(tmp_path, events, extension)
+    assert len(paths) >= 3
+
+    for path in paths:
+        aggregates = IncrementalUserSales(tmp_path / "state", "6h")
+        stats = aggregates.update([path])
+        assert stats["new_events"] > 0
+
+    assert_matches(aggregates, full_recompute(events))
+    assert stats["duplicates"] > 0
+
+
+def test_rerun_adds_nothing(tmp_path, events):
+    """Tests that feeding all files again changes no totals."""
+    paths = daily_files(tmp_path, events, ".parquet")
+    aggregates = IncrementalUserSales(tmp_path / "state", "6h")
+    aggregates.update(paths)
+    before = aggregates.totals.copy()
+
+    stats = IncrementalUserSales(tmp_path / "state", "6h").update(paths)
+
+    assert stats["new_events"] == 0
+    # Only the lateness window is read again
+    assert stats["duplicates"] == stats["window_events"]
+    reloaded = IncrementalUserSales(tmp_path / "state", "6h")
+    pd.testing.assert_frame_equal(reloaded.totals, before)
+
+
+def test_events_later_than_lateness_are_ignored(tmp_path):
+    """Tests that events older than the window aren't counted."""
+    events = generate_events(1_000, users=10)
+    day_one = events.iloc[:500]
+    # Sales from the start of the data, arriving long after the window
+    too_late = day_one[day_one["category"] == "sales"].head(5).copy()
+    too_late["event_id"] += 10_000
+    day_two = pd.concat([events.iloc[500:], too_late])
+    day_one.to_csv(tmp_path / "day-1.csv", index=False)
+    day_two.to_csv(tmp_path / "day-2.csv", index=False)
+
+    aggregates = IncrementalUserSales(tmp_path / "state", "1min")
+    aggregates.update([tmp_path / "day-1.csv"])
+    aggregates.update([tmp_path / "day-2.csv"])
+
+    assert_matches(aggregates, full_recompute(events))
+
+
+def test_large_file_keeps_a_bounded_window(tmp_path):
+    """Tests that a many-chunk update prunes its ids as it goes."""
+    events = generate_events(400_000, users=1_000)
+    events["timestamp"] = events["timestamp"].dt.floor("s")
+    sales = events[events["category"] == "sales"]
+    # Every 100th sale delivered again a few minutes later in the file
+    repeats = sales.iloc[::100].copy()
+    order = pd.concat(
+        [
+            pd.Series(events.index, dtype="float64"),
+            pd.Series(repeats.index + 100.5, dtype="float64"),
+        ],
+        ignore_index=True,
+    )
+    stream = pd.concat([events, repeats], ignore_index=True)
+    stream = stream.iloc[order.argsort()]
+    # And a few sales from the first hour arriving at the very end
+    too_late = sales.head(5).copy()
+    too_late["event_id"] += len(events)
+    stream = pd.concat([stream, too_late], ignore_index=True)
+    stream.to_parquet(tmp_path / "events.parquet", index=False)
+
+    aggregates = IncrementalUserSales(tmp_path / "state", "1h")
+    stats = aggregates.update([tmp_path / "events.parquet"], chunksize=2_000)
+
+    assert stats["rows"] >= len(sales) + len(repeats)
+    assert stats["duplicates"] == len(repeats)
+    assert stats["late"] == len(too_late)
+    assert_matches(aggregates, full_recompute(events))
+    hour = sales["timestamp"] > sales["timestamp"].max() - pd.Timedelta("1h")
+    assert stats["window_events"] == hour.sum()
+    # At most an hour of sales plus a chunk, not every id in the file
+    busiest_hour = sales.rolling("1h", on="timestamp")["event_id"].count()
+    assert stats["peak_window_events"] <= busiest_hour.max() + 2_000
+    assert stats["peak_window_events"] < len(sales) / 10
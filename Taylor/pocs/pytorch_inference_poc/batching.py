@@ -0,0 +1,156 @@
+import asyncio
+import time
+from collections import Counter
+
+import torch
+
+
+class BatchScheduler:
+    """
+    Collects concurrent inference requests into micro-batches.
+
+    Requests are queued until either `max_batch_size` are pending or the
+    oldest one has waited `max_wait_ms`, then the batch is stacked and run
+    through the model in a single `torch.no_grad()` forward pass. Each
+    caller receives its own `(class_index, confidence)` result.
+
+    `collate` turns the list of submitted inputs into the batch tensor; by
+    default inputs are `[1, 3, H, W]` tensors joined with `torch.cat`.
+    """
+
+    def __init__(
+        self, model, max_batch_size=16, max_wait_ms=5.0, collate=torch.cat
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.model = model
+        self.collate = collate
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = None
+        self._worker = None
+        # Stats
+        self.batches = 0
+        self.requests = 0
+        self.occupancy = Counter()
+        self.total_inference_seconds = 0.0
+
+    async def start(self):
+        """Start the background batching loop on the running event loop."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching loop, failing any requests still queued."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batch scheduler stopped."))
+
+    async def submit(self, item):
+        """
+        Queue a single preprocessed input for inference and wait for its
+        `(class_index, confidence)` result.
+        """
+        if self._worker is None:
+            raise RuntimeError("Batch scheduler is not running.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(
+                            await asyncio.wait_for(self._queue.get(), timeout)
+                        )
+                    except asyncio.TimeoutError:
+                        break
+
+                # Drop requests whose callers have already gone away
+                batch = [item for item in batch if not item[1].done()]
+                if not batch:
+                    continue
+
+                items = [item for item, _ in batch]
+                try:
+                    # Run the forward pass off the event loop so new
+                    # requests keep queueing while the model is busy.
+                    results = await loop.run_in_executor(
+                        None, self._forward, items
+                    )
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+        except asyncio.CancelledError:
+            # Requests taken off the queue for the batch being collected or
+            # run would otherwise never be answered
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(
+                        RuntimeError("Batch scheduler stopped.")
+                    )
+            raise
+
+    def _forward(self, items):
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = self.model(self.collate(items))
+            probabilities = torch.nn.functional.softmax(outputs, dim=1)
+            confidences, indices = probabilities.max(1)
+        self.total_inference_seconds += time.perf_counter() - start
+        self.batches += 1
+        self.requests += len(items)
+        self.occupancy[len(items)] += 1
+        return list(zip(indices.tolist(), confidences.tolist()))
+
+    def stats(self):
+        """Return batching counters, including per-batch occupancy."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": (
+                self.requests / self.batches if self.batches else 0.0
+            ),
+            "mean_occupancy": (
+                self.requests / (self.batches * self.max_batch_size)
+                if self.batches
+                else 0.0
+            ),
+            "mean_inference_ms": (
+                self.total_inference_seconds * 1000.0 / self.batches
+                if self.batches
+                else 0.0
+            ),
+            "batch_size_histogram": {
+                str(size): count
+                for size, count in sorted(self.occupancy.items())
+            },
+        }
@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Bounded in-memory LRU map with an optional write-through disk tier.
+
+    The memory tier holds at most `max_entries` JSON-serializable values and
+    evicts the least recently used one beyond that. When `disk_dir` is set,
+    every value is also written there, so entries evicted from memory (or
+    lost on restart) can be recovered without recomputing them. Disk reads
+    and writes run on a worker thread, so they don't block the event loop.
+    """
+
+    def __init__(self, max_entries=10000, disk_dir=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._entries = OrderedDict()
+        # Stats
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key):
+        """Return the cached value for `key`, or None on a miss."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        value = None
+        if self.disk_dir:
+            value = await asyncio.to_thread(self._read_disk, key)
+        if value is not None:
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key, value):
+        """Store `value` under `key`, evicting the oldest entry if needed."""
+        self._remember(key, value)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_path(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.json")
+
+    def _read_disk(self, key):
+        try:
+            with open(self._disk_path(key), "r") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Guard against (astronomically unlikely) digest collisions
+        return record["value"] if record.get("key") == key else None
+
+    def _write_disk(self, key, value):
+        # Write to a temporary file first so readers never see a partial
+        # entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"key": key, "value": value}, f)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            print(f"Failed to write cache entry to disk: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def stats(self):
+        """Return hit/miss counters for this tier."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (
+                (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            ),
+        }
+
+
+class PredictionCache:
+    """
+    Two-level cache of prediction results.
+
+    The URL level remembers, per image URL, the `ETag`/`Last-Modified`
+    validators seen on the last download along with the result, so a repeat
+    request costs one conditional GET answered with 304. The content level
+    maps a SHA-256 of the image bytes to the result, which catches the same
+    image served under different URLs or without validators.
+    """
+
+    def __init__(self, max_entries=10000, disk_dir=None):
+        self.by_url = LRUCache(
+            max_entries, os.path.join(disk_dir, "url") if disk_dir else None
+        )
+        self.by_content = LRUCache(
+            max_entries,
+            os.path.join(disk_dir, "content") if disk_dir else None,
+        )
+
+    @staticmethod
+    def content_key(image_bytes):
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    async def lookup_url(self, url):
+        """
+        Return `(conditional_headers, result)` for a previously seen URL,
+        or `(None, None)` if there is nothing to revalidate.
+        """
+        entry = await self.by_url.get(url)
+        if entry is None:
+            return None, None
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers, entry["result"]
+
+    async def lookup_content(self, image_bytes):
+        """Return the cached result for these exact image bytes, if any."""
+        return await self.by_content.get(self.content_key(image_bytes))
+
+    async def store(self, url, response_headers, image_bytes, result):
+        """Record `result` at both levels."""
+        await self.by_content.set(self.content_key(image_bytes), result)
+        await self.store_url(url, response_headers, result)
+
+    async def store_url(self, url, response_headers, result):
+        """Record `result` at the URL level, if `url` can be revalidated."""
+        if url is None:
+            return
+        etag = response_headers.get("etag")
+        last_modified = response_headers.get("last-modified")
+        # Without validators a URL can't be revalidated, so only the
+        # content level is useful for it
+        if etag or last_modified:
+            await self.by_url.set(
+                url,
+                {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "result": result,
+                },
+            )
+
+    def stats(self):
+        return {
+            "url": self.by_url.stats(),
+            "content": self.by_content.stats(),
+        }
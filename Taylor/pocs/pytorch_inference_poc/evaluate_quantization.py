@@ -0,0 +1,108 @@
+"""
+Report accuracy drift and latency of each serving precision against the
+fp32 model on a fixed local image set.
+
+    python evaluate_quantization.py --images-dir ./eval_images
+    python evaluate_quantization.py --images-dir ./eval_images \
+        --calibration-dir ./calibration_images --intra-op-threads 2
+"""
+
+import argparse
+import copy
+import time
+
+import torch
+
+from model_artifact import load_model
+from quantization import (
+    PRECISIONS,
+    configure_threads,
+    load_image_tensors,
+    quantize_model,
+)
+
+
+def predict_all(model, images, batch_size):
+    """Return softmax probabilities and mean per-batch latency (ms)."""
+    outputs = []
+    latencies = []
+    with torch.no_grad():
+        for start in range(0, len(images), batch_size):
+            batch = images[start : start + batch_size]
+            began = time.perf_counter()
+            logits = model(batch)
+            latencies.append((time.perf_counter() - began) * 1000.0)
+            outputs.append(torch.nn.functional.softmax(logits, dim=1))
+    return torch.cat(outputs), sum(latencies) / len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--images-dir", required=True, help="Fixed evaluation image set"
+    )
+    parser.add_argument(
+        "--calibration-dir",
+        help="Images for static int8 calibration (default: --images-dir)",
+    )
+    parser.add_argument("--model-path", help="Path to the .pth artifact")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--intra-op-threads", type=int, default=0)
+    parser.add_argument("--inter-op-threads", type=int, default=0)
+    parser.add_argument(
+        "--precisions",
+        nargs="+",
+        default=list(PRECISIONS),
+        choices=PRECISIONS,
+    )
+    args = parser.parse_args()
+
+    threads = configure_threads(args.intra_op_threads, args.inter_op_threads)
+    print(
+        f"Threads: intra-op={threads['intra_op_threads']}, "
+        f"inter-op={threads['inter_op_threads']}"
+    )
+
+    fp32_model, _, _ = load_model("eager", args.model_path)
+    images = load_image_tensors(args.images_dir)
+    print(f"Evaluating on {len(images)} images from {args.images_dir}")
+
+    reference, _ = predict_all(fp32_model, images, args.batch_size)
+    reference_top1 = reference.argmax(dim=1)
+    reference_top5 = reference.topk(5, dim=1).indices
+
+    print("-" * 78)
+    print(
+        f"{'precision':<14}{'top-1 agree':>12}{'top-5 overlap':>15}"
+        f"{'mean |dp|':>12}{'max |dp|':>11}{'ms/batch':>11}"
+    )
+    for precision in args.precisions:
+        # Quantization may modify the module it's given
+        model = quantize_model(
+            copy.deepcopy(fp32_model),
+            precision,
+            args.calibration_dir or args.images_dir,
+        )
+        probabilities, latency = predict_all(model, images, args.batch_size)
+
+        top1_agreement = (
+            (probabilities.argmax(dim=1) == reference_top1).float().mean()
+        )
+        top5 = probabilities.topk(5, dim=1).indices
+        top5_overlap = torch.tensor(
+            [
+                len(set(a.tolist()) & set(b.tolist())) / 5.0
+                for a, b in zip(top5, reference_top5)
+            ]
+        ).mean()
+        drift = (probabilities - reference).abs()
+        print(
+            f"{precision:<14}{top1_agreement.item():>12.2%}"
+            f"{top5_overlap.item():>15.2%}{drift.mean().item():>12.2e}"
+            f"{drift.max().item():>11.4f}{latency:>11.1f}"
+        )
+    print("-" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import asyncio
+import contextlib
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import httpx
+
+DEFAULT_USER_AGENT = "FastAPI-Inference-Client/1.0"
+
+
+class FetchError(Exception):
+    """Raised when an image cannot be downloaded."""
+
+
+class ImageTooLargeError(FetchError):
+    """Raised when an image exceeds the configured size limit."""
+
+
+@dataclass
+class FetchResult:
+    url: str
+    content: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    status_code: int = 200
+
+    @property
+    def not_modified(self):
+        """True when a conditional request was answered with 304."""
+        return self.status_code == 304
+
+
+@dataclass
+class _HostSlot:
+    semaphore: asyncio.Semaphore
+    # Fetches holding or waiting for the semaphore
+    users: int = 0
+
+
+class ImageFetcher:
+    """
+    Async image downloader sharing one pooled, keep-alive HTTP client.
+
+    Concurrency towards any single host is capped so one slow origin can't
+    occupy the whole connection pool, every request is bounded by a total
+    deadline, and bodies are streamed so oversized images are cut off as
+    soon as they cross `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        max_connections=100,
+        max_keepalive_connections=20,
+        per_host_limit=8,
+        timeout=10.0,
+        connect_timeout=3.0,
+        max_bytes=10 * 1024 * 1024,
+        user_agent=DEFAULT_USER_AGENT,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self._client = httpx.AsyncClient(
+            headers={"User-Agent": user_agent},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            follow_redirects=True,
+            transport=transport,
+        )
+        # Only hosts with a fetch in progress have an entry, so the map
+        # doesn't grow with every host ever seen
+        self._host_slots = {}
+        # Stats
+        self.requests = 0
+        self.failures = 0
+        self.bytes_downloaded = 0
+
+    async def aclose(self):
+        """Close the underlying connection pool."""
+        await self._client.aclose()
+
+    async def fetch(self, url, headers=None):
+        """
+        Download `url` and return its body as a `FetchResult`.
+
+        Conditional headers such as `If-None-Match` may be passed in
+        `headers`; a 304 answer comes back with empty content.
+        """
+        try:
+            parsed = httpx.URL(url)
+        except httpx.InvalidURL as e:
+            raise FetchError(f"Invalid URL: {e}") from e
+        if parsed.scheme not in ("http", "https"):
+            raise FetchError(f"Unsupported URL scheme: '{parsed.scheme}'")
+
+        self.requests += 1
+        async with self._host_slot((parsed.host, parsed.port)):
+            try:
+                return await asyncio.wait_for(
+                    self._download(url, headers), self.timeout
+                )
+            except asyncio.TimeoutError as e:
+                self.failures += 1
+                raise FetchError(
+                    f"Timed out after {self.timeout}s fetching {url}"
+                ) from e
+            except FetchError:
+                self.failures += 1
+                raise
+            except httpx.HTTPError as e:
+                self.failures += 1
+                raise FetchError(str(e) or type(e).__name__) from e
+
+    @contextlib.asynccontextmanager
+    async def _host_slot(self, host):
+        """Hold one of `host`'s `per_host_limit` slots."""
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = _HostSlot(
+                asyncio.Semaphore(self.per_host_limit)
+            )
+        slot.users += 1
+        try:
+            async with slot.semaphore:
+                yield
+        finally:
+            slot.users -= 1
+            if not slot.users:
+                del self._host_slots[host]
+
+    async def _download(self, url, headers):
+        async with self._client.stream("GET", url, headers=headers) as resp:
+            if resp.status_code >= 400:
+                raise FetchError(f"HTTP {resp.status_code} from {url}")
+
+            declared = resp.headers.get("Content-Length")
+            if declared and declared.isdigit():
+                if int(declared) > self.max_bytes:
+                    raise ImageTooLargeError(
+                        f"Image is {declared} bytes; "
+                        f"the limit is {self.max_bytes}"
+                    )
+
+            chunks = []
+            received = 0
+            async for chunk in resp.aiter_bytes():
+                received += len(chunk)
+                if received > self.max_bytes:
+                    raise ImageTooLargeError(
+                        f"Image exceeds the {self.max_bytes} byte limit"
+                    )
+                chunks.append(chunk)
+
+        self.bytes_downloaded += received
+        return FetchResult(
+            url=str(resp.url),
+            content=b"".join(chunks),
+            headers=dict(resp.headers),
+            status_code=resp.status_code,
+        )
+
+    def stats(self):
+        """Return download counters."""
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "bytes_downloaded": self.bytes_downloaded,
+            "per_host_limit": self.per_host_limit,
+            "max_bytes": self.max_bytes,
+        }
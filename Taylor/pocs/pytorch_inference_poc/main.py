@@ -1,13 +1,59 @@
+import asyncio
 import json
-import requests
-from PIL import Image, UnidentifiedImageError
-from io import BytesIO
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+from PIL import UnidentifiedImageError
 
-import torch
-import torchvision.transforms as transforms
-from torchvision.models import resnet18, ResNet18_Weights
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
 
-from fastapi import FastAPI, HTTPException
+from batching import BatchScheduler
+from cache import PredictionCache
+from fetch import FetchError, ImageFetcher, ImageTooLargeError
+from model_artifact import load_model as load_model_artifact
+from preprocess import Preprocessor
+from quantization import configure_threads
+
+# --- Model Configuration ---
+# MODEL_BACKEND is one of "eager", "torchscript" or "onnx"; MODEL_PATH
+# overrides the backend's default artifact path.
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "eager")
+MODEL_PATH = os.getenv("MODEL_PATH")
+# MODEL_PRECISION is one of "fp32", "dynamic_int8" or "static_int8"; the
+# static mode calibrates on the images in CALIBRATION_DIR.
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32")
+CALIBRATION_DIR = os.getenv("CALIBRATION_DIR")
+
+# --- CPU Threading Configuration ---
+# Size these so (uvicorn workers x intra-op threads) fits the node's cores;
+# 0 keeps torch's defaults.
+INTRA_OP_THREADS = int(os.getenv("INTRA_OP_THREADS", "0"))
+INTER_OP_THREADS = int(os.getenv("INTER_OP_THREADS", "0"))
+
+# --- Batching Configuration ---
+# Larger batches raise throughput at the cost of per-request latency; the
+# wait time bounds how long a lone request can sit in the queue.
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "16"))
+MAX_BATCH_WAIT_MS = float(os.getenv("MAX_BATCH_WAIT_MS", "5"))
+
+# --- Preprocessing Configuration ---
+# Number of processes used to decode images; 0 decodes on the threadpool.
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "0"))
+
+# --- Batch Endpoint Configuration ---
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "256"))
+
+# --- Image Download Configuration ---
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "10"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(10 * 1024 * 1024)))
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "100"))
+FETCH_PER_HOST_LIMIT = int(os.getenv("FETCH_PER_HOST_LIMIT", "8"))
+
+# --- Prediction Cache Configuration ---
+# CACHE_DIR enables the on-disk tier; leave unset for memory only.
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_DIR = os.getenv("CACHE_DIR")
 
 # --- App Initialization ---
 app = FastAPI(
@@ -19,44 +65,151 @@ app = FastAPI(
 # --- Global Variables & Model Loading ---
 model = None
 imagenet_class_index = None
+startup_report = None
+preprocessor = None
+batcher = None
+fetcher = None
+prediction_cache = PredictionCache(
+    max_entries=CACHE_MAX_ENTRIES, disk_dir=CACHE_DIR
+)
 
 
 @app.on_event("startup")
 def load_model():
-    """Load the model and class labels on startup."""
-    global model, imagenet_class_index
-
-    # Load pre-trained ResNet18 model
-    weights = ResNet18_Weights.DEFAULT
-    model = resnet18(weights=weights)
-    model.eval()
-
-    # Load ImageNet class index
-    class_idx_url = weights.meta["categories_json"]
-    response = requests.get(class_idx_url)
-    response.raise_for_status()  # Ensure the request was successful
-    imagenet_class_index = json.loads(response.text)
-
-    print("Model and class labels loaded successfully.")
-
-
-# --- Preprocessing ---
-def transform_image(image_bytes):
-    """Apply the necessary transformations to the image."""
-    transformations = transforms.Compose(
-        [
-            transforms.Resize(256),
-            transforms.CenterCrop(224),
-            transforms.ToTensor(),
-            transforms.Normalize(
-                mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]
-            ),
-        ]
+    """Load the model and class labels from local artifacts on startup."""
+    global model, imagenet_class_index, startup_report
+
+    # Threads must be pinned before the first forward pass
+    threads = configure_threads(INTRA_OP_THREADS, INTER_OP_THREADS)
+
+    model, imagenet_class_index, startup_report = load_model_artifact(
+        backend=MODEL_BACKEND,
+        path=MODEL_PATH,
+        precision=MODEL_PRECISION,
+        calibration_dir=CALIBRATION_DIR,
+    )
+    startup_report.update(threads)
+
+    print(
+        f"Model and class labels loaded successfully "
+        f"({startup_report['backend']} backend, "
+        f"{startup_report['precision']}, "
+        f"{startup_report['total_ms']:.0f} ms)."
+    )
+
+
+@app.on_event("startup")
+def start_preprocessor():
+    """Build the preprocessing pipeline once, with its decode pool."""
+    global preprocessor
+    executor = (
+        ProcessPoolExecutor(max_workers=PREPROCESS_WORKERS)
+        if PREPROCESS_WORKERS > 0
+        else None
+    )
+    preprocessor = Preprocessor(
+        max_batch_size=MAX_BATCH_SIZE, executor=executor
+    )
+
+
+@app.on_event("startup")
+async def start_batcher():
+    """Start the micro-batching scheduler in front of the model."""
+    global batcher
+    batcher = BatchScheduler(
+        model,
+        max_batch_size=MAX_BATCH_SIZE,
+        max_wait_ms=MAX_BATCH_WAIT_MS,
+        collate=preprocessor.collate,
+    )
+    await batcher.start()
+
+
+@app.on_event("startup")
+async def start_fetcher():
+    """Open the pooled HTTP client used to download images."""
+    global fetcher
+    fetcher = ImageFetcher(
+        max_connections=FETCH_MAX_CONNECTIONS,
+        per_host_limit=FETCH_PER_HOST_LIMIT,
+        timeout=FETCH_TIMEOUT_SECONDS,
+        max_bytes=FETCH_MAX_BYTES,
     )
-    image = Image.open(BytesIO(image_bytes))
-    if image.mode != "RGB":
-        image = image.convert("RGB")
-    return transformations(image).unsqueeze(0)
+
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    """Stop the scheduler, failing any requests still queued."""
+    if batcher is not None:
+        await batcher.stop()
+
+
+@app.on_event("shutdown")
+async def stop_fetcher():
+    """Close the image download connection pool."""
+    if fetcher is not None:
+        await fetcher.aclose()
+
+
+@app.on_event("shutdown")
+def stop_preprocessor():
+    """Shut down the decode process pool, if one was started."""
+    if preprocessor is not None and preprocessor.executor is not None:
+        preprocessor.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Inference Pipeline ---
+async def classify_image(image_bytes, image_url=None, response_headers=None):
+    """Classify raw image bytes, consulting the content-level cache."""
+    result = await prediction_cache.lookup_content(image_bytes)
+    if result is not None:
+        # Same bytes as a cached image: only this URL's validators are new
+        await prediction_cache.store_url(
+            image_url, response_headers or {}, result
+        )
+        return result
+
+    # Decode and crop the image; normalization happens per batch
+    crop = await preprocessor.decode_async(image_bytes)
+
+    # Make prediction; concurrent requests share a forward pass
+    predicted_idx, confidence = await batcher.submit(crop)
+
+    result = {
+        "class_index": predicted_idx,
+        "class_name": imagenet_class_index[predicted_idx],
+        "confidence": f"{confidence:.4f}",
+    }
+    await prediction_cache.store(
+        image_url, response_headers or {}, image_bytes, result
+    )
+    return result
+
+
+async def classify_url(image_url):
+    """Download and classify an image, revalidating cached URLs."""
+    # Revalidate a previously seen URL with a conditional request; a 304
+    # means the image is unchanged and the old result still holds
+    conditional_headers, cached = await prediction_cache.lookup_url(image_url)
+
+    # Download without blocking the event loop, so fetching overlaps with
+    # inference for other requests
+    fetched = await fetcher.fetch(image_url, headers=conditional_headers)
+    if fetched.not_modified and cached is not None:
+        return cached
+
+    return await classify_image(fetched.content, image_url, fetched.headers)
+
+
+def describe_error(error):
+    """Map a pipeline exception to an HTTP status code and message."""
+    if isinstance(error, UnidentifiedImageError):
+        return 400, "Cannot identify image file. Is the URL correct?"
+    if isinstance(error, ImageTooLargeError):
+        return 413, str(error)
+    if isinstance(error, FetchError):
+        return 400, f"Failed to download image: {error}"
+    return 500, f"An unexpected error occurred: {error}"
 
 
 # --- API Endpoints ---
@@ -66,59 +219,112 @@ def health_check():
     return {"status": "ok", "message": "Model is loaded and ready."}
 
 
+@app.get("/stats")
+def stats():
+    """Batching and download statistics for tuning the serving path."""
+    if batcher is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded.")
+    return {
+        "startup": startup_report,
+        "batching": batcher.stats(),
+        "fetch": fetcher.stats(),
+        "cache": prediction_cache.stats(),
+    }
+
+
 @app.get("/predict")
-def predict(image_url: str):
+async def predict(image_url: str):
     """
     Predicts the class of an image from a URL.
     """
-    if model is None or imagenet_class_index is None:
+    if batcher is None or imagenet_class_index is None:
         raise HTTPException(
             status_code=503, detail="Model is not loaded. Please wait."
         )
 
     try:
-        # It's good practice to send a user-agent
-        headers = {"User-Agent": "FastAPI-Inference-Client/1.0"}
-        response = requests.get(image_url, headers=headers)
-        response.raise_for_status()
-        image_bytes = response.content
-
-        # Preprocess the image
-        tensor = transform_image(image_bytes)
-
-        # Make prediction
-        with torch.no_grad():
-            outputs = model(tensor)
-            _, y_hat = outputs.max(1)
-            predicted_idx = y_hat.item()
-
-            # Get probabilities and find confidence for the predicted class
-            probabilities = torch.nn.functional.softmax(outputs, dim=1)
-            confidence = probabilities[0][predicted_idx].item()
-
-        # Get the class name
-        predicted_class = imagenet_class_index[predicted_idx]
-
-        return {
-            "class_index": predicted_idx,
-            "class_name": predicted_class,
-            "confidence": f"{confidence:.4f}",
-        }
-
-    except UnidentifiedImageError:
+        return await classify_url(image_url)
+    except Exception as e:
+        status_code, detail = describe_error(e)
+        raise HTTPException(status_code=status_code, detail=detail)
+
+
+@app.post("/predict/batch")
+async def predict_batch(
+    image_urls: List[str] = Form(default=[]),
+    files: List[UploadFile] = File(default=[]),
+):
+    """
+    Predicts the classes of many images, given as URLs and/or uploads.
+
+    Images are fetched and preprocessed concurrently and share batched
+    forward passes. Results stream back as NDJSON, one line per image in
+    completion order; each line carries the image's `index` in the request
+    (URLs first, then files) and either a prediction or an `error`.
+    """
+    if batcher is None or imagenet_class_index is None:
         raise HTTPException(
-            status_code=400,
-            detail="Cannot identify image file. Is the URL correct?",
+            status_code=503, detail="Model is not loaded. Please wait."
         )
-    except requests.exceptions.RequestException as e:
+    total = len(image_urls) + len(files)
+    if total == 0:
         raise HTTPException(
-            status_code=400, detail=f"Failed to download image: {e}"
+            status_code=400, detail="Provide image_urls and/or files."
         )
-    except Exception as e:
+    if total > BATCH_MAX_ITEMS:
         raise HTTPException(
-            status_code=500, detail=f"An unexpected error occurred: {e}"
+            status_code=413,
+            detail=f"At most {BATCH_MAX_ITEMS} images per request.",
         )
 
+    # Read uploads now; the request body is gone once streaming starts.
+    # One byte past the limit is enough to reject an oversized file, so it
+    # is never buffered whole.
+    uploads = [
+        (upload.filename, await upload.read(FETCH_MAX_BYTES + 1))
+        for upload in files
+    ]
+
+    async def run_item(index, source, work):
+        try:
+            result = await work
+            return {"index": index, "source": source, **result}
+        except Exception as e:
+            status_code, detail = describe_error(e)
+            return {
+                "index": index,
+                "source": source,
+                "status_code": status_code,
+                "error": detail,
+            }
+
+    async def classify_upload(image_bytes):
+        if len(image_bytes) > FETCH_MAX_BYTES:
+            raise ImageTooLargeError(
+                f"Image exceeds the {FETCH_MAX_BYTES} byte limit"
+            )
+        return await classify_image(image_bytes)
+
+    async def stream_results():
+        items = [(url, classify_url(url)) for url in image_urls] + [
+            (filename, classify_upload(data)) for filename, data in uploads
+        ]
+        tasks = [
+            asyncio.create_task(run_item(index, source, work))
+            for index, (source, work) in enumerate(items)
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+        finally:
+            # Stop outstanding work if the client goes away mid-stream
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        stream_results(), media_type="application/x-ndjson"
+    )
+
 
 if __name__ == "__main__":
     import uvicorn
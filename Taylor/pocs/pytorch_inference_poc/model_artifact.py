@@ -0,0 +1,202 @@
+import json
+import os
+import time
+
+import torch
+from torchvision.models import resnet18
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACT_PATH = os.path.join(MODEL_DIR, "resnet18_pretrained.pth")
+TORCHSCRIPT_PATH = os.path.join(MODEL_DIR, "resnet18_scripted.pt")
+ONNX_PATH = os.path.join(MODEL_DIR, "resnet18.onnx")
+
+ARTIFACT_FORMAT_VERSION = 1
+BACKENDS = ("eager", "torchscript", "onnx")
+INPUT_SHAPE = (1, 3, 224, 224)
+
+
+# --- Saving & Export ---
+def save_artifact(model, categories, path=ARTIFACT_PATH):
+    """
+    Save the model weights together with their class labels.
+
+    The artifact is a plain `torch.save` dict holding only tensors, strings
+    and ints, so it loads with `weights_only=True` and can be memory-mapped.
+    """
+    torch.save(
+        {
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "arch": "resnet18",
+            "categories": list(categories),
+            "state_dict": model.state_dict(),
+        },
+        path,
+    )
+
+
+def export_torchscript(model, categories, path=TORCHSCRIPT_PATH):
+    """Trace the model to TorchScript, bundling the class labels."""
+    model.eval()
+    with torch.no_grad():
+        traced = torch.jit.trace(model, torch.zeros(INPUT_SHAPE))
+    torch.jit.save(
+        traced,
+        path,
+        _extra_files={"categories.json": json.dumps(list(categories))},
+    )
+
+
+def export_onnx(model, categories, path=ONNX_PATH):
+    """Export the model to ONNX with a dynamic batch axis."""
+    import onnx
+
+    model.eval()
+    torch.onnx.export(
+        model,
+        (torch.zeros(INPUT_SHAPE),),
+        path,
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        external_data=False,
+    )
+    # Store the labels in the model's metadata so the graph is
+    # self-contained
+    onnx_model = onnx.load(path)
+    onnx_model.metadata_props.add(
+        key="categories", value=json.dumps(list(categories))
+    )
+    onnx.save(onnx_model, path)
+
+
+# --- Loading ---
+class OnnxModel:
+    """Callable wrapper making an ONNX Runtime session look like a module."""
+
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def __call__(self, tensor):
+        (logits,) = self.session.run(
+            None, {self.input_name: tensor.numpy()}
+        )
+        return torch.from_numpy(logits)
+
+
+def _missing(path):
+    return FileNotFoundError(
+        f"Model artifact not found at {path}. "
+        "Run `python save_resnet_model.py` to create it."
+    )
+
+
+def _corrupt(path, error):
+    return ValueError(
+        f"Model artifact at {path} is corrupt or truncated ({error}). "
+        "Run `python save_resnet_model.py` to recreate it."
+    )
+
+
+def _load_eager(path):
+    if not os.path.exists(path):
+        raise _missing(path)
+    # mmap keeps start-up proportional to what is touched, not file size
+    try:
+        artifact = torch.load(
+            path, map_location="cpu", mmap=True, weights_only=True
+        )
+    except RuntimeError as e:
+        raise _corrupt(path, e) from e
+    if "state_dict" in artifact:
+        state_dict = artifact["state_dict"]
+        categories = artifact["categories"]
+    else:
+        # Older artifacts were a bare state dict; torchvision ships the
+        # ImageNet labels with the package, so no download is needed
+        from torchvision.models import ResNet18_Weights
+
+        state_dict = artifact
+        categories = ResNet18_Weights.DEFAULT.meta["categories"]
+
+    model = resnet18(weights=None)
+    model.load_state_dict(state_dict, assign=True)
+    return model.eval(), categories
+
+
+def _load_torchscript(path):
+    if not os.path.exists(path):
+        raise _missing(path)
+    extra_files = {"categories.json": ""}
+    try:
+        model = torch.jit.load(
+            path, map_location="cpu", _extra_files=extra_files
+        )
+    except RuntimeError as e:
+        raise _corrupt(path, e) from e
+    return model.eval(), json.loads(extra_files["categories.json"])
+
+
+def _load_onnx(path):
+    import onnxruntime
+
+    if not os.path.exists(path):
+        raise _missing(path)
+    session = onnxruntime.InferenceSession(
+        path, providers=["CPUExecutionProvider"]
+    )
+    metadata = session.get_modelmeta().custom_metadata_map
+    return OnnxModel(session), json.loads(metadata["categories"])
+
+
+def load_model(
+    backend="eager", path=None, precision="fp32", calibration_dir=None
+):
+    """
+    Load the model and its class labels entirely from local files,
+    optionally converting it to an int8 `precision` (see quantization.py).
+
+    Returns `(model, categories, report)`, where `report` breaks down the
+    start-up time by phase.
+    """
+    loaders = {
+        "eager": (_load_eager, ARTIFACT_PATH),
+        "torchscript": (_load_torchscript, TORCHSCRIPT_PATH),
+        "onnx": (_load_onnx, ONNX_PATH),
+    }
+    if backend not in loaders:
+        raise ValueError(
+            f"Unknown model backend '{backend}'; expected one of {BACKENDS}"
+        )
+    loader, default_path = loaders[backend]
+    path = path or default_path
+
+    timings = {}
+    start = time.perf_counter()
+    model, categories = loader(path)
+    timings["load_ms"] = (time.perf_counter() - start) * 1000.0
+
+    if precision != "fp32":
+        from quantization import quantize_model
+
+        start = time.perf_counter()
+        model = quantize_model(model, precision, calibration_dir)
+        timings["quantize_ms"] = (time.perf_counter() - start) * 1000.0
+
+    # Run one forward pass so lazy initialization isn't paid by the first
+    # request
+    warmup_start = time.perf_counter()
+    with torch.no_grad():
+        model(torch.zeros(INPUT_SHAPE))
+    timings["warmup_ms"] = (time.perf_counter() - warmup_start) * 1000.0
+
+    report = {
+        "backend": backend,
+        "precision": precision,
+        "path": path,
+        "size_bytes": os.path.getsize(path),
+        "num_classes": len(categories),
+        **timings,
+        "total_ms": sum(timings.values()),
+    }
+    return model, categories, report
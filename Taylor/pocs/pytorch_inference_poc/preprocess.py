@@ -0,0 +1,121 @@
+import asyncio
+import math
+from io import BytesIO
+
+import numpy as np
+import torch
+from PIL import Image
+
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def decode_image(image_bytes, resize_size=256, crop_size=224):
+    """
+    Decode an image straight to a `[crop, crop, 3]` uint8 RGB array.
+
+    Approximates `Resize(resize_size)` followed by `CenterCrop(crop_size)`,
+    but JPEGs are decoded at the smallest DCT scale that still covers the
+    resize target, and the crop window is resampled in a single step from
+    the source image instead of resizing the whole frame first. Lossless
+    images come out within a gray level or two of the torchvision
+    pipeline; large JPEGs differ by a few levels on average and up to
+    about ten (see `test_preprocess.py`).
+
+    This is a module-level function so it can run in a process pool.
+    """
+    image = Image.open(BytesIO(image_bytes))
+
+    width, height = image.size
+    if image.format == "JPEG":
+        # Let libjpeg skip detail we'd throw away; draft() never goes below
+        # the requested size
+        shrink = resize_size / min(width, height)
+        if shrink < 1:
+            image.draft(
+                "RGB",
+                (math.ceil(width * shrink), math.ceil(height * shrink)),
+            )
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    # Map the centre crop of the resized image back into source pixels
+    width, height = image.size
+    scale = resize_size / min(width, height)
+    box_size = crop_size / scale
+    left = (width - box_size) / 2
+    top = (height - box_size) / 2
+    image = image.resize(
+        (crop_size, crop_size),
+        Image.BILINEAR,
+        box=(left, top, left + box_size, top + box_size),
+    )
+    return np.asarray(image, dtype=np.uint8)
+
+
+class Preprocessor:
+    """
+    ResNet preprocessing built once and shared by every request.
+
+    Images are decoded to uint8 crops (optionally in a process pool, since
+    decoding and resampling are GIL-bound), and `collate` normalizes a whole
+    batch of crops into a preallocated float32 buffer in one pass.
+    """
+
+    def __init__(
+        self, resize_size=256, crop_size=224, max_batch_size=16, executor=None
+    ):
+        self.resize_size = resize_size
+        self.crop_size = crop_size
+        self.executor = executor
+        # (x / 255 - mean) / std, rearranged as x * scale - shift
+        self._scale = (1.0 / (255.0 * IMAGENET_STD)).reshape(3, 1, 1)
+        self._shift = (IMAGENET_MEAN / IMAGENET_STD).reshape(3, 1, 1)
+        self._buffer = self._allocate(max_batch_size)
+
+    def _allocate(self, batch_size):
+        return np.empty(
+            (batch_size, 3, self.crop_size, self.crop_size), dtype=np.float32
+        )
+
+    def decode(self, image_bytes):
+        """Decode and crop synchronously on the calling thread."""
+        return decode_image(image_bytes, self.resize_size, self.crop_size)
+
+    async def decode_async(self, image_bytes):
+        """Decode and crop on the configured executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            decode_image,
+            image_bytes,
+            self.resize_size,
+            self.crop_size,
+        )
+
+    def normalize_into(self, crops, out):
+        """Write normalized CHW float32 crops into `out`."""
+        for i, crop in enumerate(crops):
+            np.multiply(crop.transpose(2, 0, 1), self._scale, out=out[i])
+            np.subtract(out[i], self._shift, out=out[i])
+        return out
+
+    def collate(self, crops):
+        """
+        Normalize a batch of decoded crops into the shared buffer and return
+        it as a `[N, 3, H, W]` tensor.
+
+        The tensor aliases the buffer, so it is only valid until the next
+        call; callers must consume each batch before collating the next.
+        """
+        if len(crops) > len(self._buffer):
+            self._buffer = self._allocate(len(crops))
+        batch = self.normalize_into(crops, self._buffer[: len(crops)])
+        return torch.from_numpy(batch)
+
+    def transform(self, image_bytes):
+        """Preprocess one image into a freshly allocated `[1, 3, H, W]`."""
+        out = self._allocate(1)
+        return torch.from_numpy(
+            self.normalize_into([self.decode(image_bytes)], out)
+        )
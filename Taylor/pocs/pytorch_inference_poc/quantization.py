@@ -0,0 +1,106 @@
+import glob
+import os
+
+import torch
+from torch.ao import quantization as tq
+from torchvision.models.quantization import resnet18 as quantizable_resnet18
+
+from preprocess import Preprocessor
+
+PRECISIONS = ("fp32", "dynamic_int8", "static_int8")
+
+
+def configure_threads(intra_op_threads=None, inter_op_threads=None):
+    """
+    Pin torch's intra-op and inter-op thread pools for this worker.
+
+    With several uvicorn workers per node, torch's default of one
+    intra-op thread per core oversubscribes the CPU; give each worker its
+    share instead. Must run before the first forward pass.
+    """
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError as e:
+            # Can only be set once, before any inter-op work has started
+            print(f"Could not set inter-op threads: {e}")
+    return {
+        "intra_op_threads": torch.get_num_threads(),
+        "inter_op_threads": torch.get_num_interop_threads(),
+    }
+
+
+def load_image_tensors(images_dir, limit=None):
+    """Preprocess every JPEG/PNG in `images_dir` into one `[N, 3, H, W]`."""
+    paths = sorted(
+        path
+        for pattern in ("*.jpg", "*.jpeg", "*.png")
+        for path in glob.glob(os.path.join(images_dir, pattern))
+    )[:limit]
+    if not paths:
+        raise ValueError(f"No images found in {images_dir}")
+    preprocessor = Preprocessor()
+    tensors = []
+    for path in paths:
+        with open(path, "rb") as f:
+            tensors.append(preprocessor.transform(f.read()))
+    return torch.cat(tensors)
+
+
+def quantize_dynamic(model):
+    """
+    Dynamically quantize the model's Linear layers to int8.
+
+    Cheap and calibration-free, but for ResNet18 only the final classifier
+    is affected, so the speed-up is modest.
+    """
+    return tq.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(model, calibration_images, batch_size=16):
+    """
+    Statically quantize a ResNet18 to int8, convolutions included.
+
+    The fp32 weights are copied into torchvision's quantizable ResNet,
+    Conv/BN/ReLU blocks are fused, and activation ranges are calibrated on
+    `calibration_images` before conversion.
+    """
+    engine = "x86"
+    if engine not in torch.backends.quantized.supported_engines:
+        engine = "qnnpack"
+    torch.backends.quantized.engine = engine
+
+    qmodel = quantizable_resnet18(weights=None, quantize=False)
+    qmodel.load_state_dict(model.state_dict())
+    qmodel.eval()
+    qmodel.fuse_model(is_qat=False)
+    qmodel.qconfig = tq.get_default_qconfig(engine)
+    tq.prepare(qmodel, inplace=True)
+    with torch.no_grad():
+        for start in range(0, len(calibration_images), batch_size):
+            qmodel(calibration_images[start : start + batch_size])
+    tq.convert(qmodel, inplace=True)
+    return qmodel
+
+
+def quantize_model(model, precision, calibration_dir=None):
+    """Return `model` converted to the requested serving precision."""
+    if precision == "fp32":
+        return model
+    if not isinstance(model, torch.nn.Module) or isinstance(
+        model, torch.jit.ScriptModule
+    ):
+        raise ValueError(f"{precision} requires the eager model backend.")
+    if precision == "dynamic_int8":
+        return quantize_dynamic(model)
+    if precision == "static_int8":
+        if not calibration_dir:
+            raise ValueError(
+                "static_int8 needs a directory of calibration images."
+            )
+        return quantize_static(model, load_image_tensors(calibration_dir))
+    raise ValueError(
+        f"Unknown precision '{precision}'; expected one of {PRECISIONS}"
+    )
@@ -1,40 +1,67 @@
-import torch
-import torchvision.models as models
+import argparse
 import os
 
-# Define the directory and path for the model
-MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_FILENAME = "resnet18_pretrained.pth"
-MODEL_PATH = os.path.join(MODEL_DIR, MODEL_FILENAME)
+import torchvision.models as models
+
+from model_artifact import (
+    ARTIFACT_PATH,
+    ONNX_PATH,
+    TORCHSCRIPT_PATH,
+    export_onnx,
+    export_torchscript,
+    save_artifact,
+)
 
 
-def save_model():
+def save_model(torchscript=False, onnx=False):
     """
-    Downloads the ResNet18 pre-trained weights and saves the state dictionary.
+    Downloads the ResNet18 pre-trained weights and saves them, with the
+    class labels, as a local artifact the server can load offline.
     """
     print("Downloading pre-trained ResNet18 model weights...")
     # Using the recommended 'weights' parameter for modern torchvision
     weights = models.ResNet18_Weights.DEFAULT
     model = models.resnet18(weights=weights)
+    model.eval()
+    categories = weights.meta["categories"]
     print("Model downloaded.")
 
-    # Save the model's state dictionary
+    # Save the model's state dictionary and class labels
     try:
-        torch.save(model.state_dict(), MODEL_PATH)
-        print(f"Model state dictionary saved successfully to: {MODEL_PATH}")
+        save_artifact(model, categories, ARTIFACT_PATH)
+        print(f"Model artifact saved successfully to: {ARTIFACT_PATH}")
+        if torchscript:
+            export_torchscript(model, categories, TORCHSCRIPT_PATH)
+            print(f"TorchScript model saved to: {TORCHSCRIPT_PATH}")
+        if onnx:
+            export_onnx(model, categories, ONNX_PATH)
+            print(f"ONNX model saved to: {ONNX_PATH}")
     except Exception as e:
         print(f"Error saving model: {e}")
 
 
 if __name__ == "__main__":
-    if os.path.exists(MODEL_PATH):
-        print(f"Model file already exists at: {MODEL_PATH}")
+    parser = argparse.ArgumentParser(
+        description="Save ResNet18 weights for offline serving."
+    )
+    parser.add_argument(
+        "--torchscript",
+        action="store_true",
+        help="Also export a traced TorchScript graph.",
+    )
+    parser.add_argument(
+        "--onnx", action="store_true", help="Also export an ONNX graph."
+    )
+    args = parser.parse_args()
+
+    if os.path.exists(ARTIFACT_PATH):
+        print(f"Model file already exists at: {ARTIFACT_PATH}")
         overwrite = (
             input("Do you want to overwrite it? (y/n): ").strip().lower()
         )
         if overwrite == "y":
-            save_model()
+            save_model(args.torchscript, args.onnx)
         else:
             print("Operation cancelled.")
     else:
-        save_model()
+        save_model(args.torchscript, args.onnx)
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+import pytest
+import torch
+
+from batching import BatchScheduler
+
+
+class RecordingModel(torch.nn.Module):
+    """Scores `[n, 3]` inputs as themselves, recording each batch size."""
+
+    def __init__(self, release=None):
+        super().__init__()
+        self.batch_sizes = []
+        self.started = threading.Event()
+        self.release = release
+
+    def forward(self, inputs):
+        self.batch_sizes.append(len(inputs))
+        self.started.set()
+        if self.release is not None:
+            self.release.wait(5)
+        return inputs
+
+
+def row(index):
+    """An input whose top class is `index % 3`."""
+    scores = torch.zeros(1, 3)
+    scores[0, index % 3] = 5.0
+    return scores
+
+
+def test_concurrent_requests_share_one_forward_pass():
+    """Tests that a full batch runs at once, each caller getting its row."""
+    model = RecordingModel()
+
+    async def run():
+        batcher = BatchScheduler(model, max_batch_size=4, max_wait_ms=1000)
+        await batcher.start()
+        try:
+            return await asyncio.gather(
+                *(batcher.submit(row(index)) for index in range(4))
+            )
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(run())
+
+    assert model.batch_sizes == [4]
+    assert [index for index, _ in results] == [0, 1, 2, 0]
+
+
+def test_partial_batch_is_flushed_at_the_deadline():
+    """Tests that a lone request waits at most max_wait_ms."""
+    model = RecordingModel()
+
+    async def run():
+        batcher = BatchScheduler(model, max_batch_size=16, max_wait_ms=20)
+        await batcher.start()
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(*(batcher.submit(row(i)) for i in range(3))),
+                timeout=2,
+            )
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(run())
+
+    assert model.batch_sizes == [3]
+    assert len(results) == 3
+
+
+@pytest.mark.parametrize("during", ["collecting", "forward"])
+def test_stop_fails_requests_already_taken_off_the_queue(during):
+    """Tests that stop() answers requests in a batch being built or run."""
+    release = threading.Event()
+    model = RecordingModel(release=release)
+
+    async def run():
+        batcher = BatchScheduler(
+            model,
+            max_batch_size=2 if during == "forward" else 16,
+            max_wait_ms=10_000,
+        )
+        await batcher.start()
+        requests = [
+            asyncio.ensure_future(batcher.submit(row(i))) for i in range(2)
+        ]
+        if during == "forward":
+            while not model.started.is_set():
+                await asyncio.sleep(0.01)
+        else:
+            await asyncio.sleep(0.05)
+        await batcher.stop()
+        release.set()
+        return await asyncio.wait_for(
+            asyncio.gather(*requests, return_exceptions=True), timeout=2
+        )
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
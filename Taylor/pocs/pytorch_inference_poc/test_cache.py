@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+from cache import LRUCache, PredictionCache
+
+RESULT = {"class_index": 1, "class_name": "goldfish", "confidence": "0.9"}
+
+
+def test_evicts_least_recently_used():
+    """Tests that the memory tier keeps the most recently used entries."""
+    cache = LRUCache(max_entries=2)
+
+    async def run():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [1, None, 3]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (3, 1, 1)
+
+
+def test_disk_tier_recovers_evicted_entries(tmp_path):
+    """Tests that evicted or restarted entries are read back from disk."""
+    cache = LRUCache(max_entries=1, disk_dir=str(tmp_path))
+
+    async def run():
+        await cache.set("a", {"value": 1})
+        await cache.set("b", {"value": 2})
+        restarted = LRUCache(max_entries=1, disk_dir=str(tmp_path))
+        return await cache.get("a"), await restarted.get("b")
+
+    assert asyncio.run(run()) == ({"value": 1}, {"value": 2})
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_io_runs_off_the_event_loop(tmp_path, monkeypatch):
+    """Tests that disk reads and writes happen on a worker thread."""
+    cache = LRUCache(max_entries=1, disk_dir=str(tmp_path))
+    threads = []
+    for name in ("_read_disk", "_write_disk"):
+        method = getattr(cache, name)
+
+        def recording(*args, method=method):
+            threads.append(threading.get_ident())
+            return method(*args)
+
+        monkeypatch.setattr(cache, name, recording)
+
+    async def run():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        assert await cache.get("a") == 1
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 3
+    assert loop_thread not in threads
+
+
+def test_url_level_needs_validators():
+    """Tests that only URLs with ETag/Last-Modified are revalidated."""
+    cache = PredictionCache()
+    image = b"image bytes"
+
+    async def run():
+        await cache.store("http://a/x.png", {"etag": '"v1"'}, image, RESULT)
+        await cache.store("http://a/y.png", {}, image, RESULT)
+        return (
+            await cache.lookup_url("http://a/x.png"),
+            await cache.lookup_url("http://a/y.png"),
+            await cache.lookup_content(image),
+        )
+
+    revalidate, unvalidated, by_content = asyncio.run(run())
+
+    assert revalidate == ({"If-None-Match": '"v1"'}, RESULT)
+    assert unvalidated == (None, None)
+    assert by_content == RESULT
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetch import FetchError, ImageFetcher, ImageTooLargeError
+
+IMAGE_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 1024
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """A tiny local origin standing in for partner image hosts."""
+
+    protocol_version = "HTTP/1.1"
+    # Concurrent requests to /counted.png, and the most seen at once
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def do_GET(self):
+        if self.path == "/counted.png":
+            with self.lock:
+                StandInHandler.active += 1
+                StandInHandler.peak = max(self.peak, self.active)
+            time.sleep(0.1)
+            with self.lock:
+                StandInHandler.active -= 1
+            self._send(200, IMAGE_BYTES)
+        elif self.path == "/image.png":
+            self._send(200, IMAGE_BYTES)
+        elif self.path == "/large.png":
+            self._send(200, b"\x00" * 4096)
+        elif self.path == "/undeclared.png":
+            # Stream without a Content-Length so only the byte counter
+            # can enforce the size cap
+            self.send_response(200)
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(b"\x00" * 4096)
+        elif self.path == "/slow.png":
+            time.sleep(1.0)
+            self._send(200, IMAGE_BYTES)
+        else:
+            self._send(404, b"not found")
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def fetch(url, **kwargs):
+    async def run():
+        fetcher = ImageFetcher(**kwargs)
+        try:
+            return await fetcher.fetch(url)
+        finally:
+            await fetcher.aclose()
+
+    return asyncio.run(run())
+
+
+def test_fetch_image(base_url):
+    """Tests a successful download through the pooled client."""
+    result = fetch(f"{base_url}/image.png")
+    assert result.content == IMAGE_BYTES
+
+
+def test_declared_size_limit(base_url):
+    """Tests that an oversized Content-Length is rejected up front."""
+    with pytest.raises(ImageTooLargeError):
+        fetch(f"{base_url}/large.png", max_bytes=1024)
+
+
+def test_streamed_size_limit(base_url):
+    """Tests that the byte cap applies while streaming the body."""
+    with pytest.raises(ImageTooLargeError):
+        fetch(f"{base_url}/undeclared.png", max_bytes=1024)
+
+
+def test_timeout(base_url):
+    """Tests that a slow origin fails fast instead of holding a worker."""
+    with pytest.raises(FetchError):
+        fetch(f"{base_url}/slow.png", timeout=0.2)
+
+
+def test_http_error(base_url):
+    """Tests that error statuses surface as fetch errors."""
+    with pytest.raises(FetchError):
+        fetch(f"{base_url}/missing.png")
+
+
+def test_unsupported_scheme():
+    """Tests that non-HTTP URLs are refused."""
+    with pytest.raises(FetchError):
+        fetch("file:///etc/passwd")
+
+
+def test_per_host_limit(base_url):
+    """Tests that no more than per_host_limit downloads run at once."""
+    StandInHandler.peak = 0
+
+    async def run():
+        fetcher = ImageFetcher(per_host_limit=2)
+        try:
+            results = await asyncio.gather(
+                *(fetcher.fetch(f"{base_url}/counted.png") for _ in range(6))
+            )
+            # Idle hosts don't keep a semaphore around
+            assert fetcher._host_slots == {}
+            return results
+        finally:
+            await fetcher.aclose()
+
+    results = asyncio.run(run())
+    assert all(result.content == IMAGE_BYTES for result in results)
+    assert StandInHandler.peak <= 2
@@ -0,0 +1,147 @@
+import pytest
+import torch
+from torchvision.models import ResNet18_Weights, resnet18
+
+from model_artifact import (
+    export_onnx,
+    export_torchscript,
+    load_model,
+    save_artifact,
+)
+from quantization import quantize_model
+
+CATEGORIES = [f"class {index}" for index in range(1000)]
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    return resnet18(weights=None).eval()
+
+
+@pytest.fixture(scope="module")
+def images():
+    torch.manual_seed(1)
+    return torch.randn(2, 3, 224, 224)
+
+
+def logits(model, images):
+    with torch.no_grad():
+        return model(images)
+
+
+def test_eager_artifact_round_trips(model, images, tmp_path):
+    """Tests that a saved artifact loads the same weights and labels."""
+    path = tmp_path / "model.pth"
+    save_artifact(model, CATEGORIES, path)
+
+    loaded, categories, report = load_model("eager", str(path))
+
+    assert categories == CATEGORIES
+    assert torch.equal(logits(loaded, images), logits(model, images))
+    assert report["backend"] == "eager"
+    assert report["num_classes"] == len(CATEGORIES)
+    assert report["size_bytes"] == path.stat().st_size
+
+
+def test_bare_state_dict_gets_the_imagenet_labels(model, images, tmp_path):
+    """Tests that an older bare state dict still loads, offline."""
+    path = tmp_path / "model.pth"
+    torch.save(model.state_dict(), path)
+
+    loaded, categories, _ = load_model("eager", str(path))
+
+    assert categories == ResNet18_Weights.DEFAULT.meta["categories"]
+    assert torch.equal(logits(loaded, images), logits(model, images))
+
+
+def test_torchscript_artifact_round_trips(model, images, tmp_path):
+    """Tests that the traced model keeps its outputs and bundled labels."""
+    path = tmp_path / "model.pt"
+    export_torchscript(model, CATEGORIES, str(path))
+
+    loaded, categories, report = load_model("torchscript", str(path))
+
+    assert categories == CATEGORIES
+    assert torch.allclose(
+        logits(loaded, images), logits(model, images), atol=1e-5
+    )
+    assert report["backend"] == "torchscript"
+
+
+def test_dynamic_int8_load_matches_quantizing_in_memory(
+    model, images, tmp_path
+):
+    """Tests that loading with a precision quantizes the saved weights."""
+    path = tmp_path / "model.pth"
+    save_artifact(model, CATEGORIES, path)
+
+    loaded, categories, report = load_model(
+        "eager", str(path), precision="dynamic_int8"
+    )
+
+    expected = quantize_model(model, "dynamic_int8")
+    assert categories == CATEGORIES
+    assert torch.allclose(
+        logits(loaded, images), logits(expected, images), atol=1e-5
+    )
+    assert report["precision"] == "dynamic_int8"
+    assert "quantize_ms" in report
+
+
+def test_onnx_artifact_round_trips(model, images, tmp_path):
+    """Tests that the ONNX graph keeps its outputs and bundled labels."""
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    path = tmp_path / "model.onnx"
+    export_onnx(model, CATEGORIES, str(path))
+
+    loaded, categories, _ = load_model("onnx", str(path))
+
+    assert categories == CATEGORIES
+    assert torch.allclose(
+        logits(loaded, images), logits(model, images), atol=1e-4
+    )
+
+
+@pytest.mark.parametrize("backend", ["eager", "torchscript"])
+def test_missing_artifact(backend, tmp_path):
+    """Tests that a missing artifact says how to create it."""
+    with pytest.raises(FileNotFoundError, match="save_resnet_model.py"):
+        load_model(backend, str(tmp_path / "missing"))
+
+
+@pytest.mark.parametrize(
+    "backend, save",
+    [
+        ("eager", lambda model, path: save_artifact(model, CATEGORIES, path)),
+        (
+            "torchscript",
+            lambda model, path: export_torchscript(model, CATEGORIES, path),
+        ),
+    ],
+)
+def test_truncated_artifact(backend, save, model, tmp_path):
+    """Tests that a truncated artifact is reported as corrupt."""
+    path = tmp_path / "model"
+    save(model, str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[: len(data) // 2])
+
+    with pytest.raises(ValueError, match="corrupt"):
+        load_model(backend, str(path))
+
+
+def test_garbage_artifact(tmp_path):
+    """Tests that a file that isn't a checkpoint is reported as corrupt."""
+    path = tmp_path / "model.pth"
+    path.write_bytes(b"not a checkpoint")
+
+    with pytest.raises(ValueError, match="corrupt"):
+        load_model("eager", str(path))
+
+
+def test_unknown_backend():
+    """Tests that an unknown backend is rejected."""
+    with pytest.raises(ValueError, match="Unknown model backend"):
+        load_model("tensorrt")
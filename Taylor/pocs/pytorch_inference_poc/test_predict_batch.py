@@ -0,0 +1,145 @@
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import torch
+from fastapi.testclient import TestClient
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+import main
+
+CATEGORIES = ["red", "green", "blue"]
+MAX_BYTES = 10_000
+
+
+def png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class DominantChannel(torch.nn.Module):
+    """Classifies an image by its brightest color channel."""
+
+    def forward(self, batch):
+        return batch.mean(dim=(2, 3))
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/green.png":
+            body = png("green")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(
+        main,
+        "load_model_artifact",
+        lambda **kwargs: (
+            DominantChannel(),
+            CATEGORIES,
+            {"backend": "eager", "precision": "fp32", "total_ms": 0.0},
+        ),
+    )
+    monkeypatch.setattr(main, "FETCH_MAX_BYTES", MAX_BYTES)
+    with TestClient(main.app) as client:
+        yield client
+
+
+def predict_batch(client, urls=(), files=()):
+    response = client.post(
+        "/predict/batch",
+        data={"image_urls": list(urls)},
+        files=[("files", file) for file in files],
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    return sorted(lines, key=lambda line: line["index"])
+
+
+def test_mixed_urls_and_files(client, base_url):
+    """Tests that URLs and uploads are scored in one batch, URLs first."""
+    results = predict_batch(
+        client,
+        urls=[f"{base_url}/green.png"],
+        files=[
+            ("red.png", png("red"), "image/png"),
+            ("blue.png", png("blue"), "image/png"),
+        ],
+    )
+
+    assert [(r["index"], r["source"], r["class_name"]) for r in results] == [
+        (0, f"{base_url}/green.png", "green"),
+        (1, "red.png", "red"),
+        (2, "blue.png", "blue"),
+    ]
+
+
+def test_per_item_errors_do_not_fail_the_batch(client, base_url, monkeypatch):
+    """Tests that bad items get their own error lines among results."""
+    reads = []
+    read = UploadFile.read
+
+    async def recording_read(self, size=-1):
+        reads.append(size)
+        return await read(self, size)
+
+    monkeypatch.setattr(UploadFile, "read", recording_read)
+
+    results = predict_batch(
+        client,
+        urls=[f"{base_url}/missing.png"],
+        files=[
+            ("big.bin", b"\x00" * (MAX_BYTES * 4), "image/png"),
+            ("notes.txt", b"not an image", "text/plain"),
+            ("red.png", png("red"), "image/png"),
+        ],
+    )
+
+    assert [r.get("status_code") for r in results] == [400, 413, 400, None]
+    assert "Failed to download image" in results[0]["error"]
+    assert results[3]["class_name"] == "red"
+    # Uploads are never read past the size limit
+    assert reads == [MAX_BYTES + 1] * 3
+
+
+def test_content_hit_is_not_written_again(client, monkeypatch):
+    """Tests that a repeated image is answered without rewriting its entry."""
+    writes = []
+    content = main.prediction_cache.by_content
+    set_entry = content.set
+
+    async def recording_set(key, value):
+        writes.append(key)
+        await set_entry(key, value)
+
+    monkeypatch.setattr(content, "set", recording_set)
+    image = ("blueish.png", png((10, 20, 240)), "image/png")
+
+    first = predict_batch(client, files=[image])
+    second = predict_batch(client, files=[image])
+
+    assert first[0]["class_name"] == second[0]["class_name"] == "blue"
+    assert len(writes) == 1
@@ -0,0 +1,92 @@
+import io
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+from torchvision import transforms
+
+from preprocess import IMAGENET_MEAN, IMAGENET_STD, Preprocessor
+
+# The torchvision pipeline decode_image replaces
+REFERENCE = transforms.Compose(
+    [
+        transforms.Resize(256),
+        transforms.CenterCrop(224),
+        transforms.ToTensor(),
+        transforms.Normalize(IMAGENET_MEAN.tolist(), IMAGENET_STD.tolist()),
+    ]
+)
+# One gray level after normalization, in the channel it's largest in
+LEVEL = 1.0 / (255.0 * IMAGENET_STD.min())
+
+
+def scene(width, height):
+    """A smooth RGB test picture, standing in for a photo."""
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    red = 127 + 100 * np.sin(x / 37) * np.cos(y / 53)
+    green = 127 + 100 * np.sin((x + y) / 61)
+    blue = 127 + 100 * np.cos(np.hypot(x - width / 2, y - height / 2) / 29)
+    pixels = np.stack([red, green, blue], axis=-1)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def encode(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+# (image bytes, max and mean allowed difference in gray levels)
+CASES = {
+    # Decoded at a reduced DCT scale (draft mode)
+    "large jpeg": (encode(scene(1280, 960), "JPEG", quality=90), 16, 4),
+    "jpeg just over 256": (encode(scene(257, 256), "JPEG", quality=90), 6, 1),
+    "grayscale jpeg": (encode(scene(511, 383).convert("L"), "JPEG"), 4, 1),
+    "odd-sized png": (encode(scene(640, 333), "PNG"), 2, 0.25),
+    "rgba png": (encode(scene(300, 500).convert("RGBA"), "PNG"), 2, 0.25),
+    "palette png": (encode(scene(333, 222).convert("P"), "PNG"), 2, 0.25),
+    "upscaled png": (encode(scene(100, 75), "PNG"), 2, 0.25),
+}
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_matches_torchvision_within_tolerance(case):
+    """Tests that single-step decoding stays close to Resize+CenterCrop."""
+    image_bytes, max_levels, mean_levels = CASES[case]
+    expected = REFERENCE(Image.open(io.BytesIO(image_bytes)).convert("RGB"))
+
+    actual = Preprocessor().transform(image_bytes)
+
+    assert actual.shape == (1, 3, 224, 224)
+    assert actual.dtype == torch.float32
+    difference = (actual[0] - expected).abs()
+    assert difference.max() <= max_levels * LEVEL
+    assert difference.mean() <= mean_levels * LEVEL
+
+
+def test_collate_reuses_the_buffer_across_batches():
+    """Tests that each batch fills the shared buffer with its own crops."""
+    preprocessor = Preprocessor(max_batch_size=3)
+    images = [
+        encode(scene(width, 300), "PNG") for width in (300, 400, 500, 600)
+    ]
+    crops = [preprocessor.decode(image) for image in images]
+    expected = [preprocessor.transform(image)[0] for image in images]
+
+    first = preprocessor.collate(crops[:3])
+    assert first.shape == (3, 3, 224, 224)
+    for row, want in zip(first, expected[:3]):
+        torch.testing.assert_close(row, want)
+
+    # A smaller batch reuses the same memory, overwriting the first rows
+    second = preprocessor.collate(crops[3:])
+    assert second.shape == (1, 3, 224, 224)
+    assert second.data_ptr() == first.data_ptr()
+    torch.testing.assert_close(second[0], expected[3])
+
+    # A larger batch than the buffer gets a bigger one
+    third = preprocessor.collate(crops + crops[:1])
+    assert third.shape == (5, 3, 224, 224)
+    for row, want in zip(third, expected + expected[:1]):
+        torch.testing.assert_close(row, want)
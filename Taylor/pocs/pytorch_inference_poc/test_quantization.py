@@ -0,0 +1,93 @@
+import pytest
+import torch
+from torchvision.models import resnet18
+
+from quantization import quantize_model
+
+CLASSES = 8
+
+
+def stripes():
+    """One image per class: stripes of a different angle and color."""
+    y, x = torch.meshgrid(
+        torch.arange(64.0), torch.arange(64.0), indexing="ij"
+    )
+    images = []
+    for index in range(CLASSES):
+        angle = torch.tensor(index * torch.pi / CLASSES)
+        frequency = 0.2 + 0.1 * (index % 3)
+        wave = torch.sin(
+            frequency * (x * torch.cos(angle) + y * torch.sin(angle))
+        )
+        color = torch.tensor([(index >> bit) & 1 for bit in range(3)])
+        images.append(wave * 2 + (color * 2.0 - 1)[:, None, None])
+    return torch.stack(images)
+
+
+@pytest.fixture(scope="module")
+def model_and_images():
+    """
+    A ResNet18 that tells apart a few images, standing in for the
+    pretrained weights: BatchNorm statistics come from the images, and
+    each image's centered features are the classifier row for its class,
+    so top-1 is decided by a clear margin.
+    """
+    torch.manual_seed(0)
+    images = stripes()
+    model = resnet18(weights=None)
+    model.train()
+    with torch.no_grad():
+        for _ in range(5):
+            model(images)
+    model.eval()
+
+    backbone = torch.nn.Sequential(*list(model.children())[:-1])
+    with torch.no_grad():
+        features = backbone(images).flatten(1)
+        mean = features.mean(0)
+        rows = features - mean
+        rows = rows / rows.norm(dim=1, keepdim=True) * 10
+        model.fc.weight.zero_()
+        model.fc.bias.fill_(-1000.0)
+        model.fc.weight[:CLASSES] = rows
+        model.fc.bias[:CLASSES] = -(rows @ mean)
+    return model, images
+
+
+def top1(model, images):
+    with torch.no_grad():
+        return model(images).argmax(1).tolist()
+
+
+def test_dynamic_int8_keeps_top1(model_and_images):
+    """Tests that dynamic int8 predicts the same classes as fp32."""
+    model, images = model_and_images
+    assert top1(model, images) == list(range(CLASSES))
+
+    quantized = quantize_model(model, "dynamic_int8")
+
+    assert top1(quantized, images) == top1(model, images)
+
+
+def test_static_int8_keeps_top1(model_and_images, monkeypatch):
+    """Tests that calibrated static int8 predicts the same classes."""
+    model, images = model_and_images
+    monkeypatch.setattr(
+        "quantization.load_image_tensors", lambda images_dir: images
+    )
+
+    quantized = quantize_model(model, "static_int8", "calibration-images")
+
+    assert top1(quantized, images) == top1(model, images)
+
+
+def test_rejects_unsupported_conversions(model_and_images):
+    """Tests the precision/backend combinations that can't be served."""
+    model, images = model_and_images
+    with pytest.raises(ValueError):
+        quantize_model(model, "static_int8")
+    with pytest.raises(ValueError):
+        quantize_model(model, "int4")
+    with pytest.raises(ValueError):
+        quantize_model(torch.jit.trace(model, images[:1]), "dynamic_int8")
+    assert quantize_model(model, "fp32") is model